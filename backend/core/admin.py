@@ -5,9 +5,10 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 from .models import (
-    User, PlayerProfile, Game, GameComment,
-    Trophy, WeeklyLeaderboard, Tournament, TournamentMatch, Notification
+    User, PlayerProfile, Game, GameParticipant, GameComment, RatingHistory,
+    Trophy, WeeklyLeaderboard, Tournament, TournamentMatch, Notification, Job
 )
+from .services import RankingsService
 
 
 @admin.register(User)
@@ -109,12 +110,14 @@ class UserAdmin(admin.ModelAdmin):
             approved_by=request.user,
             approved_at=timezone.now()
         )
+        RankingsService.invalidate()
         self.message_user(request, f'{count} users approved.')
     approve_users.short_description = 'Approve selected users'
 
     def verify_phones(self, request, queryset):
         """Bulk verify phone numbers"""
         count = queryset.update(phone_verified=True)
+        RankingsService.invalidate()
         self.message_user(request, f'{count} phone numbers verified.')
     verify_phones.short_description = 'Verify phone numbers for selected users'
 
@@ -126,6 +129,7 @@ class UserAdmin(admin.ModelAdmin):
             approved_at=timezone.now(),
             phone_verified=True
         )
+        RankingsService.invalidate()
         self.message_user(request, f'{count} users approved and verified.')
     approve_and_verify.short_description = 'Approve AND verify selected users'
 
@@ -164,7 +168,10 @@ class GameAdmin(admin.ModelAdmin):
     readonly_fields = [
         'id', 'reported_at', 'verified_at', 'disputed_at', 'resolved_at',
         'player1_elo_before', 'player2_elo_before', 'player1_elo_after',
-        'player2_elo_after', 'elo_change'
+        'player2_elo_after', 'team1_player1_elo_before', 'team1_player2_elo_before',
+        'team2_player1_elo_before', 'team2_player2_elo_before', 'team1_player1_elo_after',
+        'team1_player2_elo_after', 'team2_player1_elo_after', 'team2_player2_elo_after',
+        'elo_change'
     ]
 
     fieldsets = (
@@ -185,7 +192,11 @@ class GameAdmin(admin.ModelAdmin):
         ('ELO Changes', {
             'fields': (
                 'player1_elo_before', 'player2_elo_before',
-                'player1_elo_after', 'player2_elo_after', 'elo_change'
+                'player1_elo_after', 'player2_elo_after',
+                'team1_player1_elo_before', 'team1_player2_elo_before',
+                'team2_player1_elo_before', 'team2_player2_elo_before',
+                'team1_player1_elo_after', 'team1_player2_elo_after',
+                'team2_player1_elo_after', 'team2_player2_elo_after', 'elo_change'
             ),
             'classes': ('collapse',)
         })
@@ -256,21 +267,27 @@ class GameAdmin(admin.ModelAdmin):
 
     def verify_games(self, request, queryset):
         """Bulk verify games"""
-        count = queryset.filter(status='pending').update(
+        game_ids = list(queryset.filter(status='pending').values_list('id', flat=True))
+        count = Game.objects.filter(id__in=game_ids).update(
             status='verified',
             verified_by=request.user,
             verified_at=timezone.now()
         )
+        GameParticipant.objects.filter(game_id__in=game_ids).update(status='verified')
+        RankingsService.invalidate()
         self.message_user(request, f'{count} games verified.')
     verify_games.short_description = 'Verify selected games'
 
     def mark_as_resolved(self, request, queryset):
         """Mark disputed games as resolved"""
-        count = queryset.filter(status='disputed').update(
+        game_ids = list(queryset.filter(status='disputed').values_list('id', flat=True))
+        count = Game.objects.filter(id__in=game_ids).update(
             status='resolved',
             resolved_by=request.user,
             resolved_at=timezone.now()
         )
+        GameParticipant.objects.filter(game_id__in=game_ids).update(status='resolved')
+        RankingsService.invalidate()
         self.message_user(request, f'{count} games marked as resolved.')
     mark_as_resolved.short_description = 'Resolve selected disputed games'
 
@@ -290,7 +307,7 @@ class TournamentAdmin(admin.ModelAdmin):
     filter_horizontal = ['participants']
 
     def participant_count(self, obj):
-        return f"{obj.participants.count()}/{obj.max_participants}"
+        return f"{obj.participant_count}/{obj.max_participants}"
     participant_count.short_description = 'Participants'
 
     actions = ['approve_tournaments']
@@ -340,6 +357,39 @@ class WeeklyLeaderboardAdmin(admin.ModelAdmin):
     ordering = ['-year', '-week_number', '-points']
 
 
+@admin.register(RatingHistory)
+class RatingHistoryAdmin(admin.ModelAdmin):
+    """Admin interface for Rating History"""
+    list_display = ['player', 'game_type', 'rating_before', 'rating_after', 'timestamp']
+    list_filter = ['game_type', 'timestamp']
+    search_fields = ['player__username', 'player__display_name']
+    ordering = ['-timestamp']
+    raw_id_fields = ['player', 'game']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Admin interface for background jobs"""
+    list_display = ['name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'idempotency_key']
+    ordering = ['-created_at']
+    readonly_fields = ['locked_at', 'created_at', 'finished_at', 'last_error']
+
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        """Queue failed jobs to run again"""
+        count = queryset.filter(status='failed').update(
+            status='pending',
+            attempts=0,
+            run_after=timezone.now(),
+            finished_at=None
+        )
+        self.message_user(request, f'{count} jobs queued to retry.')
+    retry_jobs.short_description = 'Retry selected failed jobs'
+
+
 # Register remaining models
 admin.site.register(GameComment)
 admin.site.register(TournamentMatch)
@@ -0,0 +1,255 @@
+"""
+Tournament bracket generation for Ping Pong Tracker
+Builds the full match graph for a seeded list of players in memory, without
+touching the database - TournamentService persists the result
+"""
+import math
+
+
+class BracketMatch:
+    """
+    A match in a generated bracket
+    Players are indexed by slot (0 and 1). A slot is dead when nobody can ever
+    arrive in it (a missing seed, or the loser of a bye), which turns the match
+    into a bye for whoever fills the other slot.
+    """
+    __slots__ = (
+        'bracket', 'round_number', 'match_number', 'players', 'dead',
+        'status', 'winner', 'next_match', 'next_slot', 'loser_next_match', 'loser_slot',
+    )
+
+    def __init__(self, bracket, round_number, match_number):
+        self.bracket = bracket
+        self.round_number = round_number
+        self.match_number = match_number
+        self.players = [None, None]
+        self.dead = [False, False]
+        self.status = 'pending'
+        self.winner = None
+        self.next_match = None
+        self.next_slot = None
+        self.loser_next_match = None
+        self.loser_slot = None
+
+    def link(self, match, slot):
+        """Send the winner of this match to a slot of another match"""
+        self.next_match = match
+        self.next_slot = slot
+
+    def link_loser(self, match, slot):
+        """Send the loser of this match to a slot of another match"""
+        self.loser_next_match = match
+        self.loser_slot = slot
+
+    def __repr__(self):
+        return f'<BracketMatch {self.bracket} R{self.round_number} M{self.match_number} {self.status}>'
+
+
+def seed_order(size):
+    """
+    Bracket positions of seeds 1..size (size a power of two) so that the top
+    seeds meet as late as possible, e.g. 8 -> [1, 8, 4, 5, 2, 7, 3, 6]
+    """
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for position in order for seed in (position, total - position)]
+    return order
+
+
+def bracket_size(count):
+    """Smallest power of two holding `count` players"""
+    return 1 << max(1, math.ceil(math.log2(count)))
+
+
+def resolve_byes(matches):
+    """
+    Propagate dead slots through the bracket and advance bye winners
+    Matches must be in dependency order (every feeder before the match it
+    feeds), which is the order the generators below create them in.
+    """
+    for match in matches:
+        dead_slots = sum(match.dead)
+        if dead_slots == 0:
+            continue
+
+        match.status = 'bye'
+        # A bye has no loser to drop into the losers bracket
+        if match.loser_next_match is not None:
+            match.loser_next_match.dead[match.loser_slot] = True
+
+        if dead_slots == 2:
+            # Nobody ever plays here, so nobody comes out either
+            if match.next_match is not None:
+                match.next_match.dead[match.next_slot] = True
+            continue
+
+        player = match.players[0] if match.dead[1] else match.players[1]
+        if player is not None:
+            match.winner = player
+            if match.next_match is not None:
+                match.next_match.players[match.next_slot] = player
+
+
+def _winners_bracket(players, bracket='winners'):
+    """Seeded elimination rounds, returns the matches grouped by round"""
+    size = bracket_size(len(players))
+    order = seed_order(size)
+
+    rounds = []
+    first = []
+    for number in range(size // 2):
+        match = BracketMatch(bracket, 1, number + 1)
+        for slot, seed in enumerate(order[number * 2:number * 2 + 2]):
+            if seed <= len(players):
+                match.players[slot] = players[seed - 1]
+            else:
+                match.dead[slot] = True
+        first.append(match)
+    rounds.append(first)
+
+    while len(rounds[-1]) > 1:
+        previous = rounds[-1]
+        current = [BracketMatch(bracket, len(rounds) + 1, number + 1) for number in range(len(previous) // 2)]
+        for index, match in enumerate(previous):
+            match.link(current[index // 2], index % 2)
+        rounds.append(current)
+    return rounds
+
+
+def single_elimination(players):
+    """Seeded knockout bracket with byes for the top seeds"""
+    matches = [match for round_matches in _winners_bracket(players) for match in round_matches]
+    resolve_byes(matches)
+    return matches
+
+
+def double_elimination(players):
+    """
+    Winners bracket, losers bracket and grand final
+    Losers of winners round 1 meet in losers round 1; losers of each later
+    winners round drop into the even losers rounds (in reverse order to
+    avoid immediate rematches) against the survivors of the losers bracket.
+    The winners bracket champion takes slot 0 of the grand final. If the
+    losers bracket player wins it, TournamentService adds the bracket reset
+    (grand final round 2), since only then has the champion lost once.
+    """
+    winners = _winners_bracket(players)
+    losers = []
+
+    survivors = []
+    for drop_round, dropped in enumerate(winners):
+        # Losers of this winners round, in the order they arrive
+        drops = list(reversed(dropped)) if drop_round % 2 else list(dropped)
+        if drop_round == 0:
+            if len(drops) < 2:
+                survivors = [(match, 'loser') for match in drops]
+                continue
+            current = [BracketMatch('losers', 1, number + 1) for number in range(len(drops) // 2)]
+            for index, match in enumerate(drops):
+                match.link_loser(current[index // 2], index % 2)
+            losers.append(current)
+            survivors = [(match, 'winner') for match in current]
+            continue
+
+        # Even round: losers bracket survivors against the new drops
+        current = [BracketMatch('losers', len(losers) + 1, number + 1) for number in range(len(drops))]
+        for index, match in enumerate(current):
+            source, outcome = survivors[index]
+            if outcome == 'winner':
+                source.link(match, 0)
+            else:
+                source.link_loser(match, 0)
+            drops[index].link_loser(match, 1)
+        losers.append(current)
+        survivors = [(match, 'winner') for match in current]
+
+        # Odd round: survivors play each other, until one is left
+        if len(current) > 1:
+            halved = [BracketMatch('losers', len(losers) + 1, number + 1) for number in range(len(current) // 2)]
+            for index, match in enumerate(current):
+                match.link(halved[index // 2], index % 2)
+            losers.append(halved)
+            survivors = [(match, 'winner') for match in halved]
+
+    final = BracketMatch('grand_final', 1, 1)
+    winners[-1][0].link(final, 0)
+    source, outcome = survivors[0]
+    if outcome == 'winner':
+        source.link(final, 1)
+    else:
+        source.link_loser(final, 1)
+
+    matches = [match for round_matches in winners for match in round_matches]
+    matches += [match for round_matches in losers for match in round_matches]
+    matches.append(final)
+    resolve_byes(matches)
+    return matches
+
+
+def round_robin(players):
+    """Every player meets every other once (circle method), no links between matches"""
+    entrants = list(players)
+    if len(entrants) % 2:
+        entrants.append(None)
+    count = len(entrants)
+
+    matches = []
+    for round_index in range(count - 1):
+        number = 0
+        for index in range(count // 2):
+            home, away = entrants[index], entrants[count - 1 - index]
+            if home is None or away is None:
+                # Odd field - this player sits the round out
+                continue
+            number += 1
+            match = BracketMatch('round_robin', round_index + 1, number)
+            match.players = [home, away]
+            matches.append(match)
+        # Keep the first entrant fixed and rotate the rest
+        entrants = [entrants[0], entrants[-1]] + entrants[1:-1]
+    return matches
+
+
+def swiss_first_round(players):
+    """
+    Round 1 of a Swiss tournament: top half against bottom half by seed
+    With an odd field the lowest seed gets a bye. Later rounds are paired
+    from the standings as results come in.
+    """
+    half = len(players) // 2
+    matches = []
+    for index in range(half):
+        match = BracketMatch('swiss', 1, index + 1)
+        match.players = [players[index], players[index + half]]
+        matches.append(match)
+
+    if len(players) % 2:
+        bye = BracketMatch('swiss', 1, half + 1)
+        bye.players = [players[-1], None]
+        bye.dead = [False, True]
+        matches.append(bye)
+        resolve_byes([bye])
+    return matches
+
+
+GENERATORS = {
+    'single_elimination': single_elimination,
+    'double_elimination': double_elimination,
+    'round_robin': round_robin,
+    'swiss': swiss_first_round,
+}
+
+
+def generate(tournament_type, players):
+    """
+    Matches for a tournament type, players ordered by seed (best first)
+    Returns BracketMatch objects in dependency order
+    """
+    if len(players) < 2:
+        raise ValueError('A tournament needs at least 2 players')
+    try:
+        generator = GENERATORS[tournament_type]
+    except KeyError:
+        raise ValueError(f"Unknown tournament type '{tournament_type}'")
+    return generator(players)
@@ -140,6 +140,137 @@ class ELOCalculator:
 
         return result
 
+    @staticmethod
+    def replay_singles(player1, player2, player1_won, ratings, games_played):
+        """
+        Replay a time-ordered stream of singles games in one pass
+        Produces exactly the same results as calling calculate_new_ratings
+        game by game, but keeps all state in flat arrays instead of models
+
+        Args:
+            player1: sequence of player indices for player 1 of each game
+            player2: sequence of player indices for player 2 of each game
+            player1_won: sequence of booleans, True if player 1 won the game
+            ratings: list of starting singles ratings indexed by player (updated in place)
+            games_played: list of starting singles game counts indexed by player (updated in place)
+
+        Returns:
+            tuple of lists: (player1_before, player2_before, player1_after,
+                             player2_after, elo_change), one entry per game
+        """
+        # Ratings depend on every earlier game, so the replay is inherently
+        # sequential - keep the hot loop free of attribute and method lookups
+        pow_ = math.pow
+        new_games = ELOCalculator.NEW_PLAYER_GAMES
+        high_threshold = ELOCalculator.HIGH_RATING_THRESHOLD
+        k_new = ELOCalculator.K_FACTOR_NEW
+        k_mid = ELOCalculator.K_FACTOR_MID
+        k_high = ELOCalculator.K_FACTOR_HIGH
+
+        count = len(player1)
+        before1 = [0] * count
+        before2 = [0] * count
+        after1 = [0] * count
+        after2 = [0] * count
+        changes = [0] * count
+
+        for i in range(count):
+            a = player1[i]
+            b = player2[i]
+            rating_a = ratings[a]
+            rating_b = ratings[b]
+            # calculate_new_ratings treats 0 games as "unknown" (games or 100)
+            games_a = games_played[a] or 100
+            games_b = games_played[b] or 100
+
+            expected_a = 1 / (1 + pow_(10, (rating_b - rating_a) / 400))
+            expected_b = 1 - expected_a
+            score_a = 1 if player1_won[i] else 0
+
+            if games_a < new_games:
+                k_a = k_new
+            elif rating_a < high_threshold:
+                k_a = k_mid
+            else:
+                k_a = k_high
+            if games_b < new_games:
+                k_b = k_new
+            elif rating_b < high_threshold:
+                k_b = k_mid
+            else:
+                k_b = k_high
+
+            change_a = k_a * (score_a - expected_a)
+            change_b = k_b * ((1 - score_a) - expected_b)
+
+            new_a = max(0, round(rating_a + change_a))
+            new_b = max(0, round(rating_b + change_b))
+
+            before1[i] = rating_a
+            before2[i] = rating_b
+            after1[i] = new_a
+            after2[i] = new_b
+            changes[i] = abs(round(change_a))
+
+            ratings[a] = new_a
+            ratings[b] = new_b
+            games_played[a] += 1
+            games_played[b] += 1
+
+        return before1, before2, after1, after2, changes
+
+    @staticmethod
+    def replay_doubles(team1_player1, team1_player2, team2_player1, team2_player2,
+                       team1_won, ratings, games_played):
+        """
+        Replay a time-ordered stream of doubles games in one pass
+        Produces the same results as calling calculate_doubles_ratings game by game
+
+        Args:
+            team1_player1, team1_player2, team2_player1, team2_player2:
+                sequences of player indices for each slot of each game
+            team1_won: sequence of booleans, True if team 1 won the game
+            ratings: list of starting doubles ratings indexed by player (updated in place)
+            games_played: list of starting doubles game counts indexed by player (updated in place)
+
+        Returns:
+            tuple: (before, after, elo_change) where before and after are lists of
+                   4-tuples in slot order (team1_player1, team1_player2,
+                   team2_player1, team2_player2), one entry per game
+        """
+        calculate = ELOCalculator.calculate_doubles_ratings
+
+        count = len(team1_player1)
+        before = [None] * count
+        after = [None] * count
+        changes = [0] * count
+
+        for i in range(count):
+            slots = (team1_player1[i], team1_player2[i], team2_player1[i], team2_player2[i])
+            old = tuple(ratings[p] for p in slots)
+
+            result = calculate(
+                (old[0], old[1]),
+                (old[2], old[3]),
+                team1_won[i],
+                (games_played[slots[0]], games_played[slots[1]]),
+                (games_played[slots[2]], games_played[slots[3]])
+            )
+            new = (
+                result['team1_player1'], result['team1_player2'],
+                result['team2_player1'], result['team2_player2']
+            )
+
+            before[i] = old
+            after[i] = new
+            changes[i] = result['elo_change']
+
+            for p, rating in zip(slots, new):
+                ratings[p] = rating
+                games_played[p] += 1
+
+        return before, after, changes
+
 
 class PointsCalculator:
     """
@@ -0,0 +1,256 @@
+"""
+Lightweight pub/sub for pushing events to connected clients
+Events are published per user and consumed by the notification stream.
+The backend is pluggable through the EVENTS_BACKEND setting. The in-memory
+one only reaches subscribers in the same process; the PostgreSQL one relays
+events through LISTEN/NOTIFY, so any process can publish to any stream.
+"""
+import asyncio
+import json
+import select
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class EventBackend:
+    """Interface for pub/sub backends"""
+
+    def subscribe(self, channel):
+        """Return a Subscription receiving events published on the channel"""
+        raise NotImplementedError
+
+    def publish(self, channel, event):
+        """Deliver an event to all current subscribers of the channel"""
+        raise NotImplementedError
+
+    def publish_many(self, messages):
+        """Deliver several (channel, event) pairs, backends may send them in one go"""
+        for channel, event in messages:
+            self.publish(channel, event)
+
+    def has_subscribers(self, channel):
+        """Cheap check so publishers can skip building events nobody listens to"""
+        return True
+
+    async def wait_listening(self):
+        """Wait until events published from now on reach new subscriptions"""
+
+
+class Subscription:
+    """A subscriber's queue, read from the event loop that created it"""
+
+    def __init__(self, backend, channel, max_size):
+        self.backend = backend
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_size)
+
+    def deliver(self, event):
+        """Thread safe, events are dropped for subscribers that fall behind"""
+        def put():
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+        self.loop.call_soon_threadsafe(put)
+
+    async def get(self, timeout=None):
+        """Next event, or None if nothing arrives within the timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.backend.unsubscribe(self)
+
+
+class InMemoryEventBackend(EventBackend):
+    """Pub/sub between threads and event loops of a single process"""
+    max_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.max_queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # Subscriber's event loop is closed, it is going away anyway
+                pass
+
+    def has_subscribers(self, channel):
+        return channel in self._subscriptions
+
+
+class PostgresEventBackend(InMemoryEventBackend):
+    """
+    Pub/sub across processes and instances through PostgreSQL LISTEN/NOTIFY
+    Publishers send a NOTIFY on the default database connection. Processes
+    with open streams run one listener thread on a dedicated connection, which
+    hands the events to its local subscribers.
+    """
+    pg_channel = 'pingpong_events'
+    # PostgreSQL refuses NOTIFY payloads from 8000 bytes up
+    max_payload = 7999
+    poll_interval = 5
+    reconnect_delay = 1
+
+    def __init__(self):
+        super().__init__()
+        self._listener = None
+        self._listening = threading.Event()
+        self._stopping = threading.Event()
+
+    def subscribe(self, channel):
+        subscription = super().subscribe(channel)
+        self._start_listener()
+        return subscription
+
+    def publish(self, channel, event):
+        self.publish_many([(channel, event)])
+
+    def publish_many(self, messages):
+        from django.db import connection
+
+        payloads = [self._payload(channel, event) for channel, event in messages]
+        if not payloads:
+            return
+        with connection.cursor() as cursor:
+            if len(payloads) == 1:
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.pg_channel, payloads[0]])
+            else:
+                # One round trip for the whole batch instead of one per event
+                cursor.execute(
+                    'SELECT pg_notify(%s, payload) FROM unnest(%s::text[]) AS payload',
+                    [self.pg_channel, payloads]
+                )
+
+    def _payload(self, channel, event):
+        payload = json.dumps({'channel': channel, 'event': event}, cls=DjangoJSONEncoder)
+        size = len(payload.encode())
+        if size > self.max_payload:
+            raise ValueError(f'{size} byte event is too large for NOTIFY, publish an id for subscribers to fetch')
+        return payload
+
+    def has_subscribers(self, channel):
+        # Subscribers may be connected to another process
+        return True
+
+    async def wait_listening(self):
+        # The listener may still be connecting, wait for it off the event loop
+        if not self._listening.is_set():
+            await asyncio.to_thread(self._listening.wait, self.poll_interval)
+
+    def close(self):
+        """Stop the listener thread"""
+        self._stopping.set()
+        if self._listener is not None:
+            self._listener.join()
+            self._listener = None
+        self._stopping.clear()
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+
+    def _connect(self):
+        from django.db import connection
+
+        # Own connection outside Django's, it stays open until close()
+        conn = connection.Database.connect(**connection.get_connection_params())
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.pg_channel}')
+        return conn
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                conn = self._connect()
+            except Exception as e:
+                print(f"Error connecting event listener: {e}")
+                self._stopping.wait(self.reconnect_delay)
+                continue
+            self._listening.set()
+            try:
+                while not self._stopping.is_set():
+                    select.select([conn], [], [], self.poll_interval)
+                    conn.poll()
+                    while conn.notifies:
+                        message = json.loads(conn.notifies.pop(0).payload)
+                        InMemoryEventBackend.publish(self, message['channel'], message['event'])
+            except Exception as e:
+                print(f"Event listener connection lost: {e}")
+            finally:
+                self._listening.clear()
+                conn.close()
+            self._stopping.wait(self.reconnect_delay)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = import_string(settings.EVENTS_BACKEND)()
+    return _backend
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_to_user(user_id, event_type, data):
+    """Publish an event to a user once the current transaction commits"""
+    publish_to_users([(user_id, event_type, data)])
+
+
+def publish_to_users(events):
+    """
+    Publish (user_id, event_type, data) events once the current transaction
+    commits, handed to the backend as one batch
+    """
+    messages = [
+        (user_channel(user_id), {'type': event_type, 'data': data})
+        for user_id, event_type, data in events
+    ]
+    if not messages:
+        return
+
+    def publish():
+        try:
+            get_backend().publish_many(messages)
+        except Exception as e:
+            print(f"Error publishing {len(messages)} events: {e}")
+
+    transaction.on_commit(publish)
@@ -0,0 +1,171 @@
+"""
+Database backed job queue for work that doesn't need to hold up a request
+Jobs are rows in the Job table, enqueued in the caller's transaction (so a
+rolled back request never leaves a job behind) and executed by the
+run_worker management command. Failed jobs are retried with exponential
+backoff up to max_attempts.
+The worker is a separate process, so handlers must not depend on
+per-process state (the local memory cache, the in-process event backend).
+Notifications are created and published in the web process for that reason.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+
+_handlers = {}
+
+
+def task(name):
+    """Register a function as the handler for jobs with the given name"""
+    def register(func):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, idempotency_key=None, delay=None, max_attempts=None):
+    """
+    Queue a job, returns the Job
+    If a job with the same idempotency key already exists it is returned
+    instead of creating a second one
+    """
+    from .models import Job
+
+    if name not in _handlers:
+        raise ValueError(f"Unknown job '{name}'")
+
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'run_after': timezone.now() + (delay or timedelta()),
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    }
+    if idempotency_key:
+        job, created = Job.objects.get_or_create(idempotency_key=idempotency_key, defaults=fields)
+    else:
+        job = Job.objects.create(**fields)
+
+    if settings.JOBS_RUN_INLINE and not delay:
+        # No worker (tests, local development) - run it as soon as the caller commits,
+        # delayed jobs and retries are picked up by run_due_jobs on a later request
+        transaction.on_commit(lambda: run_job(job.pk))
+    return job
+
+
+def claim_jobs(limit):
+    """
+    Lock and mark up to `limit` due jobs as running
+    Jobs stuck in running for longer than JOBS_LOCK_TIMEOUT (a worker died
+    mid-job) are picked up again. Concurrent workers skip each other's rows.
+    """
+    from .models import Job
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', run_after__lte=now) |
+                Q(status='running', locked_at__lt=stale)
+            )
+            .order_by('run_after')[:limit]
+        )
+        for job in jobs:
+            job.status = 'running'
+            job.locked_at = now
+            job.attempts += 1
+        Job.objects.bulk_update(jobs, ['status', 'locked_at', 'attempts'])
+    return jobs
+
+
+def release_jobs(jobs):
+    """Hand claimed jobs that were never started back to the queue (worker shutting down)"""
+    from .models import Job
+
+    for job in jobs:
+        job.status = 'pending'
+        job.locked_at = None
+        job.attempts -= 1
+    Job.objects.bulk_update(jobs, ['status', 'locked_at', 'attempts'])
+
+
+def run_due_jobs(limit=20):
+    """Claim and run the jobs that are due now, returns how many ran"""
+    claimed = claim_jobs(limit)
+    for job in claimed:
+        execute(job)
+    return len(claimed)
+
+
+def run_job(job_id):
+    """Run a single job right away if it is due (used for JOBS_RUN_INLINE)"""
+    from .models import Job
+
+    with transaction.atomic():
+        job = Job.objects.select_for_update().filter(
+            pk=job_id, status='pending', run_after__lte=timezone.now()
+        ).first()
+        if job is None:
+            return None
+        job.status = 'running'
+        job.locked_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'locked_at', 'attempts'])
+    return execute(job)
+
+
+def execute(job):
+    """
+    Run a claimed job and record the outcome
+    Returns True if the handler succeeded
+    """
+    handler = _handlers.get(job.name)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for job '{job.name}'")
+        with transaction.atomic():
+            handler(**job.payload)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = timezone.now()
+        else:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=min(2 ** job.attempts, 3600))
+        job.locked_at = None
+        job.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'finished_at'])
+        print(f"[JOBS] {job.name} {job.id} failed (attempt {job.attempts}/{job.max_attempts})")
+        return False
+
+    job.status = 'succeeded'
+    job.locked_at = None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'locked_at', 'finished_at'])
+    return True
+
+
+# Job handlers
+# Payloads are JSON, so models are passed by id and loaded here
+
+@task('trophies.check')
+def check_trophies(user_id):
+    from .models import User
+    from .services import TrophyService
+
+    user = User.objects.filter(pk=user_id).select_related('profile').first()
+    if user is not None:
+        TrophyService.check_and_award_trophies(user)
+
+
+@task('email.flush')
+def flush_emails():
+    from .services import EmailService
+
+    EmailService.send_pending()
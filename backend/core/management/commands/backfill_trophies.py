@@ -0,0 +1,105 @@
+"""
+Management command to award milestone trophies to every player
+Run it after adding or changing a rule in core/trophies.py so existing
+players get their trophies without waiting for their next verified game.
+Safe to run repeatedly, owned trophies are never awarded twice.
+"""
+import time
+from collections import Counter
+import multiprocessing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.models import PlayerProfile
+from core.services import TrophyService
+from core.trophies import profile_fields
+
+
+def award_chunk(job):
+    """Award one (profiles, dry_run) chunk, returns the player count and new trophy counts per type"""
+    profiles, dry_run = job
+    trophies = TrophyService.award_milestones(profiles, dry_run=dry_run)
+    return len(profiles), Counter(trophy.trophy_type for trophy in trophies)
+
+
+class Command(BaseCommand):
+    help = 'Award missing milestone trophies to all players'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Players evaluated per query and bulk insert (default: 2000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes evaluating chunks in parallel (default: 1, no pool)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the trophies that would be awarded without writing them'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        workers = options['workers']
+        dry_run = options['dry_run']
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+        if workers < 1:
+            raise CommandError('--workers must be a positive integer')
+        if workers > 1 and not dry_run and connections['default'].vendor == 'sqlite':
+            raise CommandError('--workers needs a database that allows concurrent writers (SQLite does not)')
+
+        started = time.perf_counter()
+        players = 0
+        counts = Counter()
+
+        jobs = ((chunk, dry_run) for chunk in self.profile_chunks(chunk_size))
+        if workers == 1:
+            results = map(award_chunk, jobs)
+        else:
+            # Profiles are streamed by this process and evaluated by forked
+            # workers, which must not inherit its open database connection
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(workers)
+            results = pool.imap_unordered(award_chunk, jobs)
+
+        try:
+            for chunk_players, chunk_counts in results:
+                players += chunk_players
+                counts.update(chunk_counts)
+        finally:
+            if workers > 1:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - started
+        for trophy_type, count in sorted(counts.items()):
+            self.stdout.write(f'  {trophy_type}: {count}')
+        self.stdout.write(
+            f'Checked {players} players in {elapsed:.2f}s, '
+            f'{sum(counts.values())} trophies {"to award" if dry_run else "awarded"}'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('[DRY RUN] No trophies were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Trophy backfill complete'))
+
+    def profile_chunks(self, chunk_size):
+        """Stream profiles (only the fields the rules read) in lists of chunk_size"""
+        profiles = PlayerProfile.objects.order_by('pk').only(*profile_fields())
+        chunk = []
+        for profile in profiles.iterator(chunk_size=chunk_size):
+            chunk.append(profile)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
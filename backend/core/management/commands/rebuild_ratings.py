@@ -0,0 +1,509 @@
+"""
+Management command to rebuild all derived player state from verified games
+Recomputes ELO ratings, peaks, win/loss counts, points, streaks, rating history
+and the weekly leaderboard in bulk, fixing any drift from incremental updates
+Player profiles stay locked while the rebuild runs, so verifications wait for
+it instead of being overwritten by it
+"""
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.elo import ELOCalculator, PointsCalculator
+from core.models import Game, PlayerProfile, RatingHistory, WeeklyLeaderboard
+from core.services import GameService, RankingsService
+
+
+# PlayerProfile fields owned by the rebuild
+PROFILE_FIELDS = [
+    'singles_elo', 'doubles_elo', 'peak_singles_elo', 'peak_doubles_elo',
+    'peak_singles_date', 'peak_doubles_date', 'singles_games_played',
+    'doubles_games_played', 'singles_wins', 'singles_losses', 'doubles_wins',
+    'doubles_losses', 'weekly_points', 'total_points', 'current_streak',
+    'longest_streak',
+]
+
+GAME_FIELDS = [
+    'player1_elo_before', 'player2_elo_before', 'player1_elo_after',
+    'player2_elo_after', 'elo_change',
+    'team1_player1_elo_before', 'team1_player2_elo_before',
+    'team2_player1_elo_before', 'team2_player2_elo_before',
+    'team1_player1_elo_after', 'team1_player2_elo_after',
+    'team2_player1_elo_after', 'team2_player2_elo_after',
+]
+
+
+class Command(BaseCommand):
+    help = 'Rebuild ratings, stats, points, streaks and weekly leaderboards from verified games'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            type=str,
+            help='Only rewrite games and weekly leaderboards from this date (YYYY-MM-DD) onwards'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Rows per streaming read and bulk write (default: 2000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without writing anything'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        since = self.parse_since(options.get('since'))
+
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be a positive integer')
+
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            if not dry_run:
+                # Verifications lock the profiles they update (GameService.lock_profiles), so
+                # holding every profile lock keeps them out until the rebuild is written
+                self.lock_profiles()
+
+            games = self.load_games(chunk_size)
+            state = self.replay(games)
+            replayed = time.perf_counter()
+
+            profile_updates, profile_diffs = self.build_profile_updates(state, chunk_size)
+            game_updates = self.build_game_updates(games, state, since)
+            weekly_rows = self.build_weekly_rows(state, since)
+
+            self.report(profile_diffs, game_updates, weekly_rows, games, since, dry_run)
+
+            if not dry_run:
+                PlayerProfile.objects.bulk_update(
+                    profile_updates, PROFILE_FIELDS + ['updated_at'], batch_size=chunk_size
+                )
+                Game.objects.bulk_update(game_updates, GAME_FIELDS, batch_size=chunk_size)
+                self.weekly_queryset(since).delete()
+                WeeklyLeaderboard.objects.bulk_create(weekly_rows, batch_size=chunk_size)
+                self.history_queryset(since).delete()
+                self.write_rating_history(games, state, since, chunk_size)
+                RankingsService.invalidate_on_commit()
+
+        finished = time.perf_counter()
+        total = len(games['id'])
+        replay_rate = total / (replayed - started) if replayed > started else 0
+        overall_rate = total / (finished - started) if finished > started else 0
+        self.stdout.write(
+            f'Replayed {total} games in {replayed - started:.2f}s ({replay_rate:,.0f} games/sec), '
+            f'total {finished - started:.2f}s ({overall_rate:,.0f} games/sec)'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING('[DRY RUN] No changes were written'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Ratings rebuilt successfully'))
+
+    def parse_since(self, value):
+        """Parse --since as a date or datetime, returning an aware datetime"""
+        if not value:
+            return None
+
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'Invalid --since value: {value}')
+            parsed = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    def lock_profiles(self):
+        """Lock every player profile for the rest of the transaction, in primary key order like verifications"""
+        list(PlayerProfile.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+    def load_games(self, chunk_size):
+        """Stream verified games in play order into flat column arrays"""
+        columns = {
+            'id': [], 'game_type': [], 'winner': [], 'played_at': [], 'verified_at': [],
+            'player1': [], 'player2': [],
+            'team1_player1': [], 'team1_player2': [], 'team2_player1': [], 'team2_player2': [],
+            'stored': [],
+        }
+
+        queryset = Game.objects.filter(status='verified').order_by(
+            'played_at', 'reported_at', 'id'
+        ).values_list(
+            'id', 'game_type', 'winner', 'played_at', 'verified_at',
+            'player1_id', 'player2_id',
+            'team1_player1_id', 'team1_player2_id', 'team2_player1_id', 'team2_player2_id',
+            *GAME_FIELDS
+        )
+
+        for row in queryset.iterator(chunk_size=chunk_size):
+            columns['id'].append(row[0])
+            columns['game_type'].append(row[1])
+            columns['winner'].append(row[2])
+            columns['played_at'].append(row[3])
+            columns['verified_at'].append(row[4])
+            columns['player1'].append(row[5])
+            columns['player2'].append(row[6])
+            columns['team1_player1'].append(row[7])
+            columns['team1_player2'].append(row[8])
+            columns['team2_player1'].append(row[9])
+            columns['team2_player2'].append(row[10])
+            columns['stored'].append(row[11:])
+
+        return columns
+
+    def replay(self, games):
+        """Replay all games in memory and return the derived per-player state"""
+        index = {}
+
+        def player_index(user_id):
+            if user_id not in index:
+                index[user_id] = len(index)
+            return index[user_id]
+
+        singles = []
+        doubles = []
+        for i, game_type in enumerate(games['game_type']):
+            if game_type == 'singles':
+                singles.append(i)
+                player_index(games['player1'][i])
+                player_index(games['player2'][i])
+            else:
+                doubles.append(i)
+                for slot in ('team1_player1', 'team1_player2', 'team2_player1', 'team2_player2'):
+                    player_index(games[slot][i])
+
+        count = len(index)
+        singles_default = PlayerProfile._meta.get_field('singles_elo').default
+        doubles_default = PlayerProfile._meta.get_field('doubles_elo').default
+        singles_elo = [singles_default] * count
+        doubles_elo = [doubles_default] * count
+        singles_games = [0] * count
+        doubles_games = [0] * count
+
+        # Ratings for each game type are independent, so replay them as two streams
+        singles_result = ELOCalculator.replay_singles(
+            [index[games['player1'][i]] for i in singles],
+            [index[games['player2'][i]] for i in singles],
+            [games['winner'][i] == 'player1' for i in singles],
+            singles_elo,
+            singles_games
+        )
+        doubles_result = ELOCalculator.replay_doubles(
+            [index[games['team1_player1'][i]] for i in doubles],
+            [index[games['team1_player2'][i]] for i in doubles],
+            [index[games['team2_player1'][i]] for i in doubles],
+            [index[games['team2_player2'][i]] for i in doubles],
+            [games['winner'][i] == 'team1' for i in doubles],
+            doubles_elo,
+            doubles_games
+        )
+
+        state = {
+            'index': index,
+            'singles_elo': singles_elo,
+            'doubles_elo': doubles_elo,
+            'singles_games': singles_games,
+            'doubles_games': doubles_games,
+            'peak_singles': [PlayerProfile._meta.get_field('peak_singles_elo').default] * count,
+            'peak_doubles': [PlayerProfile._meta.get_field('peak_doubles_elo').default] * count,
+            'peak_singles_date': [None] * count,
+            'peak_doubles_date': [None] * count,
+            'singles_wins': [0] * count,
+            'singles_losses': [0] * count,
+            'doubles_wins': [0] * count,
+            'doubles_losses': [0] * count,
+            'total_points': [0] * count,
+            'current_streak': [0] * count,
+            'longest_streak': [0] * count,
+            'weekly': {},
+            'game_results': {},
+        }
+
+        for position, i in enumerate(singles):
+            state['game_results'][i] = tuple(column[position] for column in singles_result)
+        for position, i in enumerate(doubles):
+            state['game_results'][i] = tuple(column[position] for column in doubles_result)
+
+        self.accumulate(games, state)
+        return state
+
+    def accumulate(self, games, state):
+        """
+        Walk games in play order to derive peaks, records, points and streaks
+        Points and streaks follow the same rules as GameService.process_verified_game
+        """
+        index = state['index']
+        last_played = [None] * len(index)
+        weekly = state['weekly']
+        streak = state['current_streak']
+        longest = state['longest_streak']
+
+        def touch_streak(p, day):
+            streak[p] = GameService.next_streak(streak[p], last_played[p], day)
+            last_played[p] = day
+            if streak[p] > longest[p]:
+                longest[p] = streak[p]
+
+        def award(p, points, won, week_key):
+            state['total_points'][p] += points
+            entry = weekly.setdefault((p, week_key), [0, 0, 0])
+            entry[0] += points
+            entry[1] += 1
+            if won:
+                entry[2] += 1
+
+        for i, game_type in enumerate(games['game_type']):
+            played_at = games['played_at'][i]
+            peak_date = games['verified_at'][i] or played_at
+            week_key = GameService.week_key(played_at)
+            result = state['game_results'][i]
+
+            if game_type == 'singles':
+                p1 = index[games['player1'][i]]
+                p2 = index[games['player2'][i]]
+                _, _, after1, after2, elo_change = result
+
+                for p, rating in ((p1, after1), (p2, after2)):
+                    if rating > state['peak_singles'][p]:
+                        state['peak_singles'][p] = rating
+                        state['peak_singles_date'][p] = peak_date
+
+                if games['winner'][i] == 'player1':
+                    winner, loser, winner_after, loser_after = p1, p2, after1, after2
+                else:
+                    winner, loser, winner_after, loser_after = p2, p1, after2, after1
+                state['singles_wins'][winner] += 1
+                state['singles_losses'][loser] += 1
+
+                # Same pre-game ELO approximation as GameService.process_verified_game
+                winner_points, loser_points = PointsCalculator.calculate_game_points(
+                    winner_after - elo_change, loser_after + elo_change, streak[winner]
+                )
+                award(winner, winner_points, True, week_key)
+                award(loser, loser_points, False, week_key)
+                players = (p1, p2)
+            else:
+                players = tuple(
+                    index[games[slot][i]]
+                    for slot in ('team1_player1', 'team1_player2', 'team2_player1', 'team2_player2')
+                )
+                before, after, _ = result
+
+                for p, rating in zip(players, after):
+                    if rating > state['peak_doubles'][p]:
+                        state['peak_doubles'][p] = rating
+                        state['peak_doubles_date'][p] = peak_date
+
+                team1_won = games['winner'][i] == 'team1'
+                if team1_won:
+                    winners, losers = players[:2], players[2:]
+                    winner_avg, loser_avg = sum(before[:2]) / 2, sum(before[2:]) / 2
+                else:
+                    winners, losers = players[2:], players[:2]
+                    winner_avg, loser_avg = sum(before[2:]) / 2, sum(before[:2]) / 2
+
+                for p in winners:
+                    state['doubles_wins'][p] += 1
+                    winner_points, _ = PointsCalculator.calculate_game_points(
+                        winner_avg, loser_avg, streak[p]
+                    )
+                    award(p, winner_points, True, week_key)
+                for p in losers:
+                    state['doubles_losses'][p] += 1
+                    _, loser_points = PointsCalculator.calculate_game_points(
+                        winner_avg, loser_avg, streak[p]
+                    )
+                    award(p, loser_points, False, week_key)
+
+            for p in players:
+                touch_streak(p, timezone.localdate(played_at))
+
+    def build_profile_updates(self, state, chunk_size):
+        """Apply rebuilt state to every profile, returning changed profiles and their diffs"""
+        index = state['index']
+        now = timezone.now()
+        current_week = GameService.week_key(now)
+
+        updates = []
+        diffs = []
+        for profile in PlayerProfile.objects.select_related('user').iterator(chunk_size=chunk_size):
+            p = index.get(profile.user_id)
+            if p is None:
+                values = {field: PlayerProfile._meta.get_field(field).default for field in PROFILE_FIELDS}
+                values['peak_singles_date'] = None
+                values['peak_doubles_date'] = None
+            else:
+                # weekly_points mirrors the current week's leaderboard row, as in GameService
+                weekly = state['weekly'].get((p, current_week))
+                values = {
+                    'singles_elo': state['singles_elo'][p],
+                    'doubles_elo': state['doubles_elo'][p],
+                    'peak_singles_elo': state['peak_singles'][p],
+                    'peak_doubles_elo': state['peak_doubles'][p],
+                    'peak_singles_date': state['peak_singles_date'][p],
+                    'peak_doubles_date': state['peak_doubles_date'][p],
+                    'singles_games_played': state['singles_games'][p],
+                    'doubles_games_played': state['doubles_games'][p],
+                    'singles_wins': state['singles_wins'][p],
+                    'singles_losses': state['singles_losses'][p],
+                    'doubles_wins': state['doubles_wins'][p],
+                    'doubles_losses': state['doubles_losses'][p],
+                    'weekly_points': weekly[0] if weekly else 0,
+                    'total_points': state['total_points'][p],
+                    'current_streak': state['current_streak'][p],
+                    'longest_streak': state['longest_streak'][p],
+                }
+
+            for field in ('peak_singles_date', 'peak_doubles_date'):
+                # Only the day is compared, keep the stored time when it matches
+                stored = getattr(profile, field)
+                if stored and values[field] and timezone.localdate(stored) == timezone.localdate(values[field]):
+                    values[field] = stored
+
+            changed = {
+                field: (getattr(profile, field), value)
+                for field, value in values.items()
+                if getattr(profile, field) != value
+            }
+            if changed:
+                for field, value in values.items():
+                    setattr(profile, field, value)
+                profile.updated_at = now
+                updates.append(profile)
+                diffs.append((profile, changed))
+
+        return updates, diffs
+
+    def build_game_updates(self, games, state, since):
+        """Build Game instances for rows whose stored rating columns are out of date"""
+        updates = []
+        for i, game_id in enumerate(games['id']):
+            if since and games['played_at'][i] < since:
+                continue
+
+            result = state['game_results'][i]
+            if games['game_type'][i] == 'singles':
+                values = tuple(result) + (None,) * 8
+            else:
+                before, after, elo_change = result
+                values = (None, None, None, None, elo_change) + tuple(before) + tuple(after)
+
+            if tuple(games['stored'][i]) != tuple(values):
+                updates.append(Game(pk=game_id, **dict(zip(GAME_FIELDS, values))))
+
+        return updates
+
+    def build_weekly_rows(self, state, since):
+        """Build ranked WeeklyLeaderboard rows for every rebuilt week"""
+        players = {p: user_id for user_id, p in state['index'].items()}
+        since_week = GameService.week_key(since) if since else None
+
+        weeks = {}
+        for (p, week_key), entry in state['weekly'].items():
+            if since_week and week_key < since_week:
+                continue
+            weeks.setdefault(week_key, []).append((p, entry))
+
+        rows = []
+        for (year, week_number), entries in sorted(weeks.items()):
+            totals = {p: entry for p, entry in entries}
+            ranked = PointsCalculator.calculate_weekly_rank(
+                [(p, entry[0]) for p, entry in entries]
+            )
+            for p, points, rank in ranked:
+                rows.append(WeeklyLeaderboard(
+                    player_id=players[p],
+                    year=year,
+                    week_number=week_number,
+                    points=points,
+                    games_played=totals[p][1],
+                    games_won=totals[p][2],
+                    rank=rank,
+                ))
+
+        return rows
+
+    def weekly_queryset(self, since):
+        """WeeklyLeaderboard rows replaced by the rebuild"""
+        if not since:
+            return WeeklyLeaderboard.objects.all()
+        year, week_number = GameService.week_key(since)
+        return WeeklyLeaderboard.objects.filter(
+            Q(year__gt=year) | Q(year=year, week_number__gte=week_number)
+        )
+
+    def history_queryset(self, since):
+        """RatingHistory rows replaced by the rebuild"""
+        if not since:
+            return RatingHistory.objects.all()
+        return RatingHistory.objects.filter(timestamp__gte=since)
+
+    def write_rating_history(self, games, state, since, chunk_size):
+        """Recreate RatingHistory rows for every rebuilt game, one chunk at a time"""
+        batch = []
+        for i, game_id in enumerate(games['id']):
+            played_at = games['played_at'][i]
+            if since and played_at < since:
+                continue
+
+            game_type = games['game_type'][i]
+            result = state['game_results'][i]
+            if game_type == 'singles':
+                before1, before2, after1, after2, _ = result
+                entries = (
+                    (games['player1'][i], before1, after1),
+                    (games['player2'][i], before2, after2),
+                )
+            else:
+                before, after, _ = result
+                entries = zip(
+                    (games[slot][i] for slot in ('team1_player1', 'team1_player2', 'team2_player1', 'team2_player2')),
+                    before,
+                    after
+                )
+
+            for user_id, rating_before, rating_after in entries:
+                batch.append(RatingHistory(
+                    player_id=user_id,
+                    game_id=game_id,
+                    game_type=game_type,
+                    rating_before=rating_before,
+                    rating_after=rating_after,
+                    timestamp=played_at,
+                ))
+
+            if len(batch) >= chunk_size:
+                RatingHistory.objects.bulk_create(batch)
+                batch = []
+
+        if batch:
+            RatingHistory.objects.bulk_create(batch)
+
+    def report(self, profile_diffs, game_updates, weekly_rows, games, since, dry_run):
+        """Print a summary, plus a per-player diff report for dry runs"""
+        if dry_run:
+            for profile, changed in profile_diffs:
+                self.stdout.write(f'{profile.user.username}:')
+                for field, (old, new) in changed.items():
+                    self.stdout.write(f'  - {field}: {old} -> {new}')
+
+        self.stdout.write(f'Profiles changed: {len(profile_diffs)}')
+        self.stdout.write(f'Games with corrected ratings: {len(game_updates)}')
+        self.stdout.write(
+            f'Weekly leaderboard rows: {self.weekly_queryset(since).count()} replaced by {len(weekly_rows)}'
+        )
+        rebuilt_games = sum(1 for played_at in games['played_at'] if not since or played_at >= since)
+        self.stdout.write(
+            f'Rating history rows: {self.history_queryset(since).count()} replaced for {rebuilt_games} games'
+        )
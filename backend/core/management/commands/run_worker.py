@@ -0,0 +1,64 @@
+"""
+Management command to run background jobs from the Job table
+"""
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (trophy checks, admin emails)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run the jobs that are due now and exit instead of polling'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Jobs claimed per round (default: 20)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write('Worker started')
+        succeeded = failed = 0
+        while not self.stopping:
+            close_old_connections()
+            claimed = jobs.claim_jobs(options['batch_size'])
+            for position, job in enumerate(claimed):
+                if self.stopping:
+                    # Don't leave the rest running until JOBS_LOCK_TIMEOUT
+                    jobs.release_jobs(claimed[position:])
+                    break
+                if jobs.execute(job):
+                    succeeded += 1
+                else:
+                    failed += 1
+
+            if not claimed:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped: {succeeded} jobs succeeded, {failed} failed'))
+
+    def stop(self, signum, frame):
+        # Finish the current job, then exit
+        self.stopping = True
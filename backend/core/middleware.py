@@ -0,0 +1,40 @@
+"""
+Middleware for the Ping Pong Tracker
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import jobs
+
+
+class InlineJobsMiddleware:
+    """
+    Run due background jobs after a request when there is no worker (JOBS_RUN_INLINE)
+    enqueue() runs jobs that are due straight away; this picks up the rest -
+    delayed jobs such as digest flushes and the retries of failed jobs - at
+    most once every JOBS_INLINE_SWEEP_INTERVAL seconds per process.
+    """
+
+    def __init__(self, get_response):
+        if not settings.JOBS_RUN_INLINE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.last_sweep = 0
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        now = time.monotonic()
+        if now - self.last_sweep >= settings.JOBS_INLINE_SWEEP_INTERVAL and self.lock.acquire(blocking=False):
+            try:
+                self.last_sweep = now
+                jobs.run_due_jobs()
+            except Exception as e:
+                print(f"[JOBS] Error running due jobs: {e}")
+            finally:
+                self.lock.release()
+        return response
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_add_firebase_uid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='team1_player1_elo_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team1_player1_elo_before',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team1_player2_elo_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team1_player2_elo_before',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team2_player1_elo_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team2_player1_elo_before',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team2_player2_elo_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='team2_player2_elo_before',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:40
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_doubles_elo_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingHistory',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('game_type', models.CharField(choices=[('singles', 'Singles'), ('doubles', 'Doubles')], max_length=10)),
+                ('rating_before', models.IntegerField()),
+                ('rating_after', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_history', to='core.game')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_history', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['timestamp'],
+                'indexes': [models.Index(fields=['player', 'game_type', 'timestamp'], name='rating_history_player_idx')],
+                'unique_together': {('player', 'game')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_ratinghistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameParticipant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('side', models.PositiveSmallIntegerField()),
+                ('slot', models.PositiveSmallIntegerField()),
+                ('played_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending Verification'), ('verified', 'Verified'), ('disputed', 'Disputed'), ('resolved', 'Admin Resolved'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='core.game')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_participations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'status', 'played_at'], name='game_participant_user_idx')],
+                'unique_together': {('game', 'user')},
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+PARTICIPANT_SLOTS = [
+    ('player1', 1, 1),
+    ('player2', 2, 1),
+    ('team1_player1', 1, 1),
+    ('team1_player2', 1, 2),
+    ('team2_player1', 2, 1),
+    ('team2_player2', 2, 2),
+]
+
+BATCH_SIZE = 2000
+
+
+def backfill_participants(apps, schema_editor):
+    Game = apps.get_model('core', 'Game')
+    GameParticipant = apps.get_model('core', 'GameParticipant')
+
+    columns = [f'{field}_id' for field, side, slot in PARTICIPANT_SLOTS]
+    games = Game.objects.order_by().values_list('id', 'played_at', 'status', *columns)
+
+    batch = []
+    for game_id, played_at, status, *players in games.iterator(chunk_size=BATCH_SIZE):
+        for (field, side, slot), user_id in zip(PARTICIPANT_SLOTS, players):
+            if user_id:
+                batch.append(GameParticipant(
+                    game_id=game_id,
+                    user_id=user_id,
+                    side=side,
+                    slot=slot,
+                    played_at=played_at,
+                    status=status,
+                ))
+        if len(batch) >= BATCH_SIZE:
+            GameParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+
+    if batch:
+        GameParticipant.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_gameparticipant'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_backfill_gameparticipants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['status', '-played_at'], name='game_status_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-played_at'], name='game_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notification_recipient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['recipient'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerprofile',
+            index=models.Index(condition=models.Q(('singles_games_played__gte', 1)), fields=['-singles_elo'], name='profile_singles_ranked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerprofile',
+            index=models.Index(condition=models.Q(('doubles_games_played__gte', 1)), fields=['-doubles_elo'], name='profile_doubles_ranked_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='playerprofile',
+            index=models.Index(fields=['-weekly_points'], name='profile_weekly_points_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['status'], name='tournament_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weeklyleaderboard',
+            index=models.Index(fields=['year', 'week_number', '-points'], name='weekly_leaderboard_week_idx'),
+        ),
+    ]
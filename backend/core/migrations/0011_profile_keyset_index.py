@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='playerprofile',
+            index=models.Index(fields=['-singles_elo', '-id'], name='profile_singles_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+def remove_duplicate_milestones(apps, schema_editor):
+    """Keep the earliest of any duplicate milestone trophies so the constraint can be added"""
+    Trophy = apps.get_model('core', 'Trophy')
+
+    seen = set()
+    duplicates = []
+    trophies = (
+        Trophy.objects.filter(week_number__isnull=True)
+        .order_by('earned_at')
+        .values_list('id', 'player_id', 'trophy_type', 'value')
+    )
+    for trophy_id, player_id, trophy_type, value in trophies.iterator():
+        key = (player_id, trophy_type, value)
+        if key in seen:
+            duplicates.append(trophy_id)
+        else:
+            seen.add(key)
+
+    if duplicates:
+        Trophy.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_outboundemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_milestones, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trophy',
+            constraint=models.UniqueConstraint(condition=models.Q(('week_number__isnull', True)), fields=('player', 'trophy_type', 'value'), name='trophy_milestone_unique'),
+        ),
+    ]
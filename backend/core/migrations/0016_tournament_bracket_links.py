@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-16 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_trophy_milestone_unique'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='tournamentmatch',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='tournamentmatch',
+            name='bracket',
+            field=models.CharField(choices=[('winners', 'Winners Bracket'), ('losers', 'Losers Bracket'), ('grand_final', 'Grand Final'), ('round_robin', 'Round Robin'), ('swiss', 'Swiss')], default='winners', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='tournamentmatch',
+            name='loser_next_match',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='previous_losing_matches', to='core.tournamentmatch'),
+        ),
+        migrations.AddField(
+            model_name='tournamentmatch',
+            name='loser_next_match_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='tournamentmatch',
+            name='next_match_slot',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tournamentmatch',
+            unique_together={('tournament', 'bracket', 'round_number', 'match_number')},
+        ),
+    ]
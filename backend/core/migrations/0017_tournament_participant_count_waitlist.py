@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-16 21:12
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def count_participants(apps, schema_editor):
+    """Fill participant_count from the participants of existing tournaments"""
+    Tournament = apps.get_model('core', 'Tournament')
+
+    counts = Tournament.objects.annotate(joined=models.Count('participants')).filter(joined__gt=0)
+    for tournament_id, joined in counts.values_list('id', 'joined').iterator():
+        Tournament.objects.filter(id=tournament_id).update(participant_count=joined)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_tournament_bracket_links'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='participant_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('game_verification', 'Game Needs Verification'), ('game_verified', 'Game Verified'), ('game_disputed', 'Game Disputed'), ('game_resolved', 'Game Resolved'), ('tournament_invite', 'Tournament Invitation'), ('tournament_start', 'Tournament Starting'), ('tournament_waitlist', 'Tournament Spot Available'), ('match_scheduled', 'Match Scheduled'), ('account_approved', 'Account Approved'), ('achievement', 'New Achievement'), ('admin_alert', 'Admin Alert')], max_length=30),
+        ),
+        migrations.CreateModel(
+            name='TournamentWaitlistEntry',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='core.tournament')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tournament_waitlist_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'unique_together': {('tournament', 'user')},
+            },
+        ),
+    ]
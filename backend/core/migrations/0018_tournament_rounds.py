@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:50
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_tournament_participant_count_waitlist'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='rounds',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
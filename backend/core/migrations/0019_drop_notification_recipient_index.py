@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_tournament_rounds'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='notification_recipient_idx',
+        ),
+    ]
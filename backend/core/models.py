@@ -62,6 +62,12 @@ class User(AbstractUser):
         return timezone.now() < self.verification_code_created + timedelta(minutes=10)
 
 
+class PlayerProfileQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load the user rendered by PlayerProfileSerializer in the same query"""
+        return self.select_related('user')
+
+
 class PlayerProfile(models.Model):
     """Extended profile for ping pong players"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -102,8 +108,24 @@ class PlayerProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PlayerProfileQuerySet.as_manager()
+
     class Meta:
         ordering = ['-singles_elo']
+        indexes = [
+            # Rankings only list players with at least one game
+            models.Index(
+                fields=['-singles_elo'], condition=models.Q(singles_games_played__gte=1),
+                name='profile_singles_ranked_idx'
+            ),
+            models.Index(
+                fields=['-doubles_elo'], condition=models.Q(doubles_games_played__gte=1),
+                name='profile_doubles_ranked_idx'
+            ),
+            models.Index(fields=['-weekly_points'], name='profile_weekly_points_idx'),
+            # Keyset pagination of the full player list
+            models.Index(fields=['-singles_elo', '-id'], name='profile_singles_keyset_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.display_name}'s Profile"
@@ -123,6 +145,16 @@ class PlayerProfile(models.Model):
         return (self.doubles_wins / total) * 100
 
 
+class GameQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load every user rendered by GameSerializer in the same query"""
+        return self.select_related(
+            'player1', 'player2', 'team1_player1', 'team1_player2',
+            'team2_player1', 'team2_player2', 'reported_by', 'verified_by',
+            'disputed_by', 'resolved_by'
+        )
+
+
 class Game(models.Model):
     """Model for individual ping pong games"""
     GAME_TYPES = [
@@ -181,12 +213,79 @@ class Game(models.Model):
     player2_elo_after = models.IntegerField(null=True, blank=True)
     elo_change = models.IntegerField(null=True, blank=True)  # Absolute value of change
 
+    # Doubles ELO changes (doubles_elo of each team player)
+    team1_player1_elo_before = models.IntegerField(null=True, blank=True)
+    team1_player2_elo_before = models.IntegerField(null=True, blank=True)
+    team2_player1_elo_before = models.IntegerField(null=True, blank=True)
+    team2_player2_elo_before = models.IntegerField(null=True, blank=True)
+    team1_player1_elo_after = models.IntegerField(null=True, blank=True)
+    team1_player2_elo_after = models.IntegerField(null=True, blank=True)
+    team2_player1_elo_after = models.IntegerField(null=True, blank=True)
+    team2_player2_elo_after = models.IntegerField(null=True, blank=True)
+
     # Additional metadata
     tournament = models.ForeignKey('Tournament', on_delete=models.SET_NULL, null=True, blank=True, related_name='games')
     notes = models.TextField(blank=True)
 
+    objects = GameQuerySet.as_manager()
+
+    # Player columns and their (side, slot) in GameParticipant
+    PARTICIPANT_SLOTS = [
+        ('player1', 1, 1),
+        ('player2', 2, 1),
+        ('team1_player1', 1, 1),
+        ('team1_player2', 1, 2),
+        ('team2_player1', 2, 1),
+        ('team2_player2', 2, 2),
+    ]
+
     class Meta:
         ordering = ['-played_at']
+        indexes = [
+            models.Index(fields=['status', '-played_at'], name='game_status_played_idx'),
+            models.Index(fields=['-played_at', '-id'], name='game_played_keyset_idx'),
+            models.Index(
+                fields=['-played_at'], condition=models.Q(status='pending'),
+                name='game_pending_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+
+        # Keep the participation table in step with the players, status and date
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.sync_participants()
+        else:
+            update_fields = set(update_fields)
+            player_fields = {field for field, side, slot in self.PARTICIPANT_SLOTS}
+            if update_fields & player_fields:
+                self.sync_participants()
+            elif update_fields & {'status', 'played_at'}:
+                self.sync_participants(players_changed=False)
+
+    def sync_participants(self, players_changed=True):
+        """Rewrite this game's GameParticipant rows"""
+        if not players_changed:
+            GameParticipant.objects.filter(game=self).update(
+                status=self.status, played_at=self.played_at
+            )
+            return
+
+        GameParticipant.objects.filter(game=self).delete()
+        GameParticipant.objects.bulk_create([
+            GameParticipant(
+                game=self,
+                user_id=getattr(self, f'{field}_id'),
+                side=side,
+                slot=slot,
+                played_at=self.played_at,
+                status=self.status
+            )
+            for field, side, slot in self.PARTICIPANT_SLOTS
+            if getattr(self, f'{field}_id')
+        ], ignore_conflicts=True)
 
     def __str__(self):
         if self.game_type == 'singles':
@@ -232,6 +331,30 @@ class Game(models.Model):
         return 'team2'
 
 
+class GameParticipant(models.Model):
+    """
+    One row per player per game, denormalized from the Game player columns
+    Lets "games for a player" queries use a single index instead of a six-way OR
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='participants')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_participations')
+    side = models.PositiveSmallIntegerField()  # 1 = player1/team1, 2 = player2/team2
+    slot = models.PositiveSmallIntegerField()  # Position within the team (always 1 for singles)
+
+    # Copied from the game so filters and ordering don't need the join
+    played_at = models.DateTimeField()
+    status = models.CharField(max_length=20, choices=Game.GAME_STATUS)
+
+    class Meta:
+        unique_together = [['game', 'user']]
+        indexes = [
+            models.Index(fields=['user', 'status', 'played_at'], name='game_participant_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.display_name} in {self.game}"
+
+
 class GameComment(models.Model):
     """Comments/chat for games"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -277,6 +400,14 @@ class Trophy(models.Model):
     class Meta:
         ordering = ['-earned_at']
         unique_together = [['player', 'trophy_type', 'week_number', 'year']]
+        constraints = [
+            # Milestone trophies have no week, so the unique_together above doesn't cover them
+            models.UniqueConstraint(
+                fields=['player', 'trophy_type', 'value'],
+                condition=models.Q(week_number__isnull=True),
+                name='trophy_milestone_unique'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} - {self.player.display_name}"
@@ -301,11 +432,45 @@ class WeeklyLeaderboard(models.Model):
     class Meta:
         ordering = ['-year', '-week_number', '-points']
         unique_together = [['player', 'week_number', 'year']]
+        indexes = [
+            models.Index(fields=['year', 'week_number', '-points'], name='weekly_leaderboard_week_idx'),
+        ]
 
     def __str__(self):
         return f"{self.player.display_name} - Week {self.week_number}/{self.year}"
 
 
+class RatingHistory(models.Model):
+    """Rating of a player before and after each processed game"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    player = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rating_history')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='rating_history')
+    game_type = models.CharField(max_length=10, choices=Game.GAME_TYPES)
+
+    rating_before = models.IntegerField()
+    rating_after = models.IntegerField()
+
+    timestamp = models.DateTimeField()  # When the game was played
+
+    class Meta:
+        ordering = ['timestamp']
+        unique_together = [['player', 'game']]
+        indexes = [
+            models.Index(fields=['player', 'game_type', 'timestamp'], name='rating_history_player_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.player.display_name} - {self.rating_before} -> {self.rating_after}"
+
+
+class TournamentQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load the users and participants rendered by TournamentSerializer"""
+        return self.select_related(
+            'created_by', 'approved_by', 'first_place', 'second_place', 'third_place'
+        ).prefetch_related('participants')
+
+
 class Tournament(models.Model):
     """Tournament model for bracket-style competitions"""
     TOURNAMENT_STATUS = [
@@ -335,6 +500,10 @@ class Tournament(models.Model):
     # Participants
     max_participants = models.IntegerField(validators=[MinValueValidator(4)])
     participants = models.ManyToManyField(User, related_name='tournaments', blank=True)
+    # Kept in step with participants, so a join claims a spot with one conditional UPDATE
+    participant_count = models.PositiveIntegerField(default=0)
+    # Swiss rounds to play, blank for enough rounds to separate a single leader
+    rounds = models.PositiveSmallIntegerField(null=True, blank=True, validators=[MinValueValidator(1)])
 
     # Admin approval
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tournaments')
@@ -356,13 +525,26 @@ class Tournament(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     approved_at = models.DateTimeField(null=True, blank=True)
 
+    objects = TournamentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-tournament_start']
+        indexes = [
+            models.Index(fields=['status'], name='tournament_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_status_display()})"
 
 
+class TournamentMatchQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load the players and games rendered by TournamentMatchSerializer"""
+        return self.select_related('player1', 'player2', 'winner').prefetch_related(
+            models.Prefetch('games', queryset=Game.objects.with_related())
+        )
+
+
 class TournamentMatch(models.Model):
     """Individual matches within a tournament"""
     MATCH_STATUS = [
@@ -372,8 +554,17 @@ class TournamentMatch(models.Model):
         ('bye', 'Bye'),
     ]
 
+    BRACKETS = [
+        ('winners', 'Winners Bracket'),
+        ('losers', 'Losers Bracket'),
+        ('grand_final', 'Grand Final'),
+        ('round_robin', 'Round Robin'),
+        ('swiss', 'Swiss'),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='matches')
+    bracket = models.CharField(max_length=20, choices=BRACKETS, default='winners')
     round_number = models.IntegerField()
     match_number = models.IntegerField()
 
@@ -386,20 +577,47 @@ class TournamentMatch(models.Model):
     # Link to the actual game(s)
     games = models.ManyToManyField(Game, related_name='tournament_matches', blank=True)
 
-    # For bracket positioning
+    # For bracket positioning - the winner (and in double elimination the loser)
+    # moves on to the given player slot (1 or 2) of the linked match
     next_match = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='previous_matches')
+    next_match_slot = models.PositiveSmallIntegerField(null=True, blank=True)
+    loser_next_match = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='previous_losing_matches')
+    loser_next_match_slot = models.PositiveSmallIntegerField(null=True, blank=True)
 
     scheduled_time = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = TournamentMatchQuerySet.as_manager()
+
     class Meta:
         ordering = ['round_number', 'match_number']
-        unique_together = [['tournament', 'round_number', 'match_number']]
+        unique_together = [['tournament', 'bracket', 'round_number', 'match_number']]
 
     def __str__(self):
         return f"{self.tournament.name} - Round {self.round_number}, Match {self.match_number}"
 
 
+class TournamentWaitlistEntry(models.Model):
+    """A user waiting for a spot in a full tournament, first come first served"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='waitlist')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tournament_waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        unique_together = [['tournament', 'user']]
+
+    def __str__(self):
+        return f"{self.user.display_name} waiting for {self.tournament.name}"
+
+
+class NotificationQuerySet(models.QuerySet):
+    def with_related(self):
+        """Load the users rendered by NotificationSerializer in the same query"""
+        return self.select_related('recipient', 'related_user')
+
+
 class Notification(models.Model):
     """Notifications for users"""
     NOTIFICATION_TYPES = [
@@ -409,6 +627,7 @@ class Notification(models.Model):
         ('game_resolved', 'Game Resolved'),
         ('tournament_invite', 'Tournament Invitation'),
         ('tournament_start', 'Tournament Starting'),
+        ('tournament_waitlist', 'Tournament Spot Available'),
         ('match_scheduled', 'Match Scheduled'),
         ('account_approved', 'Account Approved'),
         ('achievement', 'New Achievement'),
@@ -431,8 +650,86 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     read_at = models.DateTimeField(null=True, blank=True)
 
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # The list, newest first; any other lookup by recipient can use its prefix
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_keyset_idx'),
+            # Unread counts and mark all read, only covers the few unread rows
+            models.Index(
+                fields=['recipient'], condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.notification_type} - {self.recipient.display_name}"
+
+
+class Job(models.Model):
+    """Background job run by the run_worker management command"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Enqueueing the same key twice only creates one job
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    last_error = models.TextField(blank=True)
+
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+class OutboundEmail(models.Model):
+    """Queued email, sent in batches by the email.flush job"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    recipients = models.JSONField(default=list)
+    # Digest emails to the same recipients are combined into one message per interval
+    digest = models.BooleanField(default=False)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.notification_type} - {self.recipient.display_name}"
\ No newline at end of file
+        return f"{self.subject} ({self.status})"
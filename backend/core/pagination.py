@@ -0,0 +1,180 @@
+"""
+Pagination classes for the Ping Pong Tracker API
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed ordering
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page instead of an OFFSET, so deep pages cost the same as the first one
+    and no COUNT(*) is needed. The last ordering field must be unique.
+    Previous pages are fetched the same way, reading backwards from the first
+    row of the current page.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    page_number_class = None
+    page_query_param = 'page'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number_paginator = None
+        if self.page_number_class and self.page_query_param in request.query_params:
+            self.page_number_paginator = self.page_number_class()
+            return self.page_number_paginator.paginate_queryset(
+                queryset.order_by(*self.ordering), request, view
+            )
+
+        page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self.filter_after(position, ordering))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether there is a page beyond this one
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            # Read backwards from a page, so that page still comes after this one
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        self.previous_position = self.next_position = position
+        if results:
+            self.previous_position = self.get_position(results[0])
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.previous_position, reverse=True)
+        )
+
+    def get_position(self, instance):
+        """Values of the ordering fields for a row"""
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def reversed_ordering(self):
+        return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+
+    def filter_after(self, position, ordering=None):
+        """
+        Filter for rows strictly after the given position in the ordering
+        (a, b) after (x, y) means a > x OR (a = x AND b > y), with the
+        comparison flipped for descending fields
+        """
+        ordering = ordering or self.ordering
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        # Redundant bound on the leading field - the planner can't seek an
+        # index on the OR above alone and would scan it from the start
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+
+    def encode_cursor(self, position, reverse=False):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        # UUIDs and other values are sent as strings, the model fields parse them back
+        payload = json.dumps({'position': values, 'reverse': reverse}, default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        """(position, reverse) of the request's cursor, (None, False) on the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        # Cursors used to be the bare position, always read forwards
+        if isinstance(payload, list):
+            payload = {'position': payload}
+        if not isinstance(payload, dict):
+            raise NotFound(self.invalid_cursor_message)
+        position, reverse = payload.get('position'), payload.get('reverse', False)
+        if not isinstance(position, list) or len(position) != len(self.ordering) or not isinstance(reverse, bool):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+
+class PlayerRankingPagination(KeysetPagination):
+    """Players ordered by singles ELO, highest first"""
+    ordering = ('-singles_elo', '-id')
+
+
+class GameCursorPagination(KeysetPagination):
+    """Games, most recently played first (?page= for the page-number UI)"""
+    ordering = ('-played_at', '-id')
+    page_number_class = PageNumberPagination
+
+
+class RatingHistoryPagination(KeysetPagination):
+    """Rating history buckets, oldest first, a year of days per page"""
+    ordering = ('bucket',)
+    page_size = 366
+    max_page_size = 1000
+
+
+class NotificationCursorPagination(KeysetPagination):
+    """Notifications, newest first (?page= for the page-number UI)"""
+    ordering = ('-created_at', '-id')
+    page_number_class = PageNumberPagination
@@ -98,7 +98,65 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'is_approved', 'phone_verified', 'email_verified', 'is_verified', 'is_staff', 'is_superuser']
 
 
-class PlayerProfileSerializer(serializers.ModelSerializer):
+class UserSummarySerializer(serializers.ModelSerializer):
+    """Compact user representation for nested relations"""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'display_name', 'avatar']
+        read_only_fields = fields
+
+
+class UserPublicSerializer(serializers.ModelSerializer):
+    """Public user details, without contact, verification or permission fields"""
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'display_name', 'bio', 'avatar', 'date_joined']
+        read_only_fields = fields
+
+
+def _query_param_set(request, name):
+    """Comma separated query parameter as a set of names"""
+    value = request.query_params.get(name, '')
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Sparse fieldsets for the top-level serializer of a GET response
+    ?fields=a,b keeps only the listed fields and ?expand=a,b swaps nested
+    user summaries for the public user details
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not self._is_root():
+            return fields
+
+        for name in _query_param_set(request, 'expand'):
+            field = fields.get(name)
+            if isinstance(field, UserSummarySerializer):
+                fields[name] = UserPublicSerializer(read_only=True)
+            elif isinstance(field, serializers.ListSerializer) and isinstance(field.child, UserSummarySerializer):
+                fields[name] = UserPublicSerializer(many=True, read_only=True)
+
+        only = _query_param_set(request, 'fields')
+        if only:
+            for name in list(fields):
+                if name not in only:
+                    del fields[name]
+        return fields
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+
+class PlayerProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for player profiles"""
     user = UserSerializer(read_only=True)
     singles_win_rate = serializers.ReadOnlyField()
@@ -124,12 +182,18 @@ class PlayerProfileSerializer(serializers.ModelSerializer):
 
 class GameReportSerializer(serializers.ModelSerializer):
     """Serializer for reporting a game"""
+    # Optional tournament match the game decides once it is verified
+    tournament_match = serializers.PrimaryKeyRelatedField(
+        queryset=TournamentMatch.objects.select_related('tournament'),
+        required=False, allow_null=True, write_only=True
+    )
+
     class Meta:
         model = Game
         fields = [
             'game_type', 'player1', 'player2', 'team1_player1', 'team1_player2',
             'team2_player1', 'team2_player2', 'player1_score', 'player2_score',
-            'winner', 'played_at', 'notes'
+            'winner', 'played_at', 'notes', 'tournament_match'
         ]
 
     def validate(self, data):
@@ -155,26 +219,53 @@ class GameReportSerializer(serializers.ModelSerializer):
             if len(players) != len(set(players)):
                 raise serializers.ValidationError("Same player cannot be on multiple teams")
 
+        match = data.get('tournament_match')
+        if match is not None:
+            self.validate_tournament_match_game(match, data)
+
         return data
 
+    def validate_tournament_match_game(self, match, data):
+        """The game has to be the one the match is waiting for"""
+        from .services import TournamentService
+
+        if match.tournament.status != 'in_progress' or match.status not in ('pending', 'in_progress'):
+            raise serializers.ValidationError("Tournament match is not open")
+        if not match.player1_id or not match.player2_id:
+            raise serializers.ValidationError("Tournament match is still waiting for its players")
+        if data.get('game_type') != match.tournament.game_type:
+            raise serializers.ValidationError(f"Tournament match requires a {match.tournament.game_type} game")
+        game = Game(**{field: value for field, value in data.items() if field != 'tournament_match'})
+        if TournamentService.game_result(match, game) is None:
+            raise serializers.ValidationError("Game players don't match the tournament match")
+
     def create(self, validated_data):
+        from .services import TournamentService
+
+        match = validated_data.pop('tournament_match', None)
         validated_data['reported_by'] = self.context['request'].user
         validated_data['status'] = 'pending'
-        return super().create(validated_data)
+        game = super().create(validated_data)
+
+        if match is not None:
+            match.games.add(game)
+            if TournamentMatch.objects.filter(pk=match.pk, status='pending').update(status='in_progress'):
+                TournamentService.invalidate_bracket_on_commit(match.tournament_id)
+        return game
 
 
-class GameSerializer(serializers.ModelSerializer):
+class GameSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Full game serializer"""
-    player1 = UserSerializer(read_only=True)
-    player2 = UserSerializer(read_only=True)
-    team1_player1 = UserSerializer(read_only=True)
-    team1_player2 = UserSerializer(read_only=True)
-    team2_player1 = UserSerializer(read_only=True)
-    team2_player2 = UserSerializer(read_only=True)
-    reported_by = UserSerializer(read_only=True)
-    verified_by = UserSerializer(read_only=True)
-    disputed_by = UserSerializer(read_only=True)
-    resolved_by = UserSerializer(read_only=True)
+    player1 = UserSummarySerializer(read_only=True)
+    player2 = UserSummarySerializer(read_only=True)
+    team1_player1 = UserSummarySerializer(read_only=True)
+    team1_player2 = UserSummarySerializer(read_only=True)
+    team2_player1 = UserSummarySerializer(read_only=True)
+    team2_player2 = UserSummarySerializer(read_only=True)
+    reported_by = UserSummarySerializer(read_only=True)
+    verified_by = UserSummarySerializer(read_only=True)
+    disputed_by = UserSummarySerializer(read_only=True)
+    resolved_by = UserSummarySerializer(read_only=True)
     needs_my_verification = serializers.SerializerMethodField()
 
     class Meta:
@@ -184,7 +275,10 @@ class GameSerializer(serializers.ModelSerializer):
             'id', 'status', 'reported_by', 'verified_by', 'disputed_by', 'resolved_by',
             'reported_at', 'verified_at', 'disputed_at', 'resolved_at',
             'player1_elo_before', 'player2_elo_before', 'player1_elo_after',
-            'player2_elo_after', 'elo_change'
+            'player2_elo_after', 'team1_player1_elo_before', 'team1_player2_elo_before',
+            'team2_player1_elo_before', 'team2_player2_elo_before', 'team1_player1_elo_after',
+            'team1_player2_elo_after', 'team2_player1_elo_after', 'team2_player2_elo_after',
+            'elo_change'
         ]
 
     def get_needs_my_verification(self, obj):
@@ -205,9 +299,9 @@ class GameVerificationSerializer(serializers.Serializer):
         return data
 
 
-class GameCommentSerializer(serializers.ModelSerializer):
+class GameCommentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for game comments"""
-    author = UserSerializer(read_only=True)
+    author = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = GameComment
@@ -219,9 +313,9 @@ class GameCommentSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TrophySerializer(serializers.ModelSerializer):
+class TrophySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for trophies"""
-    player = UserSerializer(read_only=True)
+    player = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = Trophy
@@ -229,9 +323,9 @@ class TrophySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class WeeklyLeaderboardSerializer(serializers.ModelSerializer):
+class WeeklyLeaderboardSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for weekly leaderboard"""
-    player = UserSerializer(read_only=True)
+    player = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = WeeklyLeaderboard
@@ -239,38 +333,34 @@ class WeeklyLeaderboardSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class TournamentSerializer(serializers.ModelSerializer):
+class TournamentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for tournaments"""
-    created_by = UserSerializer(read_only=True)
-    approved_by = UserSerializer(read_only=True)
-    participants = UserSerializer(many=True, read_only=True)
-    first_place = UserSerializer(read_only=True)
-    second_place = UserSerializer(read_only=True)
-    third_place = UserSerializer(read_only=True)
-    participant_count = serializers.SerializerMethodField()
+    created_by = UserSummarySerializer(read_only=True)
+    approved_by = UserSummarySerializer(read_only=True)
+    participants = UserSummarySerializer(many=True, read_only=True)
+    first_place = UserSummarySerializer(read_only=True)
+    second_place = UserSummarySerializer(read_only=True)
+    third_place = UserSummarySerializer(read_only=True)
 
     class Meta:
         model = Tournament
         fields = '__all__'
         read_only_fields = [
             'id', 'created_by', 'approved_by', 'created_at', 'updated_at',
-            'approved_at', 'first_place', 'second_place', 'third_place'
+            'approved_at', 'first_place', 'second_place', 'third_place', 'participant_count'
         ]
 
-    def get_participant_count(self, obj):
-        return obj.participants.count()
-
     def create(self, validated_data):
         validated_data['created_by'] = self.context['request'].user
         validated_data['status'] = 'pending_approval'
         return super().create(validated_data)
 
 
-class TournamentMatchSerializer(serializers.ModelSerializer):
+class TournamentMatchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for tournament matches"""
-    player1 = UserSerializer(read_only=True)
-    player2 = UserSerializer(read_only=True)
-    winner = UserSerializer(read_only=True)
+    player1 = UserSummarySerializer(read_only=True)
+    player2 = UserSummarySerializer(read_only=True)
+    winner = UserSummarySerializer(read_only=True)
     games = GameSerializer(many=True, read_only=True)
 
     class Meta:
@@ -279,10 +369,10 @@ class TournamentMatchSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'winner', 'completed_at']
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for notifications"""
-    recipient = UserSerializer(read_only=True)
-    related_user = UserSerializer(read_only=True)
+    recipient = UserSummarySerializer(read_only=True)
+    related_user = UserSummarySerializer(read_only=True)
     related_game = serializers.PrimaryKeyRelatedField(read_only=True)
     related_tournament = serializers.PrimaryKeyRelatedField(read_only=True)
 
@@ -293,11 +383,9 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         # Only allow updating is_read field
-        instance.is_read = validated_data.get('is_read', instance.is_read)
-        if instance.is_read and not instance.read_at:
-            from django.utils import timezone
-            instance.read_at = timezone.now()
-        instance.save()
+        from .services import NotificationService
+        if 'is_read' in validated_data:
+            NotificationService.set_read(instance, validated_data['is_read'])
         return instance
 
 
@@ -306,4 +394,13 @@ class RankingsSerializer(serializers.Serializer):
     singles_rankings = PlayerProfileSerializer(many=True)
     doubles_rankings = PlayerProfileSerializer(many=True)
     recent_games = GameSerializer(many=True)
-    weekly_leaderboard = WeeklyLeaderboardSerializer(many=True)
\ No newline at end of file
+    weekly_leaderboard = WeeklyLeaderboardSerializer(many=True)
+
+
+class RatingHistoryBucketSerializer(serializers.Serializer):
+    """One day or week of a player's rating history"""
+    date = serializers.DateTimeField(source='bucket')
+    rating = serializers.IntegerField(source='rating_after')
+    high = serializers.IntegerField()
+    low = serializers.IntegerField()
+    games = serializers.IntegerField()
@@ -1,11 +1,17 @@
 """
 Services for Firebase authentication, notifications, and other business logic
 """
+import hashlib
 import json
+import time
+import uuid
 from datetime import datetime, timedelta
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core import signing
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
 
 # Firebase Admin SDK
 import firebase_admin
@@ -181,30 +187,334 @@ class VerificationService:
         }
 
 
+class EmailService:
+    """Outgoing email queue, so SMTP latency never holds up a request"""
+
+    @staticmethod
+    def queue(subject, body, recipients, digest=False):
+        """
+        Store an email and schedule the email.flush job to send it
+        Digest emails wait until the end of the current ADMIN_EMAIL_DIGEST_INTERVAL
+        and go out as one message together with everything else queued meanwhile
+        """
+        from .models import Job, OutboundEmail
+        from . import jobs
+
+        if not digest:
+            email = OutboundEmail.objects.create(subject=subject, body=body, recipients=list(recipients))
+            jobs.enqueue('email.flush')
+            return email
+
+        interval = settings.ADMIN_EMAIL_DIGEST_INTERVAL
+        now = timezone.now()
+        bucket_end = (int(now.timestamp()) // interval + 1) * interval
+        with transaction.atomic():
+            while True:
+                send_at = datetime.fromtimestamp(bucket_end, tz=now.tzinfo)
+                # One flush job per interval, shared by all digest emails in it
+                job = jobs.enqueue('email.flush', delay=send_at - now, idempotency_key=f'email-digest:{bucket_end}')
+                # Hold the job row so the worker can't claim it before this email is stored
+                job = Job.objects.select_for_update().get(pk=job.pk)
+                if job.status == 'pending':
+                    break
+                # That flush has already started and may not see this email, join the next one
+                bucket_end += interval
+
+            # Not due before the bucket's flush, so earlier flushes leave it alone
+            return OutboundEmail.objects.create(
+                subject=subject, body=body, recipients=list(recipients), digest=True, next_attempt_at=send_at
+            )
+
+    @staticmethod
+    def send_pending(batch_size=None):
+        """
+        Send due emails over a single connection, returns the number sent
+        Digest emails with the same recipients are combined into one message.
+        Failed emails are retried with exponential backoff up to
+        EMAIL_MAX_ATTEMPTS; a flush is scheduled for the next retry.
+        """
+        from .models import OutboundEmail
+        from . import jobs
+
+        now = timezone.now()
+        emails = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('created_at')[:batch_size or settings.EMAIL_BATCH_SIZE]
+        )
+        if not emails:
+            return 0
+
+        # (message, emails it covers) pairs
+        batches = []
+        digests = {}
+        for email in emails:
+            if email.digest:
+                digests.setdefault(tuple(email.recipients), []).append(email)
+            else:
+                batches.append((EmailService._build_message(email.subject, email.body, email.recipients), [email]))
+        for recipients, group in digests.items():
+            if len(group) == 1:
+                subject, body = group[0].subject, group[0].body
+            else:
+                subject = f'{len(group)} admin alerts'
+                body = '\n\n'.join(f'{email.subject}\n{"-" * len(email.subject)}\n{email.body}' for email in group)
+            batches.append((EmailService._build_message(subject, body, recipients), group))
+
+        sent = 0
+        connection = get_connection()
+        try:
+            connection.open()
+            for message, group in batches:
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    print(f"Error sending email '{message.subject}': {e}")
+                    for email in group:
+                        email.attempts += 1
+                        email.last_error = str(e)
+                        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+                            email.status = 'failed'
+                        else:
+                            email.next_attempt_at = now + timedelta(seconds=min(30 * 2 ** email.attempts, 3600))
+                else:
+                    sent += 1
+                    for email in group:
+                        email.attempts += 1
+                        email.status = 'sent'
+                        email.sent_at = timezone.now()
+        finally:
+            connection.close()
+
+        OutboundEmail.objects.bulk_update(
+            emails, ['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at']
+        )
+
+        retry = [email.next_attempt_at for email in emails if email.status == 'pending']
+        if retry:
+            jobs.enqueue('email.flush', delay=min(retry) - now)
+        if len(emails) == (batch_size or settings.EMAIL_BATCH_SIZE):
+            # More may be waiting behind this batch
+            jobs.enqueue('email.flush')
+        return sent
+
+    @staticmethod
+    def _build_message(subject, body, recipients):
+        return EmailMessage(
+            subject=subject, body=body, from_email=settings.DEFAULT_FROM_EMAIL, to=list(recipients)
+        )
+
+
 class NotificationService:
     """Service for handling notifications"""
 
+    UNREAD_COUNT_KEY = 'notifications:unread:{user_id}'
+    UNREAD_VERSION_KEY = 'notifications:unread-version:{user_id}'
+    STREAM_TICKET_SALT = 'notification-stream'
+
+    @staticmethod
+    def create_stream_ticket(user_id):
+        """
+        Signed ticket that opens the user's notification stream
+        EventSource can't send the Authorization header, and the API token
+        would end up in access logs as a query parameter. The ticket only
+        opens the stream and expires after NOTIFICATION_STREAM_TICKET_MAX_AGE.
+        """
+        signer = signing.TimestampSigner(salt=NotificationService.STREAM_TICKET_SALT)
+        return signer.sign(str(user_id))
+
+    @staticmethod
+    def read_stream_ticket(ticket):
+        """User id of a valid stream ticket, None if it's forged or expired"""
+        signer = signing.TimestampSigner(salt=NotificationService.STREAM_TICKET_SALT)
+        try:
+            return signer.unsign(ticket, max_age=settings.NOTIFICATION_STREAM_TICKET_MAX_AGE)
+        except signing.BadSignature:
+            return None
+
+    @staticmethod
+    def get_unread_count(user_id):
+        """
+        Unread notification count for a user, answered from the cache
+        Counts are cached with the user's version token, which every change
+        replaces (reset_unread_count), and only served while the token still
+        matches, so a count taken around a change is never served afterwards.
+        Cached counts expire after NOTIFICATION_UNREAD_COUNT_TIMEOUT, which
+        bounds how stale a per-process cache gets for changes made elsewhere.
+        """
+        from .models import Notification
+
+        count_key = NotificationService.UNREAD_COUNT_KEY.format(user_id=user_id)
+        version_key = NotificationService.UNREAD_VERSION_KEY.format(user_id=user_id)
+        try:
+            cached = cache.get_many([count_key, version_key])
+            version = cached.get(version_key)
+            if version is None:
+                # add() so a token set meanwhile by a change isn't overwritten
+                cache.add(version_key, uuid.uuid4().hex, timeout=None)
+                version = cache.get(version_key)
+        except Exception as e:
+            print(f"Error reading unread count from cache: {e}")
+            cached, version = {}, None
+
+        entry = cached.get(count_key)
+        if version is not None and entry is not None and entry[0] == version:
+            return entry[1]
+
+        # Read the token before counting: a change committed after the count was
+        # taken replaces the token, and the count cached below is never served
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        if version is not None:
+            try:
+                cache.set(count_key, (version, count), timeout=settings.NOTIFICATION_UNREAD_COUNT_TIMEOUT)
+            except Exception as e:
+                print(f"Error storing unread count in cache: {e}")
+        return count
+
+    @staticmethod
+    def reset_unread_count(user_id):
+        """Invalidate a user's cached unread count once the current transaction commits"""
+        NotificationService.reset_unread_counts([user_id])
+
+    @staticmethod
+    def reset_unread_counts(user_ids):
+        """Invalidate several users' cached unread counts with a single cache write, on commit"""
+        user_ids = list(user_ids)
+
+        def reset():
+            try:
+                cache.set_many({
+                    NotificationService.UNREAD_VERSION_KEY.format(user_id=user_id): uuid.uuid4().hex
+                    for user_id in user_ids
+                }, timeout=None)
+            except Exception as e:
+                print(f"Error resetting unread counts in cache: {e}")
+                cache.delete_many([
+                    NotificationService.UNREAD_COUNT_KEY.format(user_id=user_id) for user_id in user_ids
+                ])
+            NotificationService.publish_unread_counts(user_ids)
+
+        transaction.on_commit(reset)
+
+    @staticmethod
+    def publish_unread_count(user_id):
+        """Tell the user's open notification streams that the unread count changed"""
+        NotificationService.publish_unread_counts([user_id])
+
+    @staticmethod
+    def publish_unread_counts(user_ids):
+        """
+        Tell the users' open notification streams that their unread counts changed
+        Streams count themselves, through the cache, so nothing is counted here
+        for users without one
+        """
+        from .events import get_backend, publish_to_users, user_channel
+
+        backend = get_backend()
+        publish_to_users([
+            (user_id, 'unread_count', {})
+            for user_id in user_ids if backend.has_subscribers(user_channel(user_id))
+        ])
+
+    @staticmethod
+    def publish_notification(notification):
+        """Push a new notification to the recipient's open notification streams"""
+        NotificationService.publish_notifications([notification])
+
+    @staticmethod
+    def publish_notifications(notifications):
+        """
+        Push new notifications to their recipients' open notification streams
+        Only the ids are published, streams load the notifications themselves so
+        events stay small enough for any backend
+        """
+        from .events import get_backend, publish_to_users, user_channel
+
+        backend = get_backend()
+        publish_to_users([
+            (notification.recipient_id, 'notification', {'id': str(notification.pk)})
+            for notification in notifications if backend.has_subscribers(user_channel(notification.recipient_id))
+        ])
+
+    @staticmethod
+    def set_read(notification, is_read):
+        """
+        Mark a notification read or unread
+        Conditional update, so concurrent requests change the counter only once
+        """
+        from .models import Notification
+
+        read_at = timezone.now() if is_read else None
+        updated = Notification.objects.filter(
+            pk=notification.pk, is_read=not is_read
+        ).update(is_read=is_read, read_at=read_at)
+        if updated:
+            notification.is_read = is_read
+            notification.read_at = read_at
+            NotificationService.reset_unread_count(notification.recipient_id)
+        return bool(updated)
+
+    @staticmethod
+    def mark_all_read(user):
+        """Mark all of a user's notifications read, returns how many changed"""
+        from .models import Notification
+
+        updated = Notification.objects.filter(recipient=user, is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
+        if updated:
+            NotificationService.reset_unread_count(user.pk)
+        return updated
+
     @staticmethod
     def notify_admin(subject, message, related_object=None):
-        """Send notification to admin via email"""
+        """Queue an email to the admin (sent by the background worker)"""
         try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[settings.ADMIN_EMAIL],
-                fail_silently=True,  # Don't crash if email fails
-            )
+            EmailService.queue(subject, message, [settings.ADMIN_EMAIL], digest=settings.ADMIN_EMAIL_DIGEST)
             return True
         except Exception as e:
-            print(f"Error sending admin notification: {e}")
+            print(f"Error queueing admin notification: {e}")
             return False
 
     @staticmethod
-    def create_game_verification_notification(game):
-        """Create notification for game verification"""
+    def fan_out(recipients, notification_type, title, message, **related):
+        """
+        Create the same notification for many users with a single bulk_create
+        Recipients (users or ids) are deduplicated and the rows are written once
+        the current transaction commits, so they never outlive a rollback
+
+        Args:
+            recipients: iterable of users or user ids, None entries are skipped
+            related: related_game, related_user and/or related_tournament
+        """
         from .models import Notification
 
+        recipient_ids = list(dict.fromkeys(
+            getattr(recipient, 'pk', recipient) for recipient in recipients if recipient
+        ))
+        if not recipient_ids:
+            return
+
+        def create():
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    recipient_id=recipient_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    **related
+                )
+                for recipient_id in recipient_ids
+            ])
+            # bulk_create skips post_save, so keep the streams and counts in step here
+            NotificationService.publish_notifications(notifications)
+            NotificationService.reset_unread_counts(recipient_ids)
+
+        transaction.on_commit(create)
+
+    @staticmethod
+    def create_game_verification_notification(game):
+        """Create notification for game verification"""
         # Determine who needs to verify
         if game.game_type == 'singles':
             if game.reported_by == game.player1:
@@ -212,8 +522,8 @@ class NotificationService:
             else:
                 recipient = game.player1
 
-            Notification.objects.create(
-                recipient=recipient,
+            NotificationService.fan_out(
+                [recipient],
                 notification_type='game_verification',
                 title='Game Verification Required',
                 message=f'{game.reported_by.display_name} reported a game result. Please verify.',
@@ -227,20 +537,18 @@ class NotificationService:
             else:
                 recipients = [game.team1_player1, game.team1_player2]
 
-            for recipient in recipients:
-                if recipient:
-                    Notification.objects.create(
-                        recipient=recipient,
-                        notification_type='game_verification',
-                        title='Doubles Game Verification Required',
-                        message=f'{game.reported_by.display_name} reported a doubles game result. Please verify.',
-                        related_game=game
-                    )
+            NotificationService.fan_out(
+                recipients,
+                notification_type='game_verification',
+                title='Doubles Game Verification Required',
+                message=f'{game.reported_by.display_name} reported a doubles game result. Please verify.',
+                related_game=game
+            )
 
     @staticmethod
     def create_game_disputed_notification(game, disputed_by, reason):
         """Create notifications when a game is disputed"""
-        from .models import Notification
+        from .models import User
 
         # Notify admin
         NotificationService.notify_admin(
@@ -249,8 +557,8 @@ class NotificationService:
         )
 
         # Notify the reporter
-        Notification.objects.create(
-            recipient=game.reported_by,
+        NotificationService.fan_out(
+            [game.reported_by],
             notification_type='game_disputed',
             title='Game Result Disputed',
             message=f'{disputed_by.display_name} has disputed your game report. An admin will review.',
@@ -258,202 +566,345 @@ class NotificationService:
         )
 
         # Create admin notification in database
-        from .models import User, Notification
-        admins = User.objects.filter(is_staff=True)
-        for admin in admins:
-            Notification.objects.create(
-                recipient=admin,
-                notification_type='admin_alert',
-                title='Game Dispute Requires Resolution',
-                message=f'Game disputed by {disputed_by.display_name}. Reason: {reason}',
-                related_game=game,
-                related_user=disputed_by
-            )
+        NotificationService.fan_out(
+            User.objects.filter(is_staff=True).values_list('id', flat=True),
+            notification_type='admin_alert',
+            title='Game Dispute Requires Resolution',
+            message=f'Game disputed by {disputed_by.display_name}. Reason: {reason}',
+            related_game=game,
+            related_user=disputed_by
+        )
 
     @staticmethod
     def create_account_approval_notification(user):
         """Notify admin when a new account needs approval"""
+        from .models import User
+
         NotificationService.notify_admin(
             subject='New Account Pending Approval',
             message=f'New user registration:\nName: {user.display_name}\nUsername: {user.username}'
         )
 
         # Create admin notification in database
-        from .models import User, Notification
-        admins = User.objects.filter(is_staff=True)
-        for admin in admins:
-            Notification.objects.create(
-                recipient=admin,
-                notification_type='admin_alert',
-                title='New Account Approval Required',
-                message=f'{user.display_name} ({user.username}) has registered and needs approval.',
-                related_user=user
-            )
+        NotificationService.fan_out(
+            User.objects.filter(is_staff=True).values_list('id', flat=True),
+            notification_type='admin_alert',
+            title='New Account Approval Required',
+            message=f'{user.display_name} ({user.username}) has registered and needs approval.',
+            related_user=user
+        )
 
 
 class GameService:
     """Service for game-related operations"""
 
+    # PlayerProfile columns touched when a singles game is processed
+    SINGLES_PROFILE_FIELDS = [
+        'singles_elo', 'peak_singles_elo', 'peak_singles_date', 'singles_games_played',
+        'singles_wins', 'singles_losses', 'weekly_points', 'total_points',
+        'current_streak', 'longest_streak', 'updated_at',
+    ]
+
+    # PlayerProfile columns touched when a doubles game is processed
+    DOUBLES_PROFILE_FIELDS = [
+        'doubles_elo', 'peak_doubles_elo', 'peak_doubles_date', 'doubles_games_played',
+        'doubles_wins', 'doubles_losses', 'weekly_points', 'total_points',
+        'current_streak', 'longest_streak', 'updated_at',
+    ]
+
+    DOUBLES_SLOTS = ['team1_player1', 'team1_player2', 'team2_player1', 'team2_player2']
+
+    # Game columns recording the rating changes of a processed game
+    GAME_ELO_FIELDS = [
+        'player1_elo_before', 'player2_elo_before', 'player1_elo_after', 'player2_elo_after',
+        'team1_player1_elo_before', 'team1_player2_elo_before',
+        'team2_player1_elo_before', 'team2_player2_elo_before',
+        'team1_player1_elo_after', 'team1_player2_elo_after',
+        'team2_player1_elo_after', 'team2_player2_elo_after',
+        'elo_change',
+    ]
+
+    @staticmethod
+    def lock_profiles(user_ids):
+        """
+        Lock the player profiles of the given users for the current transaction
+        Rows are always locked in primary key order, so two verifications that
+        share players can't deadlock. Missing profiles are created first.
+        Returns a dict of user_id -> PlayerProfile
+        """
+        from .models import PlayerProfile
+
+        existing = set(PlayerProfile.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        for user_id in set(user_ids) - existing:
+            PlayerProfile.objects.get_or_create(user_id=user_id)
+
+        profiles = PlayerProfile.objects.select_for_update(of=('self',)).select_related(
+            'user'
+        ).filter(user_id__in=user_ids).order_by('pk')
+        return {profile.user_id: profile for profile in profiles}
+
+    @staticmethod
+    def week_key(moment):
+        """(year, week_number) of the WeeklyLeaderboard row a moment falls in"""
+        return moment.year, moment.isocalendar()[1]
+
+    @staticmethod
+    def award_weekly_points(user, played_at, points, won):
+        """
+        Add a game's points to the player's weekly leaderboard row
+        Returns the row's new points total
+        """
+        from .models import WeeklyLeaderboard
+        from django.db.models import F
+
+        year, week_number = GameService.week_key(played_at)
+        weekly, created = WeeklyLeaderboard.objects.get_or_create(
+            player=user,
+            week_number=week_number,
+            year=year,
+            defaults={'points': 0, 'games_played': 0, 'games_won': 0}
+        )
+        # Increment in the database so concurrent games in the same week don't overwrite each other
+        WeeklyLeaderboard.objects.filter(pk=weekly.pk).update(
+            points=F('points') + points,
+            games_played=F('games_played') + 1,
+            games_won=F('games_won') + (1 if won else 0),
+            updated_at=timezone.now()
+        )
+        # Exact, other games of this player wait for the profile lock the caller holds
+        return weekly.points + points
+
+    @staticmethod
+    def current_weekly_points(user_id, played_at, week_points):
+        """
+        Points of the player's current week, which PlayerProfile.weekly_points mirrors
+        week_points is the new total of the game's own week, so games played
+        this week need no query
+        """
+        from .models import WeeklyLeaderboard
+
+        year, week_number = GameService.week_key(timezone.now())
+        if GameService.week_key(played_at) == (year, week_number):
+            return week_points
+        return WeeklyLeaderboard.objects.filter(
+            player_id=user_id, year=year, week_number=week_number
+        ).values_list('points', flat=True).first() or 0
+
     @staticmethod
     def process_verified_game(game):
         """
         Process a game after it's been verified
         Updates ELO ratings, statistics, and points
+
+        Runs in a single transaction holding row locks on the involved
+        profiles, so concurrent verifications can't lose rating updates
         """
-        from .models import PlayerProfile, WeeklyLeaderboard
+        from .models import PlayerProfile
         from .elo import ELOCalculator, PointsCalculator
 
         if game.status != 'verified':
             return False
 
-        if game.game_type == 'singles':
-            # Get player profiles
-            profile1 = game.player1.profile
-            profile2 = game.player2.profile
-
-            # Store current ratings
-            game.player1_elo_before = profile1.singles_elo
-            game.player2_elo_before = profile2.singles_elo
-
-            # Determine winner
-            if game.winner == 'player1':
-                score1 = 1
-                score2 = 0
-                winner_profile = profile1
-                loser_profile = profile2
-            else:
-                score1 = 0
-                score2 = 1
-                winner_profile = profile2
-                loser_profile = profile1
-
-            # Calculate new ratings
-            new_rating1, new_rating2, elo_change = ELOCalculator.calculate_new_ratings(
-                profile1.singles_elo,
-                profile2.singles_elo,
-                score1,
-                profile1.singles_games_played,
-                profile2.singles_games_played
-            )
+        with transaction.atomic():
+            if game.game_type == 'singles':
+                # Lock and re-read both profiles before using their ratings
+                profiles = GameService.lock_profiles([game.player1_id, game.player2_id])
+                profile1 = profiles[game.player1_id]
+                profile2 = profiles[game.player2_id]
+
+                # Store current ratings
+                game.player1_elo_before = profile1.singles_elo
+                game.player2_elo_before = profile2.singles_elo
+
+                # Determine winner
+                if game.winner == 'player1':
+                    score1 = 1
+                    winner_profile = profile1
+                    loser_profile = profile2
+                else:
+                    score1 = 0
+                    winner_profile = profile2
+                    loser_profile = profile1
+
+                # Calculate new ratings
+                new_rating1, new_rating2, elo_change = ELOCalculator.calculate_new_ratings(
+                    profile1.singles_elo,
+                    profile2.singles_elo,
+                    score1,
+                    profile1.singles_games_played,
+                    profile2.singles_games_played
+                )
 
-            # Update ratings
-            profile1.singles_elo = new_rating1
-            profile2.singles_elo = new_rating2
-            game.player1_elo_after = new_rating1
-            game.player2_elo_after = new_rating2
-            game.elo_change = elo_change
-
-            # Update peak ratings if necessary
-            if profile1.singles_elo > profile1.peak_singles_elo:
-                profile1.peak_singles_elo = profile1.singles_elo
-                profile1.peak_singles_date = timezone.now()
-
-            if profile2.singles_elo > profile2.peak_singles_elo:
-                profile2.peak_singles_elo = profile2.singles_elo
-                profile2.peak_singles_date = timezone.now()
-
-            # Update game statistics
-            profile1.singles_games_played += 1
-            profile2.singles_games_played += 1
-
-            if score1 == 1:
-                profile1.singles_wins += 1
-                profile2.singles_losses += 1
-            else:
-                profile1.singles_losses += 1
-                profile2.singles_wins += 1
-
-            # Calculate and award points
-            winner_elo = winner_profile.singles_elo - elo_change  # Use pre-game ELO
-            loser_elo = loser_profile.singles_elo + elo_change
-            winner_points, loser_points = PointsCalculator.calculate_game_points(
-                winner_elo, loser_elo, winner_profile.current_streak
-            )
+                # Update ratings
+                profile1.singles_elo = new_rating1
+                profile2.singles_elo = new_rating2
+                game.player1_elo_after = new_rating1
+                game.player2_elo_after = new_rating2
+                game.elo_change = elo_change
+
+                # Update peak ratings if necessary (dated like rebuild_ratings does)
+                peak_date = game.verified_at or timezone.now()
+                for profile in (profile1, profile2):
+                    if profile.singles_elo > profile.peak_singles_elo:
+                        profile.peak_singles_elo = profile.singles_elo
+                        profile.peak_singles_date = peak_date
+
+                # Update game statistics
+                profile1.singles_games_played += 1
+                profile2.singles_games_played += 1
+                winner_profile.singles_wins += 1
+                loser_profile.singles_losses += 1
+
+                # Calculate and award points
+                winner_elo = winner_profile.singles_elo - elo_change  # Use pre-game ELO
+                loser_elo = loser_profile.singles_elo + elo_change
+                winner_points, loser_points = PointsCalculator.calculate_game_points(
+                    winner_elo, loser_elo, winner_profile.current_streak
+                )
 
-            # Update weekly points
-            week_number = game.played_at.isocalendar()[1]
-            year = game.played_at.year
+                for profile, points in [(winner_profile, winner_points), (loser_profile, loser_points)]:
+                    week_points = GameService.award_weekly_points(
+                        profile.user, game.played_at, points, profile is winner_profile
+                    )
+                    profile.weekly_points = GameService.current_weekly_points(
+                        profile.user_id, game.played_at, week_points
+                    )
+                    profile.total_points += points
 
-            for profile, points in [(winner_profile, winner_points), (loser_profile, loser_points)]:
-                weekly, created = WeeklyLeaderboard.objects.get_or_create(
-                    player=profile.user,
-                    week_number=week_number,
-                    year=year,
-                    defaults={'points': 0, 'games_played': 0, 'games_won': 0}
-                )
-                weekly.points += points
-                weekly.games_played += 1
-                if profile == winner_profile:
-                    weekly.games_won += 1
-                weekly.save()
+                # Update streaks
+                GameService.update_streaks(winner_profile.user, game, profile=winner_profile)
+                GameService.update_streaks(loser_profile.user, game, profile=loser_profile)
+
+                # Save only the columns this game changed
+                for profile in (profile1, profile2):
+                    profile.save(update_fields=GameService.SINGLES_PROFILE_FIELDS)
 
-                # Update total points
-                profile.weekly_points += points
-                profile.total_points += points
+            else:
+                # Load and lock all four profiles in a single query
+                user_ids = [getattr(game, f'{slot}_id') for slot in GameService.DOUBLES_SLOTS]
+                profiles = GameService.lock_profiles(user_ids)
+                team_profiles = [profiles[user_id] for user_id in user_ids]
+                team1_won = game.winner == 'team1'
+
+                # Calculate new ratings
+                before = [profile.doubles_elo for profile in team_profiles]
+                result = ELOCalculator.calculate_doubles_ratings(
+                    (before[0], before[1]),
+                    (before[2], before[3]),
+                    team1_won,
+                    (team_profiles[0].doubles_games_played, team_profiles[1].doubles_games_played),
+                    (team_profiles[2].doubles_games_played, team_profiles[3].doubles_games_played)
+                )
+                game.elo_change = result['elo_change']
 
-            # Update streaks
-            GameService.update_streaks(winner_profile.user)
-            GameService.update_streaks(loser_profile.user)
+                if team1_won:
+                    winner_elo, loser_elo = sum(before[:2]) / 2, sum(before[2:]) / 2
+                else:
+                    winner_elo, loser_elo = sum(before[2:]) / 2, sum(before[:2]) / 2
+
+                now = timezone.now()
+                peak_date = game.verified_at or now
+                for slot, profile in zip(GameService.DOUBLES_SLOTS, team_profiles):
+                    won = slot.startswith('team1') == team1_won
+
+                    # Store ratings and update peak if necessary
+                    setattr(game, f'{slot}_elo_before', profile.doubles_elo)
+                    profile.doubles_elo = result[slot]
+                    setattr(game, f'{slot}_elo_after', profile.doubles_elo)
+                    if profile.doubles_elo > profile.peak_doubles_elo:
+                        profile.peak_doubles_elo = profile.doubles_elo
+                        profile.peak_doubles_date = peak_date
+
+                    # Update game statistics
+                    profile.doubles_games_played += 1
+                    if won:
+                        profile.doubles_wins += 1
+                    else:
+                        profile.doubles_losses += 1
+
+                    # Calculate and award points, using average pre-game team ELO
+                    winner_points, loser_points = PointsCalculator.calculate_game_points(
+                        winner_elo, loser_elo, profile.current_streak
+                    )
+                    points = winner_points if won else loser_points
+                    week_points = GameService.award_weekly_points(profile.user, game.played_at, points, won)
+                    profile.weekly_points = GameService.current_weekly_points(
+                        profile.user_id, game.played_at, week_points
+                    )
+                    profile.total_points += points
 
-            # Save profiles
-            profile1.save()
-            profile2.save()
+                for profile in team_profiles:
+                    GameService.update_streaks(profile.user, game, profile=profile)
+                    profile.updated_at = now
 
-        # TODO: Handle doubles games similarly
+                # Write all four profiles back in one query
+                PlayerProfile.objects.bulk_update(team_profiles, GameService.DOUBLES_PROFILE_FIELDS)
 
-        game.save()
+            game.save(update_fields=GameService.GAME_ELO_FIELDS)
+            GameService.record_rating_history(game)
         return True
 
     @staticmethod
-    def update_streaks(user):
-        """Update playing streaks for a user"""
-        from .models import Game
-        from datetime import timedelta
-        from django.db import models
+    def record_rating_history(game):
+        """Record each player's rating before and after a processed game"""
+        from .models import RatingHistory
+
+        slots = ['player1', 'player2'] if game.game_type == 'singles' else GameService.DOUBLES_SLOTS
+        RatingHistory.objects.bulk_create([
+            RatingHistory(
+                player_id=getattr(game, f'{slot}_id'),
+                game=game,
+                game_type=game.game_type,
+                rating_before=getattr(game, f'{slot}_elo_before'),
+                rating_after=getattr(game, f'{slot}_elo_after'),
+                timestamp=game.played_at
+            )
+            for slot in slots
+        ])
 
-        profile = user.profile
-        today = timezone.now().date()
+    @staticmethod
+    def next_streak(current_streak, last_day, day):
+        """
+        A player's streak after playing on `day`
+        last_day is the previous day they played. Each day counts once, so
+        a second game on the same day leaves the streak as it is.
+        Shared with rebuild_ratings, which replays games through the same rule.
+        """
+        if last_day == day:
+            return current_streak or 1
+        if last_day == day - timedelta(days=1):
+            return current_streak + 1
+        return 1
 
-        # Get last game before today
-        last_game = Game.objects.filter(
-            status='verified'
-        ).filter(
-            models.Q(player1=user) | models.Q(player2=user) |
-            models.Q(team1_player1=user) | models.Q(team1_player2=user) |
-            models.Q(team2_player1=user) | models.Q(team2_player2=user)
-        ).filter(
-            played_at__date__lt=today
-        ).order_by('-played_at').first()
-
-        # Get today's games
-        todays_games = Game.objects.filter(
-            status='verified'
-        ).filter(
-            models.Q(player1=user) | models.Q(player2=user) |
-            models.Q(team1_player1=user) | models.Q(team1_player2=user) |
-            models.Q(team2_player1=user) | models.Q(team2_player2=user)
-        ).filter(
-            played_at__date=today
-        ).exists()
-
-        if todays_games:
-            if last_game:
-                yesterday = today - timedelta(days=1)
-                if last_game.played_at.date() == yesterday:
-                    # Continuing streak
-                    profile.current_streak += 1
-                else:
-                    # Broken streak, restart
-                    profile.current_streak = 1
-            else:
-                # First game ever
-                profile.current_streak = 1
+    @staticmethod
+    def update_streaks(user, game, profile=None):
+        """
+        Update a player's playing streak for a newly verified game
+        Streak days are the local days games were played on. When a (locked)
+        profile is passed in, it is updated in memory and the caller is
+        responsible for saving it; otherwise the user's profile is loaded and
+        saved here
+        """
+        from .models import GameParticipant
+
+        save = profile is None
+        if profile is None:
+            profile = user.profile
+        day = timezone.localdate(game.played_at)
+        end_of_day = timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
 
-            # Update longest streak if necessary
-            if profile.current_streak > profile.longest_streak:
-                profile.longest_streak = profile.current_streak
+        # Range filter (rather than __date) keeps the query on the participant index
+        last_played = GameParticipant.objects.filter(
+            user=user, status='verified', played_at__lt=end_of_day
+        ).exclude(game_id=game.pk).order_by('-played_at').values_list('played_at', flat=True).first()
+        last_day = timezone.localdate(last_played) if last_played else None
 
-            profile.save()
+        profile.current_streak = GameService.next_streak(profile.current_streak, last_day, day)
+        if profile.current_streak > profile.longest_streak:
+            profile.longest_streak = profile.current_streak
+
+        if save:
+            profile.save(update_fields=['current_streak', 'longest_streak', 'updated_at'])
 
 
 class TrophyService:
@@ -461,52 +912,672 @@ class TrophyService:
 
     @staticmethod
     def check_and_award_trophies(user):
-        """Check and award any earned trophies for a user"""
-        from .models import Trophy, Game
-        profile = user.profile
-
-        # Check ELO milestones
-        elo_milestones = [1300, 1400, 1500, 1600, 1700, 1800, 1900, 2000, 2200, 2500]
-        for milestone in elo_milestones:
-            if profile.singles_elo >= milestone:
-                Trophy.objects.get_or_create(
-                    player=user,
-                    trophy_type='elo_milestone',
-                    value=milestone,
-                    defaults={
-                        'name': f'{milestone} ELO Club',
-                        'description': f'Reached {milestone} ELO rating in singles',
-                        'icon': '🏆'
-                    }
-                )
+        """Check and award any earned milestone trophies for a user, returns the new trophies"""
+        return TrophyService.award_milestones([user.profile])
+
+    @staticmethod
+    def award_milestones(profiles, dry_run=False):
+        """
+        Award missing milestone trophies to a batch of players
+        Loads the trophies they already own in one query, works out newly
+        reached milestones from the rules in core/trophies.py and inserts them
+        with one bulk_create. Returns the new trophies.
+        """
+        from .models import Trophy
+        from .trophies import new_trophies
+
+        owned = {profile.user_id: set() for profile in profiles}
+        existing = Trophy.objects.filter(
+            player_id__in=list(owned), week_number__isnull=True
+        ).values_list('player_id', 'trophy_type', 'value')
+        for player_id, trophy_type, value in existing:
+            owned[player_id].add((trophy_type, value))
+
+        trophies = []
+        for profile in profiles:
+            trophies.extend(new_trophies(profile, owned[profile.user_id]))
+
+        if trophies and not dry_run:
+            # A concurrent check may have awarded some of them already
+            Trophy.objects.bulk_create(trophies, ignore_conflicts=True)
+        return trophies
+
+
+class RankingsService:
+    """
+    Pre-rendered snapshot of the rankings page, kept in Django's cache
+    The snapshot is only rebuilt after a game is verified or a profile changes
+    """
+    CACHE_KEY = 'rankings:snapshot:{version}:{variant}'
+    VERSION_KEY = 'rankings:version'
+
+    @staticmethod
+    def get_version():
+        """Current snapshot version, bumped on every invalidation"""
+        version = cache.get(RankingsService.VERSION_KEY)
+        if version is None:
+            cache.add(RankingsService.VERSION_KEY, 1, timeout=None)
+            version = cache.get(RankingsService.VERSION_KEY, 1)
+        return version
+
+    @staticmethod
+    def get_snapshot(include_all_players=True):
+        """
+        Get the rankings snapshot, building it on a cache miss
+        Returns a (content, etag) tuple where content is the rendered JSON bytes
+        """
+        # Read the version first: if an invalidation lands while we build,
+        # the snapshot is stored under a stale key and never served
+        version = RankingsService.get_version()
+        variant = 'full' if include_all_players else 'compact'
+        key = RankingsService.CACHE_KEY.format(version=version, variant=variant)
+
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = RankingsService.build_snapshot(include_all_players)
+            cache.set(key, snapshot, timeout=settings.RANKINGS_CACHE_TIMEOUT)
+        return snapshot
+
+    @staticmethod
+    def build_snapshot(include_all_players=True):
+        """
+        Query and render the rankings page data
+        all_players grows with membership, so it can be left out and fetched
+        page by page from the player list endpoint instead
+        """
+        from rest_framework.settings import api_settings
+        from .models import PlayerProfile, Game
+        from .serializers import PlayerProfileSerializer, GameSerializer
+
+        # Get singles rankings (top 20)
+        singles_rankings = PlayerProfile.objects.with_related().filter(
+            singles_games_played__gte=1  # Minimum games to appear in rankings
+        ).order_by('-singles_elo')[:20]
+
+        # Get doubles rankings (top 20)
+        doubles_rankings = PlayerProfile.objects.with_related().filter(
+            doubles_games_played__gte=1
+        ).order_by('-doubles_elo')[:20]
+
+        # Get recent verified games
+        recent_games = Game.objects.with_related().filter(
+            status='verified'
+        ).order_by('-played_at')[:10]
+
+        # Get current week's leaderboard - use PlayerProfile weekly_points instead
+        weekly_leaderboard = PlayerProfile.objects.with_related().filter(
+            weekly_points__gt=0
+        ).order_by('-weekly_points')[:10]
+
+        data = {
+            'singles_rankings': PlayerProfileSerializer(singles_rankings, many=True).data,
+            'doubles_rankings': PlayerProfileSerializer(doubles_rankings, many=True).data,
+            # Only verified games are listed, so there is nothing request-specific to render
+            'recent_games': GameSerializer(recent_games, many=True).data,
+            'weekly_leaderboard': PlayerProfileSerializer(weekly_leaderboard, many=True).data,
+        }
+
+        if include_all_players:
+            # Also get all players (including those with 0 games)
+            all_players = PlayerProfile.objects.with_related().order_by('-singles_elo')
+            data['all_players'] = PlayerProfileSerializer(all_players, many=True).data
+
+        content = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data)
+        etag = '"%s"' % hashlib.md5(content).hexdigest()
+        return content, etag
+
+    @staticmethod
+    def invalidate():
+        """Drop the current snapshot so the next request rebuilds it"""
+        try:
+            cache.incr(RankingsService.VERSION_KEY)
+        except ValueError:
+            # No version stored yet, so there is no snapshot to drop either
+            pass
+
+    @staticmethod
+    def invalidate_on_commit():
+        """Invalidate once the current transaction commits, so rebuilds see the new data"""
+        transaction.on_commit(RankingsService.invalidate)
+
+
+class TournamentService:
+    """Service for generating and running tournament brackets"""
+    BRACKET_CACHE_KEY = 'tournaments:bracket:{tournament_id}:{version}'
+    BRACKET_VERSION_KEY = 'tournaments:bracket-version:{tournament_id}'
 
-        # Check games played milestones
-        games_milestones = [10, 25, 50, 100, 250, 500, 1000]
-        total_games = profile.singles_games_played + profile.doubles_games_played
-        for milestone in games_milestones:
-            if total_games >= milestone:
-                Trophy.objects.get_or_create(
-                    player=user,
-                    trophy_type='games_played',
-                    value=milestone,
-                    defaults={
-                        'name': f'{milestone} Games Veteran',
-                        'description': f'Played {milestone} total games',
-                        'icon': '🎮'
-                    }
+    @staticmethod
+    def seeded_players(tournament):
+        """Participants ordered by ELO for the tournament's game type, best first"""
+        elo_field = 'doubles_elo' if tournament.game_type == 'doubles' else 'singles_elo'
+        return list(
+            tournament.participants.select_related('profile')
+            .order_by(f'-profile__{elo_field}', 'date_joined', 'id')
+        )
+
+    @staticmethod
+    def generate_bracket(tournament):
+        """
+        Create every match of the tournament in one go
+        The match graph (byes and next match links) is built in memory by
+        core/brackets.py and inserted, links included, with one bulk_create.
+        Raises ValueError if the bracket can't be generated.
+        """
+        from .brackets import generate
+        from .models import Tournament, TournamentMatch
+
+        with transaction.atomic():
+            tournament = Tournament.objects.select_for_update().get(pk=tournament.pk)
+            if tournament.status not in ('approved', 'in_progress'):
+                raise ValueError('Tournament is not approved')
+            if tournament.matches.exists():
+                raise ValueError('Bracket has already been generated')
+
+            nodes = generate(tournament.tournament_type, TournamentService.seeded_players(tournament))
+
+            now = timezone.now()
+            matches = {}
+            for node in nodes:
+                matches[node] = TournamentMatch(
+                    tournament=tournament,
+                    bracket=node.bracket,
+                    round_number=node.round_number,
+                    match_number=node.match_number,
+                    player1=node.players[0],
+                    player2=node.players[1],
+                    status=node.status,
+                    winner=node.winner,
+                    completed_at=now if node.status == 'bye' else None,
                 )
 
-        # Check streak achievements
-        streak_milestones = [3, 7, 14, 30]
-        for milestone in streak_milestones:
-            if profile.longest_streak >= milestone:
-                Trophy.objects.get_or_create(
-                    player=user,
-                    trophy_type='streak',
-                    value=milestone,
-                    defaults={
-                        'name': f'{milestone}-Day Streak',
-                        'description': f'Played games {milestone} days in a row',
-                        'icon': '🔥'
-                    }
+            # Primary keys are UUIDs assigned on instantiation, so the links can
+            # be filled in before anything is saved
+            for node, match in matches.items():
+                if node.next_match is not None:
+                    match.next_match = matches[node.next_match]
+                    match.next_match_slot = node.next_slot + 1
+                if node.loser_next_match is not None:
+                    match.loser_next_match = matches[node.loser_next_match]
+                    match.loser_next_match_slot = node.loser_slot + 1
+
+            # Nodes come feeders first - insert them the other way round so every
+            # linked match already exists when a row referencing it goes in
+            TournamentMatch.objects.bulk_create(reversed(list(matches.values())))
+            TournamentService.invalidate_bracket_on_commit(tournament.pk)
+
+            tournament.status = 'in_progress'
+            tournament.save(update_fields=['status', 'updated_at'])
+
+        return list(matches.values())
+
+    @staticmethod
+    def standings(tournament):
+        """Standings of a Swiss or round robin tournament from its finished matches"""
+        from .swiss import Standings
+
+        standings = Standings(user.pk for user in TournamentService.seeded_players(tournament))
+        results = tournament.matches.filter(
+            bracket__in=['swiss', 'round_robin'], status__in=['completed', 'bye']
+        ).order_by('round_number', 'match_number').values_list('status', 'player1_id', 'player2_id', 'winner_id')
+        for match_status, player1_id, player2_id, winner_id in results:
+            if match_status == 'bye':
+                standings.add_bye(winner_id)
+            else:
+                standings.add_result(player1_id, player2_id, winner_id)
+        return standings
+
+    @staticmethod
+    def pair_swiss_round(tournament):
+        """
+        Pair the next round of a Swiss tournament from the current standings
+        Raises ValueError if the current round isn't finished or all rounds
+        have been played. Returns the new matches.
+        """
+        from django.db.models import Max
+        from .models import Tournament, TournamentMatch
+        from .swiss import round_count
+
+        with transaction.atomic():
+            tournament = Tournament.objects.select_for_update().get(pk=tournament.pk)
+            if tournament.tournament_type != 'swiss' or tournament.status != 'in_progress':
+                raise ValueError('Tournament is not a running Swiss tournament')
+
+            rounds = tournament.matches.filter(bracket='swiss')
+            if rounds.exclude(status__in=['completed', 'bye']).exists():
+                raise ValueError('Current round is not finished')
+
+            standings = TournamentService.standings(tournament)
+            last_round = rounds.aggregate(last=Max('round_number'))['last'] or 0
+            if last_round >= round_count(len(standings.players), tournament.rounds):
+                raise ValueError('All rounds have been played')
+
+            pairs, bye = standings.pair()
+            round_number = last_round + 1
+            matches = [
+                TournamentMatch(
+                    tournament=tournament,
+                    bracket='swiss',
+                    round_number=round_number,
+                    match_number=number,
+                    player1_id=player1_id,
+                    player2_id=player2_id,
                 )
+                for number, (player1_id, player2_id) in enumerate(pairs, start=1)
+            ]
+            if bye is not None:
+                matches.append(TournamentMatch(
+                    tournament=tournament,
+                    bracket='swiss',
+                    round_number=round_number,
+                    match_number=len(pairs) + 1,
+                    player1_id=bye,
+                    status='bye',
+                    winner_id=bye,
+                    completed_at=timezone.now(),
+                ))
+            TournamentMatch.objects.bulk_create(matches)
+            TournamentService.invalidate_bracket_on_commit(tournament.pk)
+        return matches
+
+    @staticmethod
+    def game_result(match, game):
+        """
+        (winner_id, loser_id) of a match decided by a game, or None if the two
+        match players weren't on opposite sides of the game
+        """
+        if game.game_type == 'singles':
+            sides = {'player1': {game.player1_id}, 'player2': {game.player2_id}}
+        else:
+            sides = {
+                'team1': {game.team1_player1_id, game.team1_player2_id},
+                'team2': {game.team2_player1_id, game.team2_player2_id},
+            }
+        winners = sides.get(game.winner, set())
+        losers = set().union(*(players for side, players in sides.items() if side != game.winner))
+
+        for player_id, opponent_id in ((match.player1_id, match.player2_id), (match.player2_id, match.player1_id)):
+            if player_id in winners and opponent_id in losers:
+                return player_id, opponent_id
+        return None
+
+    @staticmethod
+    def record_game(game):
+        """
+        Decide the open tournament matches a verified game was played for
+        Call inside the verification transaction
+        """
+        from .models import TournamentMatch
+
+        match_ids = TournamentMatch.objects.filter(
+            games=game, status__in=['pending', 'in_progress']
+        ).values_list('id', flat=True)
+        for match_id in list(match_ids):
+            TournamentService.complete_match(match_id, game)
+
+    @staticmethod
+    def complete_match(match_id, game):
+        """
+        Set the winner of a match and move both players on
+        Only the match and the matches its players move into are locked and
+        updated; the tournament row is locked as well when the match decides
+        the tournament or ends a round. Returns the match, or None if it had
+        already been decided or the game doesn't fit it.
+        """
+        from .models import TournamentMatch
+
+        with transaction.atomic():
+            match = TournamentMatch.objects.select_for_update().get(pk=match_id)
+            if match.status not in ('pending', 'in_progress'):
+                return None
+            result = TournamentService.game_result(match, game)
+            if result is None:
+                return None
+
+            winner_id, loser_id = result
+            match.winner_id = winner_id
+            match.status = 'completed'
+            match.completed_at = timezone.now()
+            match.save(update_fields=['winner', 'status', 'completed_at'])
+
+            if match.next_match_id:
+                TournamentService.advance(match.next_match_id, match.next_match_slot, winner_id)
+            if match.loser_next_match_id:
+                TournamentService.advance(match.loser_next_match_id, match.loser_next_match_slot, loser_id)
+
+            if match.bracket in ('swiss', 'round_robin'):
+                TournamentService.finish_round(match.tournament_id)
+            elif match.bracket == 'grand_final' and match.round_number == 1 and winner_id == match.player2_id:
+                # The winners bracket champion's first loss - they get a second chance
+                TournamentService.create_bracket_reset(match)
+            elif match.next_match_id is None:
+                TournamentService.finish_elimination(match, loser_id)
+        return match
+
+    @staticmethod
+    def create_bracket_reset(grand_final):
+        """
+        Add the deciding rematch played when the losers bracket player wins the
+        grand final, so both finalists go out on their second loss
+        """
+        from .models import TournamentMatch
+
+        reset, _ = TournamentMatch.objects.get_or_create(
+            tournament_id=grand_final.tournament_id,
+            bracket='grand_final',
+            round_number=2,
+            match_number=1,
+            defaults={'player1_id': grand_final.player1_id, 'player2_id': grand_final.player2_id},
+        )
+        return reset
+
+    @staticmethod
+    def advance(match_id, slot, player_id):
+        """
+        Put a player into a slot of a later match
+        A bye waiting for this player (its other slot can never be filled)
+        is decided on the spot and the player moves on again.
+        """
+        from .models import TournamentMatch
+
+        while match_id is not None:
+            match = TournamentMatch.objects.select_for_update().get(pk=match_id)
+            field = f'player{slot}'
+            setattr(match, f'{field}_id', player_id)
+            if match.status != 'bye':
+                match.save(update_fields=[field])
+                return
+
+            match.winner_id = player_id
+            match.completed_at = timezone.now()
+            match.save(update_fields=[field, 'winner', 'completed_at'])
+            match_id, slot = match.next_match_id, match.next_match_slot
+
+    @staticmethod
+    def finish_elimination(final, runner_up_id):
+        """
+        Complete an elimination tournament once its final is decided
+        In double elimination that is the grand final, or the bracket reset
+        when one was needed. There is no third place match: third place goes to the loser of the
+        losers bracket final, or in single elimination to the semifinalist
+        beaten by the champion.
+        """
+        from .models import Tournament, TournamentMatch
+
+        tournament = Tournament.objects.select_for_update().get(pk=final.tournament_id)
+        if tournament.status != 'in_progress':
+            return
+
+        if final.bracket == 'grand_final':
+            # The bracket reset has no feeders of its own, third place comes from the grand final's
+            grand_final = TournamentMatch.objects.get(
+                tournament_id=final.tournament_id, bracket='grand_final', round_number=1, match_number=1
+            )
+            feeders = TournamentMatch.objects.filter(next_match=grand_final, status='completed', bracket='losers')
+        else:
+            feeders = TournamentMatch.objects.filter(next_match=final, status='completed', winner_id=final.winner_id)
+
+        third_place_id = None
+        for player1_id, player2_id, winner_id in feeders.values_list('player1_id', 'player2_id', 'winner_id'):
+            third_place_id = player2_id if winner_id == player1_id else player1_id
+
+        TournamentService.complete_tournament(tournament, [final.winner_id, runner_up_id, third_place_id])
+
+    @staticmethod
+    def finish_round(tournament_id):
+        """
+        Once every match of a Swiss or round robin round is decided, pair the
+        next Swiss round or complete the tournament from the standings
+        """
+        from django.db.models import Max
+        from .models import Tournament
+        from .swiss import round_count
+
+        # Concurrent results queue up here, so only the last one of a round acts
+        tournament = Tournament.objects.select_for_update().get(pk=tournament_id)
+        if tournament.status != 'in_progress':
+            return
+        if tournament.matches.filter(status__in=['pending', 'in_progress']).exists():
+            return
+
+        standings = TournamentService.standings(tournament)
+        if tournament.tournament_type == 'swiss':
+            last_round = tournament.matches.aggregate(last=Max('round_number'))['last'] or 0
+            if last_round < round_count(len(standings.players), tournament.rounds):
+                TournamentService.pair_swiss_round(tournament)
+                return
+
+        TournamentService.complete_tournament(tournament, standings.ranking()[:3])
+
+    @staticmethod
+    def complete_tournament(tournament, places):
+        """Record the top three (user ids, best first) and close the tournament"""
+        places = list(places) + [None] * (3 - len(places))
+        tournament.first_place_id, tournament.second_place_id, tournament.third_place_id = places[:3]
+        tournament.status = 'completed'
+        tournament.tournament_end = timezone.now()
+        tournament.save(update_fields=[
+            'first_place', 'second_place', 'third_place', 'status', 'tournament_end', 'updated_at'
+        ])
+
+    @staticmethod
+    def get_bracket_version(tournament_id):
+        """Current bracket snapshot version of a tournament, bumped on every change"""
+        key = TournamentService.BRACKET_VERSION_KEY.format(tournament_id=tournament_id)
+        version = cache.get(key)
+        if version is None:
+            # Starts from the clock rather than 1, so a version evicted from the cache
+            # doesn't come back as one an old snapshot is still stored under
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def get_bracket(tournament):
+        """
+        Get the bracket snapshot of a tournament, building it on a cache miss
+        Returns a (content, etag) tuple where content is the rendered JSON bytes
+        """
+        # Version first, so a snapshot built across an invalidation is never served
+        version = TournamentService.get_bracket_version(tournament.pk)
+        key = TournamentService.BRACKET_CACHE_KEY.format(tournament_id=tournament.pk, version=version)
+
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = TournamentService.build_bracket(tournament)
+            cache.set(key, snapshot, timeout=settings.TOURNAMENT_BRACKET_CACHE_TIMEOUT)
+        return snapshot
+
+    @staticmethod
+    def build_bracket(tournament):
+        """
+        Render the bracket: brackets -> rounds -> matches with compact players
+        and the scores of their verified games, from two queries
+        """
+        from django.db.models import Prefetch
+        from rest_framework.settings import api_settings
+        from .models import Game, TournamentMatch
+        from .serializers import UserSummarySerializer
+
+        # Matches only have a game or two, so they are filtered here rather than
+        # in SQL, where a status filter steers the planner onto a games index scan
+        linked_games = Game.objects.order_by().only(
+            'game_type', 'status', 'played_at', 'player1_id', 'player2_id', 'team1_player1_id',
+            'team1_player2_id', 'team2_player1_id', 'team2_player2_id', 'player1_score', 'player2_score',
+        )
+        matches = list(
+            TournamentMatch.objects.filter(tournament=tournament)
+            .select_related('player1', 'player2')
+            .prefetch_related(Prefetch('games', queryset=linked_games))
+            .order_by('round_number', 'match_number')
+        )
+
+        players = {}
+        for match in matches:
+            for user in (match.player1, match.player2):
+                if user is not None:
+                    players[user.pk] = user
+        summaries = dict(zip(players, UserSummarySerializer(players.values(), many=True).data))
+
+        brackets = {}
+        for match in matches:
+            rounds = brackets.setdefault(match.bracket, {})
+            rounds.setdefault(match.round_number, []).append({
+                'id': match.pk,
+                'match_number': match.match_number,
+                'status': match.status,
+                'player1': summaries.get(match.player1_id),
+                'player2': summaries.get(match.player2_id),
+                'winner': match.winner_id,
+                'scores': [
+                    TournamentService.match_score(match, game)
+                    for game in sorted(match.games.all(), key=lambda game: game.played_at)
+                    if game.status == 'verified'
+                ],
+                'next_match': match.next_match_id,
+                'next_match_slot': match.next_match_slot,
+                'loser_next_match': match.loser_next_match_id,
+                'loser_next_match_slot': match.loser_next_match_slot,
+            })
+
+        order = [bracket for bracket, _ in TournamentMatch.BRACKETS]
+        data = {
+            'id': tournament.pk,
+            'tournament_type': tournament.tournament_type,
+            'status': tournament.status,
+            'brackets': [
+                {
+                    'bracket': bracket,
+                    'rounds': [
+                        {'round_number': round_number, 'matches': round_matches}
+                        for round_number, round_matches in brackets[bracket].items()
+                    ],
+                }
+                for bracket in sorted(brackets, key=order.index)
+            ],
+        }
+
+        content = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data)
+        etag = '"%s"' % hashlib.md5(content).hexdigest()
+        return content, etag
+
+    @staticmethod
+    def match_score(match, game):
+        """A game's score from the match's point of view, [player1 points, player2 points]"""
+        if game.game_type == 'singles':
+            first_side = {game.player1_id}
+        else:
+            first_side = {game.team1_player1_id, game.team1_player2_id}
+        if match.player1_id in first_side:
+            return [game.player1_score, game.player2_score]
+        return [game.player2_score, game.player1_score]
+
+    @staticmethod
+    def invalidate_bracket(tournament_id):
+        """Drop the tournament's bracket snapshot so the next request rebuilds it"""
+        try:
+            cache.incr(TournamentService.BRACKET_VERSION_KEY.format(tournament_id=tournament_id))
+        except ValueError:
+            # No version stored yet, so there is no snapshot to drop either
+            pass
+
+    @staticmethod
+    def invalidate_bracket_on_commit(tournament_id):
+        """Invalidate once the current transaction commits, so rebuilds see the new data"""
+        transaction.on_commit(lambda: TournamentService.invalidate_bracket(tournament_id))
+
+    @staticmethod
+    def join(tournament, user, waitlist=False):
+        """
+        Claim a spot in a tournament
+        The spot is taken with a single conditional UPDATE on participant_count,
+        so concurrent joins can't overfill the tournament. When it is full the
+        user is put on the waitlist if they asked for it.
+        Returns 'joined' or 'waitlisted', raises ValueError otherwise.
+        """
+        from django.db import IntegrityError
+        from django.db.models import F
+        from .models import Tournament, TournamentWaitlistEntry
+
+        Participant = Tournament.participants.through
+
+        with transaction.atomic():
+            claimed = Tournament.objects.filter(
+                pk=tournament.pk,
+                status='approved',
+                registration_end__gte=timezone.now(),
+                participant_count__lt=F('max_participants'),
+            ).update(participant_count=F('participant_count') + 1)
+
+            if claimed:
+                try:
+                    with transaction.atomic():
+                        Participant.objects.create(tournament_id=tournament.pk, user_id=user.pk)
+                except IntegrityError:
+                    # Raising rolls back the spot claimed above
+                    raise ValueError('Already joined this tournament')
+                TournamentWaitlistEntry.objects.filter(tournament_id=tournament.pk, user_id=user.pk).delete()
+                return 'joined'
+
+            tournament.refresh_from_db(fields=['status', 'registration_end'])
+            if tournament.status != 'approved':
+                raise ValueError('Tournament is not open for registration')
+            if timezone.now() > tournament.registration_end:
+                raise ValueError('Registration period has ended')
+            if Participant.objects.filter(tournament_id=tournament.pk, user_id=user.pk).exists():
+                raise ValueError('Already joined this tournament')
+            if not waitlist:
+                raise ValueError('Tournament is full')
+
+            TournamentWaitlistEntry.objects.get_or_create(tournament_id=tournament.pk, user_id=user.pk)
+            return 'waitlisted'
+
+    @staticmethod
+    def leave(tournament, user):
+        """
+        Give up a spot (or a place on the waitlist)
+        A freed spot goes straight to the first user on the waitlist, so it
+        never opens up for a regular join. Returns the promoted user's id or
+        None, raises ValueError if the user hadn't joined.
+        """
+        from django.db.models import F
+        from .models import Tournament, TournamentWaitlistEntry
+
+        Participant = Tournament.participants.through
+
+        with transaction.atomic():
+            left, _ = Participant.objects.filter(tournament_id=tournament.pk, user_id=user.pk).delete()
+            if not left:
+                waiting, _ = TournamentWaitlistEntry.objects.filter(
+                    tournament_id=tournament.pk, user_id=user.pk
+                ).delete()
+                if not waiting:
+                    raise ValueError('Not registered for this tournament')
+                return None
+
+            # Lock the tournament so two leaves can't promote the same entry
+            tournament = Tournament.objects.select_for_update().get(pk=tournament.pk)
+            entry = TournamentWaitlistEntry.objects.filter(tournament=tournament).order_by('created_at').first()
+            if entry is None:
+                Tournament.objects.filter(pk=tournament.pk).update(participant_count=F('participant_count') - 1)
+                return None
+
+            # The promoted user takes over the spot, the count stays the same
+            Participant.objects.create(tournament_id=tournament.pk, user_id=entry.user_id)
+            entry.delete()
+            NotificationService.fan_out(
+                [entry.user_id], 'tournament_waitlist',
+                title='Tournament Spot Available',
+                message=f'A spot opened up in {tournament.name}. You have been moved off the waitlist and are now registered.',
+                related_tournament=tournament,
+            )
+            return entry.user_id
+
+    @staticmethod
+    def recount_participants(tournament_id):
+        """Reset participant_count from the participants table (after direct edits)"""
+        from .models import Tournament
+
+        Participant = Tournament.participants.through
+        Tournament.objects.filter(pk=tournament_id).update(
+            participant_count=Participant.objects.filter(tournament_id=tournament_id).count()
+        )
@@ -0,0 +1,93 @@
+"""
+Signal handlers for keeping cached data in step with the models
+"""
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User, PlayerProfile, Game, Notification, Tournament, TournamentMatch
+from .services import NotificationService, RankingsService, TournamentService
+
+
+@receiver(post_save, sender=PlayerProfile)
+@receiver(post_delete, sender=PlayerProfile)
+def invalidate_rankings_on_profile_change(sender, **kwargs):
+    RankingsService.invalidate_on_commit()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_rankings_on_user_change(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the rankings don't show
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    RankingsService.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def invalidate_rankings_on_game_change(sender, instance, created=False, **kwargs):
+    # Newly reported games are pending and don't appear in the rankings
+    if created and instance.status == 'pending':
+        return
+    RankingsService.invalidate_on_commit()
+
+
+@receiver(post_save, sender=Tournament)
+def invalidate_bracket_on_tournament_change(sender, instance, created=False, **kwargs):
+    if not created:
+        TournamentService.invalidate_bracket_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=TournamentMatch)
+@receiver(post_delete, sender=TournamentMatch)
+def invalidate_bracket_on_match_change(sender, instance, **kwargs):
+    # Bulk inserts and updates skip this and invalidate explicitly
+    TournamentService.invalidate_bracket_on_commit(instance.tournament_id)
+
+
+@receiver(post_save, sender=Game)
+def invalidate_bracket_on_game_change(sender, instance, created=False, **kwargs):
+    # New games are linked to their match afterwards, see the m2m handler below
+    if created:
+        return
+    tournament_ids = TournamentMatch.objects.filter(games=instance).values_list('tournament_id', flat=True)
+    for tournament_id in set(tournament_ids):
+        TournamentService.invalidate_bracket_on_commit(tournament_id)
+
+
+@receiver(m2m_changed, sender=TournamentMatch.games.through)
+def invalidate_bracket_on_match_games_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the game side, instance is a Game
+        tournament_ids = TournamentMatch.objects.filter(pk__in=pk_set or ()).values_list('tournament_id', flat=True)
+        for tournament_id in set(tournament_ids):
+            TournamentService.invalidate_bracket_on_commit(tournament_id)
+    else:
+        TournamentService.invalidate_bracket_on_commit(instance.tournament_id)
+
+
+@receiver(m2m_changed, sender=Tournament.participants.through)
+def recount_participants_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Joins and leaves write the through table directly and keep the count themselves,
+    # this catches edits made through the relation (admin, shell)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    tournament_ids = (pk_set or ()) if reverse else [instance.pk]
+    for tournament_id in tournament_ids:
+        TournamentService.recount_participants(tournament_id)
+
+
+@receiver(post_save, sender=Notification)
+def count_and_publish_new_notification(sender, instance, created=False, **kwargs):
+    # Read state changes go through NotificationService.set_read/mark_all_read
+    if created:
+        NotificationService.publish_notification(instance)
+        if not instance.is_read:
+            NotificationService.reset_unread_count(instance.recipient_id)
+
+
+@receiver(post_delete, sender=Notification)
+def reset_unread_count_on_delete(sender, instance, **kwargs):
+    NotificationService.reset_unread_count(instance.recipient_id)
@@ -0,0 +1,163 @@
+"""
+Swiss system standings and pairings for Ping Pong Tracker
+Standings are updated one result at a time, tiebreaks included. Each round
+is paired by a maximum weight matching over every pair of players that
+haven't met, weighted so that equal scores meet first, then sides (who is
+player 1) are balanced, then the top half of a score group meets its bottom half.
+With an odd field the bye is settled first, see Standings.pair.
+"""
+import math
+from collections import Counter
+
+from .matching import max_weight_matching
+
+
+def round_count(player_count, rounds=None):
+    """
+    Rounds to play: the configured number, or by default the rounds needed
+    to separate a single leader, e.g. 5 rounds for 32 players
+    """
+    if rounds:
+        return rounds
+    return max(1, math.ceil(math.log2(player_count)))
+
+
+class Standings:
+    """
+    Scores and tiebreaks of a Swiss event
+    Players are any hashable ids, given in seed order. A win or a bye is
+    worth one point. Buchholz is the sum of the opponents' scores and
+    Sonneborn-Berger the sum of the scores of the opponents beaten, each
+    counted once per game, so rematches count twice; both are kept up to
+    date as results come in instead of being recomputed.
+    """
+
+    def __init__(self, players):
+        self.players = list(players)
+        self.seed = {player: index for index, player in enumerate(self.players)}
+        self.score = dict.fromkeys(self.players, 0)
+        self.buchholz = dict.fromkeys(self.players, 0)
+        self.sonneborn_berger = dict.fromkeys(self.players, 0)
+        self.opponents = {player: [] for player in self.players}
+        # Times each opponent has beaten the player
+        self.beaten_by = {player: Counter() for player in self.players}
+        # Times played as player 1 minus times played as player 2
+        self.sides = dict.fromkeys(self.players, 0)
+        self.byes = set()
+
+    def add_result(self, player1, player2, winner):
+        """Record a finished match"""
+        loser = player2 if winner == player1 else player1
+
+        self.opponents[winner].append(loser)
+        self.opponents[loser].append(winner)
+        self.beaten_by[loser][winner] += 1
+        self.sides[player1] += 1
+        self.sides[player2] -= 1
+
+        self.buchholz[winner] += self.score[loser]
+        self.buchholz[loser] += self.score[winner]
+        self.sonneborn_berger[winner] += self.score[loser]
+        self._add_point(winner)
+
+    def add_bye(self, player):
+        """Record a bye, worth a win but with no opponent for the tiebreaks"""
+        self.byes.add(player)
+        self._add_point(player)
+
+    def _add_point(self, player):
+        # Only the player's past opponents have tiebreaks depending on their score
+        self.score[player] += 1
+        for opponent in self.opponents[player]:
+            self.buchholz[opponent] += 1
+        for opponent, wins in self.beaten_by[player].items():
+            self.sonneborn_berger[opponent] += wins
+
+    def ranking(self):
+        """Players from first to last: score, Buchholz, Sonneborn-Berger, then seed"""
+        return sorted(self.players, key=lambda player: (
+            -self.score[player], -self.buchholz[player], -self.sonneborn_berger[player], self.seed[player]
+        ))
+
+    def pair(self):
+        """
+        Pairings for the next round
+        Returns (pairs, bye) where pairs is a list of (player1, player2) tuples
+        and bye is the player sitting out, or None with an even field.
+        Rematches are only allowed when there is no pairing without them. The
+        bye goes to the lowest ranked player who hasn't had one yet, or the
+        next one up when the others can't be paired without that player.
+        """
+        ranked = self.ranking()
+        candidates = [None]
+        if len(ranked) % 2:
+            eligible = [player for player in ranked if player not in self.byes] or ranked
+            candidates = eligible[::-1]
+
+        for allow_rematches in (False, True):
+            for bye in candidates:
+                players = [player for player in ranked if player != bye]
+                # Players more than a point apart almost never need to meet, leaving
+                # those pairs out shrinks the graph several times over in later rounds
+                for max_difference in (1, None):
+                    pairs = self._pair(players, max_difference, allow_rematches)
+                    if pairs is not None:
+                        return pairs, bye
+
+    def _pair(self, ranked, max_difference, allow_rematches):
+        count = len(ranked)
+        if not count:
+            return []
+        scores = [self.score[player] for player in ranked]
+        lowest, highest = min(scores), max(scores)
+
+        # Position of each player within their score group
+        group_position = {}
+        group_size = {}
+        for player in ranked:
+            score = self.score[player]
+            group_position[player] = group_size.get(score, 0)
+            group_size[score] = group_position[player] + 1
+
+        # Weight scales, each larger than anything the terms below it can add up to
+        order_weight = 1
+        side_weight = order_weight * (count // 2 + 1) * (count + 1)
+        score_weight = (count // 2 + 1) * (2 * side_weight + count + 1)
+        base = score_weight * (lowest - highest - 1) ** 2 + 1
+
+        def weight(a, b):
+            difference = self.score[a] - self.score[b]
+            side_clash = 0
+            if self.sides[a] * self.sides[b] > 0:
+                side_clash = min(abs(self.sides[a]), abs(self.sides[b]), 2)
+            transposition = 0
+            if difference == 0:
+                half = group_size[self.score[a]] // 2
+                transposition = abs(abs(group_position[a] - group_position[b]) - half)
+            return base - score_weight * difference ** 2 - side_weight * side_clash - order_weight * transposition
+
+        edges = []
+        for i in range(count):
+            a = ranked[i]
+            met = set(self.opponents[a])
+            for j in range(i + 1, count):
+                b = ranked[j]
+                if b in met and not allow_rematches:
+                    continue
+                if max_difference is not None and abs(self.score[a] - self.score[b]) > max_difference:
+                    continue
+                edges.append((i, j, weight(a, b)))
+
+        mate = max_weight_matching(edges, maxcardinality=True)
+        if len(mate) < count or -1 in mate:
+            return None
+
+        pairs = []
+        for i, j in enumerate(mate):
+            if i < j:
+                a, b = ranked[i], ranked[j]
+                # Whoever has been player 1 less often takes that side, the higher ranked on a tie
+                if self.sides[b] < self.sides[a]:
+                    a, b = b, a
+                pairs.append((a, b))
+        return pairs
@@ -1,3 +1,2376 @@
-from django.test import TestCase
+"""
+Tests for the Ping Pong Tracker core app
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+from importlib import import_module
+from io import StringIO
+from urllib.parse import parse_qs, urlparse
+
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core import mail, signing
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
+
+from . import brackets, jobs, renderers
+from .events import InMemoryEventBackend, PostgresEventBackend, user_channel
+from .matching import max_weight_matching
+from .models import (
+    User, PlayerProfile, Game, GameParticipant, WeeklyLeaderboard, Tournament, TournamentMatch,
+    TournamentWaitlistEntry, Trophy, Notification, Job, OutboundEmail, RatingHistory
+)
+from .pagination import GameCursorPagination, PlayerRankingPagination
+from .serializers import GameSerializer
+from .services import EmailService, GameService, NotificationService, TournamentService
+from .swiss import Standings
+from .trophies import TROPHY_RULES, TrophyRule
+from .views import GameViewSet
+
+
+def make_user(username, **fields):
+    """User with a player profile"""
+    fields.setdefault('display_name', username.title())
+    user = User.objects.create(username=username, email=f'{username}@example.com', **fields)
+    PlayerProfile.objects.create(user=user)
+    return user
+
+
+def run_concurrently(target, count):
+    """Call target(number) from `count` threads at once, each on its own connection"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def run(number):
+        try:
+            barrier.wait()
+            target(number)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(number,)) for number in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+# SQLite locks the whole database on write, so concurrency tests need PostgreSQL
+requires_row_locks = skipIf(connection.vendor == 'sqlite', 'needs a database with row level locking')
+requires_postgres = skipIf(connection.vendor != 'postgresql', 'needs PostgreSQL')
+
+
+def benchmark(cls):
+    """
+    Benchmarks print their measurements instead of asserting timings, run them with
+    BENCHMARK=1 python manage.py test core --tag benchmark
+    """
+    return tag('benchmark')(skipUnless(os.environ.get('BENCHMARK') == '1', 'set BENCHMARK=1 to run')(cls))
+
+
+def benchmark_size(name, default):
+    """Benchmark size, overridable as BENCHMARK_<NAME> in the environment"""
+    return int(os.environ.get(f'BENCHMARK_{name}', default))
+
+
+def report(title, rows):
+    print(f'\n{title}')
+    for label, value in rows:
+        print(f'  {label:<44} {value}')
+
+
+def make_tournament(created_by, participants=(), **fields):
+    """Single elimination singles tournament open for registration"""
+    now = timezone.now()
+    fields.setdefault('name', 'Spring Open')
+    fields.setdefault('status', 'approved')
+    fields.setdefault('max_participants', 16)
+    tournament = Tournament.objects.create(
+        description='', game_type='singles', created_by=created_by,
+        registration_start=now - timedelta(days=1), registration_end=now + timedelta(days=1),
+        tournament_start=now + timedelta(days=2), participant_count=len(participants), **fields
+    )
+    tournament.participants.add(*participants)
+    return tournament
+
+
+def make_game(player1, player2, status='verified', winner='player1', **fields):
+    """Singles game reported by player1"""
+    fields.setdefault('played_at', timezone.now())
+    return Game.objects.create(
+        game_type='singles', player1=player1, player2=player2, player1_score=11, player2_score=7,
+        winner=winner, reported_by=player1, status=status, **fields
+    )
+
+
+_flaky_calls = []
+
+
+@jobs.task('tests.flaky')
+def flaky(fail_times):
+    _flaky_calls.append(fail_times)
+    if len(_flaky_calls) <= fail_times:
+        raise RuntimeError('flaky job failed')
+
+
+@override_settings(JOBS_RUN_INLINE=True)
+class InlineJobsTests(TestCase):
+    """JOBS_RUN_INLINE runs due jobs on commit and leaves the rest to run_due_jobs"""
+
+    def setUp(self):
+        _flaky_calls.clear()
+
+    def test_due_job_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('tests.flaky', {'fail_times': 0})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(len(_flaky_calls), 1)
+
+    def test_delayed_job_waits_for_run_after(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('tests.flaky', {'fail_times': 0}, delay=timedelta(minutes=5))
+
+        self.assertEqual(jobs.run_due_jobs(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertEqual(_flaky_calls, [])
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_due_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+
+    def test_failed_job_is_retried(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.enqueue('tests.flaky', {'fail_times': 1})
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'pending')
+        self.assertGreater(job.run_after, timezone.now())
+
+        # Not due yet, so it isn't retried straight away
+        self.assertEqual(jobs.run_due_jobs(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(jobs.run_due_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertEqual(job.attempts, 2)
+
+
+@override_settings(JOBS_RUN_INLINE=True, ADMIN_EMAIL_DIGEST_INTERVAL=300)
+class EmailDigestTests(TestCase):
+    """Digest emails wait for their interval's flush and go out as one message"""
+
+    def test_digest_emails_are_not_sent_by_earlier_flushes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = EmailService.queue('Dispute 1', 'First', ['admin@example.com'], digest=True)
+            second = EmailService.queue('Dispute 2', 'Second', ['admin@example.com'], digest=True)
+            # Triggers an immediate flush
+            EmailService.queue('Welcome', 'Hello', ['player@example.com'])
+
+        self.assertEqual([message.subject for message in mail.outbox], ['Welcome'])
+        self.assertGreater(first.next_attempt_at, timezone.now())
+        self.assertEqual(OutboundEmail.objects.filter(digest=True, status='pending').count(), 2)
+
+        # The interval is over
+        OutboundEmail.objects.filter(pk__in=[first.pk, second.pk]).update(next_attempt_at=timezone.now())
+        Job.objects.filter(idempotency_key__startswith='email-digest:').update(run_after=timezone.now())
+        jobs.run_due_jobs()
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[1].subject, '2 admin alerts')
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 3)
+
+    def test_digest_joins_the_next_interval_once_its_flush_ran(self):
+        first = EmailService.queue('Dispute 1', 'First', ['admin@example.com'], digest=True)
+        Job.objects.filter(idempotency_key__startswith='email-digest:').update(status='succeeded')
+
+        second = EmailService.queue('Dispute 2', 'Second', ['admin@example.com'], digest=True)
+
+        self.assertEqual(second.next_attempt_at - first.next_attempt_at, timedelta(seconds=300))
+        self.assertEqual(Job.objects.filter(name='email.flush', status='pending').count(), 1)
+        self.assertEqual(mail.outbox, [])
+
+
+class HotQueryIndexTests(TestCase):
+    """The hot view queries are served by the indexes declared in Meta.indexes"""
+
+    def assertUsesIndex(self, queryset, *index_names):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Test tables are tiny, make the planner show which index it would use
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'Expected one of {index_names} in the query plan:\n{plan}'
+        )
+
+    def setUp(self):
+        self.user = make_user('alice')
+
+    def test_rankings_queries(self):
+        self.assertUsesIndex(
+            PlayerProfile.objects.filter(singles_games_played__gte=1).order_by('-singles_elo'),
+            'profile_singles_ranked_idx'
+        )
+        self.assertUsesIndex(
+            PlayerProfile.objects.filter(doubles_games_played__gte=1).order_by('-doubles_elo'),
+            'profile_doubles_ranked_idx'
+        )
+        self.assertUsesIndex(
+            PlayerProfile.objects.filter(weekly_points__gt=0).order_by('-weekly_points'),
+            'profile_weekly_points_idx'
+        )
+
+    def test_game_queries(self):
+        self.assertUsesIndex(
+            Game.objects.filter(status='verified').order_by('-played_at'),
+            'game_status_played_idx'
+        )
+        self.assertUsesIndex(
+            Game.objects.filter(status='pending').order_by('-played_at'),
+            'game_pending_idx', 'game_status_played_idx'
+        )
+
+    def test_notification_queries(self):
+        # A typical inbox: a long read history and a few unread, with statistics
+        # gathered so the planner knows how few rows the unread index holds
+        Notification.objects.bulk_create([
+            Notification(
+                recipient=self.user, notification_type='admin_alert', title='Alert', message='',
+                is_read=number >= 3
+            )
+            for number in range(500)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_notification')
+
+        self.assertUsesIndex(Notification.objects.filter(recipient=self.user, is_read=False), 'notification_unread_idx')
+        # One page, the way the list fetches it
+        self.assertUsesIndex(
+            Notification.objects.filter(recipient=self.user).order_by('-created_at', '-id')[:21],
+            'notification_keyset_idx'
+        )
+        # Every lookup above is served by the two indexes, a third would only slow down inserts
+        self.assertEqual(
+            sorted(index.name for index in Notification._meta.indexes),
+            ['notification_keyset_idx', 'notification_unread_idx']
+        )
+
+    def test_leaderboard_and_tournament_queries(self):
+        self.assertUsesIndex(
+            WeeklyLeaderboard.objects.filter(year=2026, week_number=12).order_by('-points'),
+            'weekly_leaderboard_week_idx'
+        )
+        self.assertUsesIndex(Tournament.objects.filter(status='approved'), 'tournament_status_idx')
+
+
+class GameParticipantTests(APITestCase):
+    """GameParticipant rows follow their game's players, status and date"""
+
+    def setUp(self):
+        self.alice, self.bob, self.carol, self.dave = (
+            make_user(name) for name in ('alice', 'bob', 'carol', 'dave')
+        )
+
+    def participants(self, game):
+        return sorted(
+            GameParticipant.objects.filter(game=game)
+            .values_list('user__username', 'side', 'slot', 'status', 'played_at')
+        )
+
+    def make_doubles(self, **fields):
+        return Game.objects.create(
+            game_type='doubles', team1_player1=self.alice, team1_player2=self.bob,
+            team2_player1=self.carol, team2_player2=self.dave, player1_score=11, player2_score=9,
+            winner='team1', reported_by=self.alice, played_at=timezone.now(), **fields
+        )
+
+    def test_singles_game(self):
+        game = make_game(self.alice, self.bob, status='pending')
+        self.assertEqual(self.participants(game), [
+            ('alice', 1, 1, 'pending', game.played_at),
+            ('bob', 2, 1, 'pending', game.played_at),
+        ])
+
+    def test_doubles_game(self):
+        game = self.make_doubles()
+        self.assertEqual(self.participants(game), [
+            ('alice', 1, 1, 'pending', game.played_at),
+            ('bob', 1, 2, 'pending', game.played_at),
+            ('carol', 2, 1, 'pending', game.played_at),
+            ('dave', 2, 2, 'pending', game.played_at),
+        ])
+
+    def test_status_and_date_follow_the_game(self):
+        game = self.make_doubles()
+        game.status = 'verified'
+        game.save(update_fields=['status'])
+        self.assertEqual({row[3] for row in self.participants(game)}, {'verified'})
+
+        game.played_at -= timedelta(days=1)
+        game.status = 'disputed'
+        game.save()
+        self.assertEqual({row[3:] for row in self.participants(game)}, {('disputed', game.played_at)})
+
+    def test_unrelated_update_leaves_rows_alone(self):
+        game = make_game(self.alice, self.bob, status='pending')
+        with CaptureQueriesContext(connection) as queries:
+            game.notes = 'Close one'
+            game.save(update_fields=['notes'])
+        self.assertFalse([query for query in queries if 'core_gameparticipant' in query['sql']])
+
+    def test_player_change_rewrites_rows(self):
+        game = make_game(self.alice, self.bob, status='pending')
+        game.player2 = self.carol
+        game.save(update_fields=['player2'])
+        self.assertEqual([row[:3] for row in self.participants(game)], [('alice', 1, 1), ('carol', 2, 1)])
+
+    def test_player_games_lists_verified_singles_and_doubles(self):
+        singles = make_game(self.alice, self.bob, played_at=timezone.now() - timedelta(hours=1))
+        doubles = self.make_doubles(status='verified')
+        make_game(self.alice, self.carol, status='pending')
+        make_game(self.bob, self.carol)
+
+        self.client.force_authenticate(self.alice)
+        response = self.client.get(f'/api/profiles/{self.alice.profile.pk}/games/')
+        self.assertEqual([game['id'] for game in response.json()], [str(doubles.pk), str(singles.pk)])
+
+    def test_games_filtered_by_player(self):
+        doubles = self.make_doubles()
+        singles = make_game(self.bob, self.alice, status='pending', played_at=timezone.now() - timedelta(hours=1))
+        make_game(self.bob, self.carol)
+
+        self.client.force_authenticate(self.bob)
+        response = self.client.get('/api/games/', {'player': self.alice.pk})
+        self.assertEqual([game['id'] for game in response.json()['results']], [str(doubles.pk), str(singles.pk)])
+
+    def test_backfill_migration(self):
+        backfill = import_module('core.migrations.0009_backfill_gameparticipants')
+        games = [make_game(self.alice, self.bob), self.make_doubles(), make_game(self.carol, self.dave, status='disputed')]
+        expected = [self.participants(game) for game in games]
+        GameParticipant.objects.all().delete()
+
+        # Batches smaller than a game's rows, so the flush boundaries are crossed
+        with mock.patch.object(backfill, 'BATCH_SIZE', 3):
+            backfill.backfill_participants(django_apps, None)
+            # Running it again adds nothing
+            backfill.backfill_participants(django_apps, None)
+
+        self.assertEqual([self.participants(game) for game in games], expected)
+        self.assertEqual(GameParticipant.objects.count(), 8)
+
+
+class EndpointQueryCountTests(APITestCase):
+    """List and detail endpoints run a fixed number of queries however many rows they return"""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [make_user(f'player{number}') for number in range(6)]
+        self.client.force_authenticate(self.users[0])
+        self.add_rows(2)
+
+    def add_rows(self, count):
+        """More games, notifications and tournaments, touching every nested user"""
+        users = self.users
+        for number in range(count):
+            game = make_game(users[number % 6], users[(number + 1) % 6], verified_by=users[(number + 1) % 6])
+            Notification.objects.create(
+                recipient=users[0], notification_type='game_verified', title='Game verified',
+                message='Your game was verified', related_game=game, related_user=users[1]
+            )
+            make_tournament(users[number % 6], participants=users[:4], name=f'Tournament {Tournament.objects.count()}')
+        self.game = game
+        PlayerProfile.objects.update(singles_games_played=1, weekly_points=10)
+
+    def assertQueriesFixed(self, url, expected):
+        for _ in range(2):
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.add_rows(8)
+
+    def test_game_list(self):
+        self.assertQueriesFixed('/api/games/', 1)
+
+    def test_game_detail(self):
+        self.assertQueriesFixed(f'/api/games/{self.game.pk}/', 1)
+
+    def test_profile_list(self):
+        # Count and page
+        self.assertQueriesFixed('/api/profiles/', 2)
+
+    def test_profile_detail(self):
+        self.assertQueriesFixed(f'/api/profiles/{self.users[1].profile.pk}/', 1)
+
+    def test_profile_games(self):
+        # Profile and games
+        self.assertQueriesFixed(f'/api/profiles/{self.users[1].profile.pk}/games/', 2)
+
+    def test_notification_list(self):
+        self.assertQueriesFixed('/api/notifications/', 1)
+
+    def test_tournament_list(self):
+        # Count, page and participants
+        self.assertQueriesFixed('/api/tournaments/', 3)
+
+    def test_tournament_detail(self):
+        tournament = Tournament.objects.first()
+        self.assertQueriesFixed(f'/api/tournaments/{tournament.pk}/', 2)
+
+    def test_rankings(self):
+        # Rebuilding the snapshot: singles, doubles, recent games, weekly and all players
+        self.assertQueriesFixed('/api/rankings/', 5)
+
+
+class KeysetPaginationTests(APITestCase):
+    """Games and notifications page by cursor, forwards and backwards, or by page number on request"""
+
+    def setUp(self):
+        self.alice, self.bob = make_user('alice'), make_user('bob')
+        self.client.force_authenticate(self.alice)
+        # Ties on played_at, ordered by id within them
+        moments = [timezone.now() - timedelta(hours=hours) for hours in (0, 1, 1, 1, 1, 2, 3)]
+        self.games = sorted(
+            (make_game(self.alice, self.bob, played_at=moment) for moment in moments),
+            key=lambda game: (game.played_at, game.pk), reverse=True
+        )
+
+    def page(self, link=None, **params):
+        if link:
+            params['cursor'] = parse_qs(urlparse(link).query)['cursor'][0]
+        response = self.client.get('/api/games/', {'page_size': 3, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, data):
+        return [game['id'] for game in data['results']]
+
+    def test_pages_forwards_and_backwards(self):
+        expected = [str(game.pk) for game in self.games]
+        pages = [self.page()]
+        self.assertIsNone(pages[0]['previous'])
+        while pages[-1]['next']:
+            pages.append(self.page(pages[-1]['next']))
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual([game_id for page in pages for game_id in self.ids(page)], expected)
+
+        # Back from the last page, through the tie on played_at
+        middle = self.page(pages[2]['previous'])
+        self.assertEqual(self.ids(middle), self.ids(pages[1]))
+        first = self.page(middle['previous'])
+        self.assertEqual(self.ids(first), self.ids(pages[0]))
+        self.assertIsNone(first['previous'])
+        self.assertEqual(self.ids(self.page(first['next'])), self.ids(pages[1]))
+
+    def test_bare_position_cursor_still_reads_forwards(self):
+        position = [self.games[2].played_at.isoformat(), str(self.games[2].pk)]
+        cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+        data = self.page(cursor=cursor)
+        self.assertEqual(self.ids(data), [str(game.pk) for game in self.games[3:6]])
+
+    def test_malformed_cursor_is_not_found(self):
+        def encode(payload):
+            return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+        for cursor in [
+            'not-base64!', base64.urlsafe_b64encode(b'\xff\xfe').decode(), encode('text'), encode([1]),
+            encode(['yesterday', 'not-a-uuid']), encode({'position': [1, 2], 'reverse': 'yes'}),
+        ]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/games/', {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json()['detail'], 'Invalid cursor')
+
+    def test_page_numbers_on_request(self):
+        # Same pages as before cursors, PAGE_SIZE games each
+        older = [
+            make_game(self.alice, self.bob, played_at=timezone.now() - timedelta(days=1, hours=hours))
+            for hours in range(16)
+        ]
+        response = self.client.get('/api/games/', {'page': 2})
+
+        data = response.json()
+        self.assertEqual(data['count'], 23)
+        self.assertEqual(self.ids(data), [str(game.pk) for game in older[-3:]])
+        self.assertIsNone(data['next'])
+        self.assertIn('/api/games/', data['previous'])
+
+    def test_notifications(self):
+        notifications = [
+            Notification.objects.create(
+                recipient=self.alice, notification_type='admin_alert', title='Alert', message=str(number)
+            )
+            for number in range(5)
+        ]
+        Notification.objects.create(recipient=self.bob, notification_type='admin_alert', title='Alert', message='')
+        expected = [str(notification.pk) for notification in sorted(
+            notifications, key=lambda notification: (notification.created_at, notification.pk), reverse=True
+        )]
+
+        first = self.client.get('/api/notifications/', {'page_size': 3}).json()
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+        second = self.client.get('/api/notifications/', {'page_size': 3, 'cursor': cursor}).json()
+
+        self.assertEqual(self.ids(first) + self.ids(second), expected)
+        self.assertIsNone(second['next'])
+
+
+class RankingsSnapshotTests(APITestCase):
+    """The cached rankings snapshot follows changes, even ones made by another process"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob = make_user('alice'), make_user('bob')
+        self.client.force_authenticate(self.alice)
+
+    def rankings(self, **headers):
+        return self.client.get('/api/rankings/', headers=headers)
+
+    def test_unchanged_snapshot_is_not_modified(self):
+        etag = self.rankings()['ETag']
+        with self.assertNumQueries(0):
+            response = self.rankings(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_verification_invalidates_snapshot(self):
+        etag = self.rankings()['ETag']
+        game = make_game(self.alice, self.bob, status='pending')
+        self.client.force_authenticate(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+
+        response = self.rankings(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['singles_rankings'][0]['user']['username'], 'alice')
+
+    def test_change_from_another_process_shows_after_timeout(self):
+        etag = self.rankings()['ETag']
+        # Written without invalidating, like a worker or instance with its own cache
+        PlayerProfile.objects.filter(user=self.bob).update(singles_elo=1500, singles_games_played=1)
+        self.assertEqual(self.rankings(if_none_match=etag).status_code, 304)
+
+        later = time.time() + settings.RANKINGS_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.rankings(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['singles_rankings'][0]['user']['username'], 'bob')
+
+
+class PlayerListTests(APITestCase):
+    """The player list pages through every profile by rating, and rankings can leave it out"""
+
+    def setUp(self):
+        cache.clear()
+        self.users = [make_user(f'player{number:02}') for number in range(25)]
+        for number, user in enumerate(self.users):
+            # Five players on each rating, so pages break inside ties
+            PlayerProfile.objects.filter(user=user).update(
+                singles_elo=1200 + number % 5 * 10, singles_games_played=number
+            )
+        self.client.force_authenticate(self.users[0])
+        self.expected = list(PlayerProfile.objects.order_by('-singles_elo', '-id').values_list('id', flat=True))
+
+    def players(self, url='/api/rankings/players/', **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_pages_follow_rating_then_id(self):
+        seen = []
+        page = self.players(page_size=4)
+        while True:
+            seen += [player['id'] for player in page['results']]
+            if page['next'] is None:
+                break
+            page = self.players(page['next'])
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_page(self):
+        first = self.players(page_size=4)
+        second = self.players(first['next'])
+        self.assertEqual(self.players(second['previous'])['results'], first['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_page_size(self):
+        self.assertEqual(len(self.players()['results']), 20)
+        self.assertEqual(len(self.players(page_size='abc')['results']), 20)
+        self.assertEqual(len(self.players(page_size=0)['results']), 20)
+        self.assertEqual(len(self.players(page_size=25)['results']), 25)
+        with mock.patch.object(PlayerRankingPagination, 'max_page_size', 10):
+            self.assertEqual(len(self.players(page_size=25)['results']), 10)
+
+    def test_last_page_boundary(self):
+        # A full last page has no next link, the extra row fetched finds nothing
+        page = self.players(page_size=25)
+        self.assertEqual(len(page['results']), 25)
+        self.assertIsNone(page['next'])
+
+        page = self.players(page_size=24)
+        self.assertIsNotNone(page['next'])
+        last = self.players(page['next'])
+        self.assertEqual([player['id'] for player in last['results']], self.expected[24:])
+        self.assertIsNone(last['next'])
+
+    def test_one_query_per_page(self):
+        page = self.players(page_size=5)
+        with self.assertNumQueries(1):
+            self.players(page['next'])
+
+    def test_search_and_min_games(self):
+        page = self.players(search='PLAYER1')
+        self.assertEqual(
+            sorted(player['user']['username'] for player in page['results']),
+            [f'player{number}' for number in range(10, 20)]
+        )
+        page = self.players(min_games=20)
+        self.assertEqual(sorted(player['singles_games_played'] for player in page['results']), list(range(20, 25)))
+        self.assertEqual(self.client.get('/api/rankings/players/', {'min_games': 'many'}).status_code, 400)
+
+    def test_rankings_can_leave_out_all_players(self):
+        full = self.client.get('/api/rankings/')
+        compact = self.client.get('/api/rankings/', {'all_players': 'False'})
+
+        self.assertEqual(len(full.json()['all_players']), 25)
+        self.assertNotIn('all_players', compact.json())
+        self.assertEqual(compact.json()['singles_rankings'], full.json()['singles_rankings'])
+        self.assertNotEqual(compact['ETag'], full['ETag'])
+
+
+class BracketSnapshotTests(APITestCase):
+    """The cached bracket follows the tournament's matches, even changes made by another process"""
+
+    def setUp(self):
+        cache.clear()
+        self.players = [make_user(f'player{number}') for number in range(4)]
+        self.tournament = make_tournament(self.players[0], participants=self.players)
+        TournamentService.generate_bracket(self.tournament)
+        self.client.force_authenticate(self.players[0])
+
+    def bracket(self, **headers):
+        return self.client.get(f'/api/tournaments/{self.tournament.pk}/matches/', headers=headers)
+
+    def first_match(self):
+        return TournamentMatch.objects.get(tournament=self.tournament, round_number=1, match_number=1)
+
+    def match_data(self, response, round_number=1, match_number=1):
+        rounds = response.json()['brackets'][0]['rounds']
+        return rounds[round_number - 1]['matches'][match_number - 1]
+
+    def test_bracket_layout(self):
+        response = self.bracket()
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'in_progress')
+        self.assertEqual([bracket['bracket'] for bracket in data['brackets']], ['winners'])
+        rounds = data['brackets'][0]['rounds']
+        self.assertEqual([len(round_data['matches']) for round_data in rounds], [2, 1])
+        final = rounds[1]['matches'][0]
+        self.assertEqual(rounds[0]['matches'][0]['next_match'], final['id'])
+        self.assertIsNone(final['player1'])
+        match = self.first_match()
+        self.assertEqual(self.match_data(response)['player1']['id'], str(match.player1_id))
+
+    def test_unchanged_snapshot_is_not_modified(self):
+        etag = self.bracket()['ETag']
+        with mock.patch.object(TournamentService, 'build_bracket') as build_bracket:
+            response = self.bracket(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        build_bracket.assert_not_called()
+
+    def test_reported_game_invalidates_snapshot(self):
+        etag = self.bracket()['ETag']
+        match = self.first_match()
+        self.client.force_authenticate(match.player1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/games/', {
+                'game_type': 'singles', 'player1': match.player1_id, 'player2': match.player2_id,
+                'player1_score': 11, 'player2_score': 7, 'winner': 'player1',
+                'played_at': timezone.now().isoformat(), 'tournament_match': match.pk,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+
+        response = self.bracket(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.match_data(response)['status'], 'in_progress')
+
+    def test_completed_match_invalidates_snapshot(self):
+        self.bracket()
+        match = self.first_match()
+        # Reported by the match's player 2, the scores are shown from player 1's side
+        game = make_game(match.player2, match.player1)
+        with self.captureOnCommitCallbacks(execute=True):
+            match.games.add(game)
+            TournamentService.complete_match(match.pk, game)
+
+        response = self.bracket()
+        self.assertEqual(self.match_data(response)['winner'], str(match.player2_id))
+        self.assertEqual(self.match_data(response)['scores'], [[7, 11]])
+        self.assertEqual(self.match_data(response, round_number=2)['player1']['id'], str(match.player2_id))
+
+    def test_change_from_another_process_shows_after_timeout(self):
+        etag = self.bracket()['ETag']
+        # Written without invalidating, like a worker or instance with its own cache
+        TournamentMatch.objects.filter(pk=self.first_match().pk).update(status='in_progress')
+        self.assertEqual(self.bracket(if_none_match=etag).status_code, 304)
+
+        later = time.time() + settings.TOURNAMENT_BRACKET_CACHE_TIMEOUT + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            response = self.bracket(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.match_data(response)['status'], 'in_progress')
+
+    def test_evicted_version_does_not_bring_back_an_old_snapshot(self):
+        self.bracket()
+        TournamentMatch.objects.filter(pk=self.first_match().pk).update(status='in_progress')
+        cache.delete(TournamentService.BRACKET_VERSION_KEY.format(tournament_id=self.tournament.pk))
+
+        self.assertEqual(self.match_data(self.bracket())['status'], 'in_progress')
+
+
+class RatingHistoryTests(APITestCase):
+    """The rating history endpoint reports one row per day or week, closing rating first"""
+
+    def setUp(self):
+        self.alice, self.bob = make_user('alice'), make_user('bob')
+        self.client.force_authenticate(self.alice)
+        self.start = timezone.make_aware(datetime(2026, 3, 2, 9))
+
+    def record(self, rating, days=0, hours=0):
+        played_at = self.start + timedelta(days=days, hours=hours)
+        return RatingHistory.objects.create(
+            player=self.alice, game=make_game(self.alice, self.bob, played_at=played_at), game_type='singles',
+            rating_before=1200, rating_after=rating, timestamp=played_at
+        )
+
+    def history(self, player=None, **params):
+        profile_id = (player or self.alice).profile.pk
+        return self.client.get(f'/api/profiles/{profile_id}/rating_history/', params)
+
+    def test_one_row_per_day(self):
+        self.record(1210)
+        self.record(1190, hours=3)
+        # Two games at the same moment: the later id closes the day
+        tied = [self.record(1195, hours=5), self.record(1205, hours=5)]
+        self.record(1220, days=1)
+
+        response = self.history()
+
+        self.assertEqual(response.status_code, 200)
+        closing = max(tied, key=lambda row: row.pk).rating_after
+        self.assertEqual(response.json()['results'], [
+            {'date': '2026-03-02T00:00:00Z', 'rating': closing, 'high': 1210, 'low': 1190, 'games': 4},
+            {'date': '2026-03-03T00:00:00Z', 'rating': 1220, 'high': 1220, 'low': 1220, 'games': 1},
+        ])
+
+    def test_weekly_buckets(self):
+        self.record(1210)
+        self.record(1220, days=6)
+        self.record(1230, days=7)
+
+        response = self.history(bucket='week')
+
+        self.assertEqual(
+            [(row['date'], row['rating'], row['games']) for row in response.json()['results']],
+            [('2026-03-02T00:00:00Z', 1220, 2), ('2026-03-09T00:00:00Z', 1230, 1)]
+        )
+
+    def test_pages_follow_each_other(self):
+        for day in range(5):
+            self.record(1200 + day, days=day)
+            self.record(1300 + day, days=day, hours=1)
+
+        ratings, params = [], {'page_size': 2}
+        while True:
+            data = self.history(**params).json()
+            ratings += [row['rating'] for row in data['results']]
+            if data['next'] is None:
+                break
+            params['cursor'] = parse_qs(urlparse(data['next']).query)['cursor'][0]
+
+        self.assertEqual(ratings, [1300, 1301, 1302, 1303, 1304])
+
+    def test_other_game_type_and_bad_parameters(self):
+        self.record(1210)
+        self.assertEqual(self.history(game_type='doubles').json()['results'], [])
+        self.assertEqual(self.history(game_type='triples').status_code, 400)
+        self.assertEqual(self.history(bucket='month').status_code, 400)
+
+    def test_unknown_player(self):
+        response = self.client.get('/api/profiles/999999/rating_history/')
+        self.assertEqual(response.status_code, 404)
+
+
+class UnreadCountTests(TestCase):
+    """The cached unread counter follows read state changes without drifting from the database"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('alice')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notifications = [
+                Notification.objects.create(
+                    recipient=self.user, notification_type='admin_alert', title='Alert', message=str(number)
+                )
+                for number in range(3)
+            ]
+
+    def assertCountMatchesDatabase(self):
+        self.assertEqual(
+            NotificationService.get_unread_count(self.user.pk),
+            Notification.objects.filter(recipient=self.user, is_read=False).count()
+        )
+
+    def create_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(
+                recipient=self.user, notification_type='admin_alert', title='Alert', message='new'
+            )
+
+    def test_new_notifications_are_counted(self):
+        self.assertEqual(NotificationService.get_unread_count(self.user.pk), 3)
+
+    def test_racing_requests_change_the_counter_once(self):
+        # Two requests that both loaded the notification while it was unread
+        first, second = Notification.objects.get(pk=self.notifications[0].pk), self.notifications[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(NotificationService.set_read(first, True))
+            self.assertFalse(NotificationService.set_read(second, True))
+
+        self.assertEqual(NotificationService.get_unread_count(self.user.pk), 2)
+        self.assertCountMatchesDatabase()
+
+    def test_mark_all_read(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            NotificationService.set_read(self.notifications[0], True)
+            NotificationService.mark_all_read(self.user)
+            NotificationService.set_read(self.notifications[1], False)
+
+        self.assertEqual(NotificationService.get_unread_count(self.user.pk), 1)
+        self.assertCountMatchesDatabase()
+
+    def test_counter_with_open_streams(self):
+        # Publishing the count to a listening stream must not seed the cache mid-commit
+        cache.clear()
+        backend = mock.Mock(**{'has_subscribers.return_value': True})
+        with mock.patch('core.events.get_backend', return_value=backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                for number in range(2):
+                    Notification.objects.create(
+                        recipient=self.user, notification_type='admin_alert', title='Alert', message=str(number)
+                    )
+
+        self.assertCountMatchesDatabase()
+
+    def test_change_committed_during_a_count_is_not_missed(self):
+        cache.clear()
+        count = QuerySet.count
+        notified = []
+
+        def count_then_notify(queryset):
+            result = count(queryset)
+            if not notified:
+                # Commits after the count was taken, before it is cached
+                notified.append(self.create_notification())
+            return result
+
+        with mock.patch.object(QuerySet, 'count', count_then_notify):
+            self.assertEqual(NotificationService.get_unread_count(self.user.pk), 3)
+
+        self.assertEqual(NotificationService.get_unread_count(self.user.pk), 4)
+        self.assertCountMatchesDatabase()
+
+    def test_count_taken_before_the_commit_callback_is_not_counted_twice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(
+                recipient=self.user, notification_type='admin_alert', title='Alert', message='new'
+            )
+            # Already sees the new row, the counter change is still queued
+            self.assertEqual(NotificationService.get_unread_count(self.user.pk), 4)
+
+        self.assertEqual(NotificationService.get_unread_count(self.user.pk), 4)
+        self.assertCountMatchesDatabase()
+
+    def test_changes_do_not_count_for_open_streams(self):
+        backend = mock.Mock(**{'has_subscribers.return_value': True})
+        with mock.patch('core.events.get_backend', return_value=backend):
+            with self.assertNumQueries(1), self.captureOnCommitCallbacks(execute=True):
+                NotificationService.set_read(self.notifications[0], True)
+
+        backend.publish_many.assert_called_once_with([(user_channel(self.user.pk), {'type': 'unread_count', 'data': {}})])
+        # The first stream to read it counts, the others get it from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(NotificationService.get_unread_count(self.user.pk), 2)
+            self.assertEqual(NotificationService.get_unread_count(self.user.pk), 2)
+
+
+@requires_row_locks
+class ConcurrentUnreadCountTests(TransactionTestCase):
+    """Concurrent read/unread toggles leave the counter equal to the database count"""
+
+    def test_concurrent_toggles(self):
+        cache.clear()
+        user = make_user('alice')
+        notification_ids = [
+            Notification.objects.create(
+                recipient=user, notification_type='admin_alert', title='Alert', message=str(number)
+            ).pk
+            for number in range(10)
+        ]
+        # Prime the cache so every change below invalidates it
+        self.assertEqual(NotificationService.get_unread_count(user.pk), 10)
+
+        def toggle(number):
+            rng = random.Random(number)
+            for _ in range(20):
+                notification = Notification.objects.get(pk=rng.choice(notification_ids))
+                NotificationService.set_read(notification, rng.random() < 0.5)
+            if number % 10 == 0:
+                NotificationService.mark_all_read(user)
+
+        self.assertEqual(run_concurrently(toggle, 20), [])
+        self.assertEqual(
+            NotificationService.get_unread_count(user.pk),
+            Notification.objects.filter(recipient=user, is_read=False).count()
+        )
+
+
+class NotificationFanOutTests(TestCase):
+    """fan_out writes one notification per distinct recipient, in one INSERT once the transaction commits"""
+
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob = make_user('alice'), make_user('bob')
+        self.backend = InMemoryEventBackend()
+        patcher = mock.patch('core.events.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fan_out(self, recipients):
+        NotificationService.fan_out(
+            recipients, 'admin_alert', title='Alert', message='Check this', related_user=self.bob
+        )
+
+    def test_recipients_are_deduplicated(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fan_out([self.alice, self.alice.pk, None, self.bob, self.bob])
+
+        self.assertCountEqual(
+            Notification.objects.values_list('recipient__username', 'related_user__username'),
+            [('alice', 'bob'), ('bob', 'bob')]
+        )
+
+    def test_one_insert_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.fan_out([self.alice, self.bob])
+            self.assertFalse(Notification.objects.exists())
+
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_rolled_back_transaction_writes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.fan_out([self.alice, self.bob])
+                    raise RuntimeError('request failed')
+            except RuntimeError:
+                pass
+
+        self.assertFalse(Notification.objects.exists())
+
+    def test_each_recipient_count_and_stream_is_updated(self):
+        self.assertEqual(NotificationService.get_unread_count(self.alice.pk), 0)
+        self.assertEqual(NotificationService.get_unread_count(self.bob.pk), 0)
+        # Only alice has a stream open
+        self.backend.has_subscribers = lambda channel: channel == user_channel(self.alice.pk)
+        self.backend.publish_many = mock.Mock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.fan_out([self.alice, self.bob])
+
+        self.assertEqual(NotificationService.get_unread_count(self.alice.pk), 1)
+        self.assertEqual(NotificationService.get_unread_count(self.bob.pk), 1)
+        notification = Notification.objects.get(recipient=self.alice)
+        # One batch per kind of event, not one publish per recipient
+        self.assertEqual(self.backend.publish_many.call_args_list, [
+            mock.call([(user_channel(self.alice.pk), {'type': 'notification', 'data': {'id': str(notification.pk)}})]),
+            mock.call([(user_channel(self.alice.pk), {'type': 'unread_count', 'data': {}})]),
+        ])
+
+
+class NotificationStreamTests(APITestCase):
+    """The event stream opens with a short-lived stream ticket, never with the API token"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('alice')
+        Notification.objects.create(recipient=self.user, notification_type='admin_alert', title='Alert', message='')
+        backend = InMemoryEventBackend()
+        for target in ('core.views.get_backend', 'core.events.get_backend'):
+            patcher = mock.patch(target, return_value=backend)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def open_stream(self, **params):
+        return await self.async_client.get('/api/notifications/stream/', params)
+
+    async def test_ticket_opens_stream(self):
+        response = await self.open_stream(ticket=NotificationService.create_stream_ticket(self.user.pk))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b'event: unread_count\ndata: {"count":1}\n\n')
+        await content.aclose()
+
+    def create_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(
+                recipient=self.user, notification_type='admin_alert', title='New', message=''
+            )
+
+    async def test_new_notification_is_streamed(self):
+        response = await self.open_stream(ticket=NotificationService.create_stream_ticket(self.user.pk))
+        content = aiter(response.streaming_content)
+        await anext(content)
+
+        notification = await sync_to_async(self.create_notification)()
+
+        event = await anext(content)
+        self.assertTrue(event.startswith(b'event: notification\n'))
+        self.assertIn(f'"id":"{notification.pk}"'.encode(), event)
+        self.assertIn(b'"title":"New"', event)
+        self.assertEqual(await anext(content), b'event: unread_count\ndata: {"count":2}\n\n')
+        await content.aclose()
+
+    async def test_api_token_is_refused(self):
+        token = await sync_to_async(Token.objects.create)(user=self.user)
+
+        response = await self.open_stream(token=token.key)
+        self.assertEqual(response.status_code, 401)
+        response = await self.open_stream(ticket=token.key)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_ticket_signed_for_another_purpose_is_refused(self):
+        ticket = signing.TimestampSigner(salt='password-reset').sign(str(self.user.pk))
+
+        response = await self.open_stream(ticket=ticket)
+        self.assertEqual(response.status_code, 401)
+
+    async def test_expired_ticket_is_refused(self):
+        issued_at = timezone.now() - timedelta(seconds=61)
+        with mock.patch('time.time', return_value=issued_at.timestamp()):
+            ticket = NotificationService.create_stream_ticket(self.user.pk)
+
+        with override_settings(NOTIFICATION_STREAM_TICKET_MAX_AGE=60):
+            response = await self.open_stream(ticket=ticket)
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_ticket_endpoint(self):
+        self.assertEqual(self.client.post('/api/notifications/stream_ticket/').status_code, 401)
+
+        self.client.force_authenticate(self.user)
+        response = self.client.post('/api/notifications/stream_ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(NotificationService.read_stream_ticket(response.data['ticket']), str(self.user.pk))
+
+
+class PostgresEventBackendTests(TransactionTestCase):
+    """Events published on one connection reach subscribers through LISTEN/NOTIFY"""
+
+    def setUp(self):
+        self.backend = PostgresEventBackend()
+        self.backend.poll_interval = 0.1
+        self.addCleanup(self.backend.close)
+
+    def test_oversized_event_is_refused(self):
+        with self.assertRaises(ValueError):
+            self.backend.publish(user_channel(1), {'type': 'notification', 'data': {'message': 'x' * 8000}})
+
+    async def test_waiting_for_the_listener_keeps_the_loop_running(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        self.backend.poll_interval = 0.5
+        self.backend.reconnect_delay = 0.05
+        with mock.patch.object(PostgresEventBackend, '_connect', side_effect=OSError('database is down')), \
+                mock.patch('builtins.print'):
+            self.backend.subscribe(user_channel(1))
+            ticker = asyncio.create_task(tick())
+            await self.backend.wait_listening()
+            ticker.cancel()
+            await sync_to_async(self.backend.close, thread_sensitive=False)()
+
+        self.assertGreater(ticks, 10)
+
+    @requires_postgres
+    async def test_event_from_another_connection(self):
+        subscription = self.backend.subscribe(user_channel(1))
+        other = self.backend.subscribe(user_channel(2))
+        await self.backend.wait_listening()
+
+        def publish():
+            # Another process, as far as the listener can tell
+            try:
+                self.backend.publish(user_channel(1), {'type': 'unread_count', 'data': {'count': 4}})
+            finally:
+                connection.close()
+
+        await sync_to_async(publish, thread_sensitive=False)()
+
+        self.assertEqual(await subscription.get(timeout=5), {'type': 'unread_count', 'data': {'count': 4}})
+        self.assertIsNone(await other.get(timeout=0.2))
+        subscription.close()
+        other.close()
+
+    @requires_postgres
+    async def test_batch_is_one_query(self):
+        subscriptions = [self.backend.subscribe(user_channel(user_id)) for user_id in (1, 2)]
+        await self.backend.wait_listening()
+
+        def publish():
+            try:
+                with CaptureQueriesContext(connection) as queries:
+                    self.backend.publish_many([
+                        (user_channel(1), {'type': 'notification', 'data': {'id': 'a'}}),
+                        (user_channel(2), {'type': 'notification', 'data': {'id': 'b'}}),
+                        (user_channel(1), {'type': 'unread_count', 'data': {}}),
+                    ])
+                return len(queries)
+            finally:
+                connection.close()
+
+        self.assertEqual(await sync_to_async(publish, thread_sensitive=False)(), 1)
+        self.assertEqual(await subscriptions[0].get(timeout=5), {'type': 'notification', 'data': {'id': 'a'}})
+        self.assertEqual(await subscriptions[0].get(timeout=5), {'type': 'unread_count', 'data': {}})
+        self.assertEqual(await subscriptions[1].get(timeout=5), {'type': 'notification', 'data': {'id': 'b'}})
+        for subscription in subscriptions:
+            subscription.close()
+
+
+class TournamentJoinTests(TestCase):
+    """Joins stop at max_participants and overflow onto the waitlist"""
+
+    def setUp(self):
+        self.users = [make_user(f'player{number}') for number in range(20)]
+        self.tournament = make_tournament(self.users[0], max_participants=16)
+
+    def test_full_tournament_waitlists(self):
+        results = [TournamentService.join(self.tournament, user, waitlist=True) for user in self.users]
+
+        self.assertEqual(results.count('joined'), 16)
+        self.assertEqual(results.count('waitlisted'), 4)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.participant_count, 16)
+        self.assertEqual(self.tournament.participants.count(), 16)
+
+    def test_full_tournament_without_waitlist(self):
+        for user in self.users[:16]:
+            TournamentService.join(self.tournament, user)
+        with self.assertRaisesMessage(ValueError, 'Tournament is full'):
+            TournamentService.join(self.tournament, self.users[16])
+
+    def test_duplicate_join_keeps_the_count(self):
+        TournamentService.join(self.tournament, self.users[0])
+        with self.assertRaisesMessage(ValueError, 'Already joined this tournament'):
+            TournamentService.join(self.tournament, self.users[0])
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.participant_count, 1)
+
+    def test_leave_promotes_the_first_waitlisted_user(self):
+        for user in self.users[:18]:
+            TournamentService.join(self.tournament, user, waitlist=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            promoted = TournamentService.leave(self.tournament, self.users[0])
+
+        self.assertEqual(promoted, self.users[16].pk)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.participant_count, 16)
+        self.assertTrue(self.tournament.participants.filter(pk=self.users[16].pk).exists())
+        self.assertEqual(list(self.tournament.waitlist.values_list('user_id', flat=True)), [self.users[17].pk])
+
+
+@requires_row_locks
+class ConcurrentTournamentJoinTests(TransactionTestCase):
+    """Racing joins never overfill a tournament"""
+
+    def test_hundred_joins_for_sixteen_spots(self):
+        users = [make_user(f'player{number}') for number in range(100)]
+        tournament = make_tournament(users[0], max_participants=16)
+        results = []
+
+        def join(number):
+            results.append(TournamentService.join(tournament, users[number], waitlist=True))
+
+        self.assertEqual(run_concurrently(join, 100), [])
+
+        self.assertEqual(results.count('joined'), 16)
+        self.assertEqual(results.count('waitlisted'), 84)
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.participant_count, 16)
+        self.assertEqual(tournament.participants.count(), 16)
+        self.assertEqual(TournamentWaitlistEntry.objects.filter(tournament=tournament).count(), 84)
+
+
+class GameVerificationTests(APITestCase):
+    """Verifying a game updates both profiles and records the rating change"""
+
+    def setUp(self):
+        self.alice = make_user('alice')
+        self.bob = make_user('bob')
+        self.carol = make_user('carol')
+
+    def verify(self, game, user):
+        self.client.force_authenticate(user)
+        return self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+
+    def test_verifications_build_on_each_other(self):
+        first = make_game(self.alice, self.bob, status='pending')
+        second = make_game(self.alice, self.carol, status='pending')
+
+        self.assertEqual(self.verify(first, self.bob).status_code, 200)
+        self.assertEqual(self.verify(second, self.carol).status_code, 200)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        profile = PlayerProfile.objects.get(user=self.alice)
+        self.assertEqual(second.player1_elo_before, first.player1_elo_after)
+        self.assertEqual(profile.singles_elo, second.player1_elo_after)
+        self.assertEqual(profile.singles_games_played, 2)
+        self.assertEqual(profile.singles_wins, 2)
+
+    def test_game_is_only_verified_once(self):
+        game = make_game(self.alice, self.bob, status='pending')
+        self.assertEqual(self.verify(game, self.bob).status_code, 200)
+        rating = PlayerProfile.objects.get(user=self.alice).singles_elo
+
+        self.assertEqual(self.verify(game, self.bob).status_code, 400)
+        self.client.force_authenticate(self.bob)
+        response = self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'dispute'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        profile = PlayerProfile.objects.get(user=self.alice)
+        self.assertEqual(profile.singles_games_played, 1)
+        self.assertEqual(profile.singles_elo, rating)
+        self.assertEqual(RatingHistory.objects.filter(game=game).count(), 2)
+
+    def test_verification_racing_another_is_rejected(self):
+        game = make_game(self.alice, self.bob, status='pending')
+        # The second request loaded the game while it was still pending, the
+        # locked re-read inside the transaction is what turns it away
+        stale = Game.objects.get(pk=game.pk)
+        self.assertEqual(self.verify(game, self.bob).status_code, 200)
+        verified = PlayerProfile.objects.get(user=self.alice)
+
+        with mock.patch.object(GameViewSet, 'get_object', return_value=stale):
+            response = self.verify(game, self.bob)
+
+        self.assertEqual(response.status_code, 400)
+        profile = PlayerProfile.objects.get(user=self.alice)
+        self.assertEqual(
+            (profile.singles_elo, profile.singles_games_played, profile.singles_wins),
+            (verified.singles_elo, 1, 1)
+        )
+        game.refresh_from_db()
+        self.assertEqual(game.player1_elo_after, profile.singles_elo)
+
+
+@requires_row_locks
+class ConcurrentGameVerificationTests(TransactionTestCase):
+    """Concurrent verifications sharing a player lose no rating updates"""
+
+    def test_concurrent_verifications(self):
+        alice = make_user('alice')
+        opponents = [make_user(f'player{number}') for number in range(12)]
+        games = [
+            make_game(alice, opponent, status='pending', winner='player1' if number % 3 else 'player2')
+            for number, opponent in enumerate(opponents)
+        ]
+
+        def verify(number):
+            client = APIClient()
+            client.force_authenticate(opponents[number])
+            response = client.post(f'/api/games/{games[number].pk}/verify/', {'action': 'verify'}, format='json')
+            assert response.status_code == 200, response.content
+
+        self.assertEqual(run_concurrently(verify, len(games)), [])
+
+        profile = PlayerProfile.objects.get(user=alice)
+        self.assertEqual(profile.singles_games_played, len(games))
+        self.assertEqual(profile.singles_wins + profile.singles_losses, len(games))
+
+        # A lost update would drop its rating change from the final rating
+        changes = Game.objects.filter(pk__in=[game.pk for game in games]).values_list(
+            'player1_elo_before', 'player1_elo_after'
+        )
+        self.assertEqual(profile.singles_elo, 1200 + sum(after - before for before, after in changes))
+
+
+class BracketGenerationTests(SimpleTestCase):
+    """Seeded knockout brackets built in memory, byes included"""
+
+    def round_matches(self, matches, round_number):
+        return [match for match in matches if match.bracket == 'winners' and match.round_number == round_number]
+
+    def test_seed_order(self):
+        self.assertEqual(brackets.seed_order(2), [1, 2])
+        self.assertEqual(brackets.seed_order(8), [1, 8, 4, 5, 2, 7, 3, 6])
+        order = brackets.seed_order(16)
+        self.assertEqual(sorted(order), list(range(1, 17)))
+        # Opening pairs add up to size + 1, and the top two seeds are in opposite halves
+        self.assertEqual({a + b for a, b in zip(order[::2], order[1::2])}, {17})
+        self.assertIn(1, order[:8])
+        self.assertIn(2, order[8:])
+
+    def test_five_players(self):
+        matches = brackets.single_elimination(list('abcde'))
+
+        self.assertEqual(len(matches), 7)
+        first = self.round_matches(matches, 1)
+        self.assertEqual([match.players for match in first], [['a', None], ['d', 'e'], ['b', None], ['c', None]])
+        self.assertEqual([match.status for match in first], ['bye', 'pending', 'bye', 'bye'])
+        self.assertEqual([match.winner for match in first], ['a', None, 'b', 'c'])
+        # Bye winners are already waiting in round 2
+        self.assertEqual([match.players for match in self.round_matches(matches, 2)], [['a', None], ['b', 'c']])
+        self.assertEqual(self.round_matches(matches, 3)[0].players, [None, None])
+
+    def test_byes_go_to_the_top_seeds(self):
+        for count in range(3, 34):
+            with self.subTest(count=count):
+                players = list(range(1, count + 1))
+                matches = brackets.single_elimination(players)
+                size = brackets.bracket_size(count)
+                first = self.round_matches(matches, 1)
+
+                byes = sorted(match.winner for match in first if match.status == 'bye')
+                self.assertEqual(byes, players[:size - count])
+                self.assertTrue(all(
+                    None not in match.players for match in first if match.status == 'pending'
+                ))
+                # Two byes never meet, so no later match is left empty
+                self.assertFalse(any(all(match.dead) for match in matches))
+                for match in first:
+                    if match.status == 'bye':
+                        self.assertEqual(match.next_match.players[match.next_slot], match.winner)
+                self.assertEqual(len(matches), size - 1)
+
+    def test_unknown_type_and_too_few_players(self):
+        with self.assertRaises(ValueError):
+            brackets.generate('single_elimination', ['a'])
+        with self.assertRaises(ValueError):
+            brackets.generate('ladder', ['a', 'b'])
+
+
+class TournamentBracketTests(TestCase):
+    """Generated brackets are seeded by rating and stored with their links"""
+
+    def setUp(self):
+        ratings = [1400, 1600, 1200, 1500, 1300]
+        self.players = [make_user(f'player{number}') for number in range(len(ratings))]
+        for player, rating in zip(self.players, ratings):
+            PlayerProfile.objects.filter(user=player).update(singles_elo=rating, doubles_elo=3000 - rating)
+        # Best first
+        self.by_rating = [self.players[index] for index in (1, 3, 0, 4, 2)]
+
+    def test_seeded_by_rating_for_the_game_type(self):
+        singles = make_tournament(self.players[0], participants=self.players)
+        self.assertEqual(TournamentService.seeded_players(singles), self.by_rating)
+
+        doubles = make_tournament(self.players[0], participants=self.players, name='Doubles Open')
+        doubles.game_type = 'doubles'
+        self.assertEqual(TournamentService.seeded_players(doubles), self.by_rating[::-1])
+
+    def test_byes_are_stored_and_advanced(self):
+        tournament = make_tournament(self.players[0], participants=self.players)
+        with CaptureQueriesContext(connection) as queries:
+            TournamentService.generate_bracket(tournament)
+
+        # Links included, the whole bracket is a single insert
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertIn('core_tournamentmatch', inserts[0])
+
+        first = list(tournament.matches.filter(round_number=1))
+        top, second, third, fourth, fifth = self.by_rating
+        self.assertEqual(
+            [(match.player1, match.player2, match.status, match.winner) for match in first],
+            [(top, None, 'bye', top), (fourth, fifth, 'pending', None),
+             (second, None, 'bye', second), (third, None, 'bye', third)]
+        )
+        second_round = list(tournament.matches.filter(round_number=2))
+        self.assertEqual([(match.player1, match.player2) for match in second_round], [(top, None), (second, third)])
+        final = tournament.matches.get(round_number=3)
+        for match in first:
+            self.assertEqual(match.next_match, second_round[(match.match_number - 1) // 2])
+            self.assertEqual(match.next_match_slot, (match.match_number - 1) % 2 + 1)
+        self.assertEqual({match.next_match for match in second_round}, {final})
+        self.assertIsNone(final.next_match)
+
+    def test_match_numbers_are_unique_per_bracket(self):
+        tournament = make_tournament(self.players[0], participants=self.players[:4], tournament_type='double_elimination')
+        TournamentService.generate_bracket(tournament)
+
+        # Each bracket counts its own rounds from 1
+        self.assertEqual(
+            set(tournament.matches.filter(round_number=1, match_number=1).values_list('bracket', flat=True)),
+            {'winners', 'losers', 'grand_final'}
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TournamentMatch.objects.create(tournament=tournament, bracket='losers', round_number=1, match_number=1)
+
+
+class TournamentProgressTests(APITestCase):
+    """Verifying a tournament game decides its match and moves the tournament on"""
+
+    def setUp(self):
+        self.players = [make_user(f'player{number}') for number in range(4)]
+
+    def start(self, count=4, **fields):
+        tournament = make_tournament(self.players[0], participants=self.players[:count], **fields)
+        TournamentService.generate_bracket(tournament)
+        return tournament
+
+    def play(self, match, winner='player1'):
+        """Report a game for the match and have the opponent verify it through the API"""
+        game = make_game(match.player1, match.player2, status='pending', winner=winner)
+        match.games.add(game)
+        self.client.force_authenticate(match.player2)
+        response = self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        match.refresh_from_db()
+        return match
+
+    def test_single_elimination(self):
+        tournament = self.start()
+        first, second = tournament.matches.filter(round_number=1)
+        final = tournament.matches.get(round_number=2)
+
+        first = self.play(first)
+        self.assertEqual((first.status, first.winner_id), ('completed', first.player1_id))
+        final.refresh_from_db()
+        self.assertEqual((final.player1_id, final.player2_id), (first.player1_id, None))
+
+        second = self.play(second, winner='player2')
+        final.refresh_from_db()
+        self.assertEqual((final.player1_id, final.player2_id), (first.player1_id, second.player2_id))
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, 'in_progress')
+
+        final = self.play(final, winner='player2')
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, 'completed')
+        self.assertIsNotNone(tournament.tournament_end)
+        # Third place is the semifinalist the champion beat
+        self.assertEqual(
+            (tournament.first_place_id, tournament.second_place_id, tournament.third_place_id),
+            (second.player2_id, first.player1_id, second.player1_id)
+        )
+
+    def test_bye_winner_plays_the_final(self):
+        tournament = self.start(count=3)
+        top_seed = TournamentService.seeded_players(tournament)[0]
+        semifinal = tournament.matches.get(round_number=1, status='pending')
+        final = tournament.matches.get(round_number=2)
+        self.assertEqual((final.player1, final.player2), (top_seed, None))
+
+        semifinal = self.play(semifinal)
+        final.refresh_from_db()
+        self.assertEqual((final.player1_id, final.player2_id), (top_seed.pk, semifinal.winner_id))
+
+        self.play(final)
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, 'completed')
+        # The champion had a bye, so nobody they beat is left for third place
+        self.assertEqual(
+            (tournament.first_place_id, tournament.second_place_id, tournament.third_place_id),
+            (top_seed.pk, semifinal.winner_id, None)
+        )
+
+    def test_decided_match_is_left_alone(self):
+        tournament = self.start()
+        match = self.play(tournament.matches.filter(round_number=1).first())
+        game = Game(
+            game_type='singles', player1_id=match.player1_id, player2_id=match.player2_id,
+            winner='player2', status='verified'
+        )
+        self.assertIsNone(TournamentService.complete_match(match.pk, game))
+        match.refresh_from_db()
+        self.assertEqual(match.winner_id, match.player1_id)
+
+    def test_last_swiss_result_pairs_the_next_round(self):
+        tournament = self.start(tournament_type='swiss')
+        first, second = tournament.matches.filter(round_number=1)
+
+        self.play(first)
+        self.assertFalse(tournament.matches.filter(round_number=2).exists())
+
+        self.play(second, winner='player2')
+        pairs = {
+            frozenset((match.player1_id, match.player2_id))
+            for match in tournament.matches.filter(round_number=2, status='pending')
+        }
+        # Winners meet winners, losers meet losers
+        self.assertEqual(pairs, {
+            frozenset((first.player1_id, second.player2_id)), frozenset((first.player2_id, second.player1_id))
+        })
+
+    def test_swiss_pairing_commits_with_the_verification(self):
+        tournament = self.start(tournament_type='swiss')
+        first, second = tournament.matches.filter(round_number=1)
+        self.play(first)
+
+        game = make_game(second.player1, second.player2, status='pending')
+        second.games.add(game)
+        self.client.force_authenticate(second.player2)
+        with mock.patch.object(TournamentService, 'pair_swiss_round', side_effect=RuntimeError('pairing failed')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+
+        # Nothing of the verification outlives the failed pairing
+        game.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(game.status, 'pending')
+        self.assertEqual(second.status, 'pending')
+        self.assertEqual(PlayerProfile.objects.get(user=second.player1).singles_games_played, 0)
+
+    def test_swiss_completes_after_the_last_round(self):
+        tournament = self.start(tournament_type='swiss', rounds=2)
+        for round_number in (1, 2):
+            for match in tournament.matches.filter(round_number=round_number):
+                self.play(match)
+
+        tournament.refresh_from_db()
+        self.assertEqual(tournament.status, 'completed')
+        self.assertFalse(tournament.matches.filter(round_number=3).exists())
+        standings = TournamentService.standings(tournament)
+        self.assertEqual(
+            [tournament.first_place_id, tournament.second_place_id, tournament.third_place_id],
+            standings.ranking()[:3]
+        )
+        self.assertEqual(standings.score[tournament.first_place_id], 2)
+
+
+class DoubleEliminationTests(TestCase):
+    """Nobody leaves a double elimination tournament before their second loss"""
+
+    def setUp(self):
+        self.players = [make_user(f'player{number}') for number in range(4)]
+        self.tournament = make_tournament(
+            self.players[0], participants=self.players, tournament_type='double_elimination'
+        )
+        TournamentService.generate_bracket(self.tournament)
+
+    def match(self, bracket, round_number, match_number=1):
+        return TournamentMatch.objects.get(
+            tournament=self.tournament, bracket=bracket, round_number=round_number, match_number=match_number
+        )
+
+    def play(self, match, winner):
+        """Decide a match with a verified game won by the given match slot (1 or 2)"""
+        game = Game(
+            game_type='singles', player1_id=match.player1_id, player2_id=match.player2_id,
+            winner=f'player{winner}', status='verified'
+        )
+        return TournamentService.complete_match(match.pk, game)
+
+    def play_to_grand_final(self):
+        self.play(self.match('winners', 1, 1), 1)
+        self.play(self.match('winners', 1, 2), 1)
+        self.play(self.match('winners', 2), 1)
+        self.play(self.match('losers', 1), 1)
+        self.play(self.match('losers', 2), 1)
+        return self.match('grand_final', 1)
+
+    def test_champion_winning_the_grand_final_ends_it(self):
+        grand_final = self.play_to_grand_final()
+        self.play(grand_final, 1)
+
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.status, 'completed')
+        self.assertEqual(self.tournament.first_place_id, grand_final.player1_id)
+        self.assertEqual(self.tournament.second_place_id, grand_final.player2_id)
+        self.assertFalse(TournamentMatch.objects.filter(tournament=self.tournament, round_number=2, bracket='grand_final').exists())
+
+    def test_losers_bracket_win_forces_a_reset(self):
+        grand_final = self.play_to_grand_final()
+        champion, challenger = grand_final.player1_id, grand_final.player2_id
+        losers_final = self.match('losers', 2)
+        self.play(grand_final, 2)
+
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.status, 'in_progress')
+        self.assertIsNone(self.tournament.first_place_id)
+        reset = self.match('grand_final', 2)
+        self.assertEqual((reset.player1_id, reset.player2_id, reset.status), (champion, challenger, 'pending'))
+
+        self.play(reset, 2)
+
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.status, 'completed')
+        self.assertEqual(self.tournament.first_place_id, challenger)
+        self.assertEqual(self.tournament.second_place_id, champion)
+        losers_final.refresh_from_db()
+        self.assertEqual(self.tournament.third_place_id, losers_final.player2_id)
+
+
+def brute_force_matching(vertex_count, edges, maxcardinality):
+    """(pairs, weight) of the best matching, trying every one of them"""
+    neighbours = {}
+    for i, j, weight in edges:
+        neighbours.setdefault(i, []).append((j, weight))
+        neighbours.setdefault(j, []).append((i, weight))
+
+    def best(free):
+        if not free:
+            return 0, 0
+        vertex = min(free)
+        rest = free - {vertex}
+        options = [best(rest)]
+        for other, weight in neighbours.get(vertex, ()):
+            if other in rest:
+                pairs, total = best(rest - {other})
+                options.append((pairs + 1, total + weight))
+        return max(options, key=lambda option: option if maxcardinality else option[1])
+
+    return best(frozenset(range(vertex_count)))
+
+
+class MaxWeightMatchingTests(SimpleTestCase):
+    """The blossom matching finds the same optimum as trying every matching"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        for _ in range(400):
+            count = rng.randint(2, 8)
+            edges = [
+                (i, j, rng.randint(-5, 30))
+                for i in range(count) for j in range(i + 1, count) if rng.random() < 0.5
+            ]
+            weights = {(i, j): weight for i, j, weight in edges}
+            for maxcardinality in (False, True):
+                mate = max_weight_matching(edges, maxcardinality=maxcardinality)
+                pairs = [(i, j) for i, j in enumerate(mate) if i < j]
+                self.assertTrue(all(mate[j] == i for i, j in pairs))
+                found = (len(pairs), sum(weights[pair] for pair in pairs))
+
+                expected = brute_force_matching(count, edges, maxcardinality)
+                if maxcardinality:
+                    self.assertEqual(found, expected, edges)
+                else:
+                    self.assertEqual(found[1], expected[1], edges)
+
+
+class SwissPairingTests(SimpleTestCase):
+    """Swiss rounds avoid rematches, give byes from the bottom and rank by the tiebreaks"""
+
+    def play_event(self, player_count, rounds, seed):
+        """Yield (standings, pairs, bye) for each round, before the round's random results go in"""
+        rng = random.Random(seed)
+        standings = Standings(range(player_count))
+        for _ in range(rounds):
+            pairs, bye = standings.pair()
+            yield standings, pairs, bye
+            for player1, player2 in pairs:
+                standings.add_result(player1, player2, rng.choice([player1, player2]))
+            if bye is not None:
+                standings.add_bye(bye)
+
+    def test_every_player_is_paired_once(self):
+        for standings, pairs, bye in self.play_event(9, 6, seed=1):
+            players = [player for pair in pairs for player in pair] + [bye]
+            self.assertCountEqual(players, range(9))
+
+    def test_no_rematch_while_one_is_avoidable(self):
+        rematches = 0
+        for seed in range(40):
+            for standings, pairs, bye in self.play_event(6 + seed % 2, 6, seed):
+                if all(player2 not in standings.opponents[player1] for player1, player2 in pairs):
+                    continue
+                rematches += 1
+                # Allowed only if no pairing avoids every rematch, whoever of those
+                # still owed a bye sits out
+                count = len(standings.players)
+                byes = [player for player in standings.players if player not in standings.byes]
+                for bye in byes if count % 2 else [None]:
+                    unmet = [
+                        (i, j, 1) for i in range(count) for j in range(i + 1, count)
+                        if bye not in (i, j) and j not in standings.opponents[i]
+                    ]
+                    self.assertLess(brute_force_matching(count, unmet, True)[0], count // 2)
+        # The late rounds of these events do run out of new opponents
+        self.assertGreater(rematches, 0)
+
+    def test_bye_goes_to_lowest_ranked_player_without_one(self):
+        for seed in range(30):
+            for standings, pairs, bye in self.play_event(7, 5, seed):
+                without_bye = [player for player in standings.ranking() if player not in standings.byes]
+                self.assertEqual(bye, without_bye[-1])
+
+    def test_ranking_by_score_then_buchholz_then_sonneborn_berger_then_seed(self):
+        standings = Standings(['a', 'b', 'c', 'd', 'e', 'f'])
+        for player1, player2, winner in [
+            ('a', 'd', 'd'), ('b', 'e', 'e'), ('c', 'f', 'c'),
+            ('d', 'c', 'c'), ('e', 'a', 'a'), ('f', 'b', 'b'),
+            ('c', 'b', 'b'), ('d', 'e', 'e'), ('a', 'f', 'f'),
+        ]:
+            standings.add_result(player1, player2, winner)
+
+        # b, e and c have 2 points: Buchholz puts b first, Sonneborn-Berger e ahead of c.
+        # d, f and a have 1 point: Buchholz puts a last, d and f tie on everything but seed
+        self.assertEqual([standings.score[player] for player in 'becdfa'], [2, 2, 2, 1, 1, 1])
+        self.assertEqual([standings.buchholz[player] for player in 'becdfa'], [5, 4, 4, 5, 5, 4])
+        self.assertEqual([standings.sonneborn_berger[player] for player in 'becdfa'], [3, 3, 2, 1, 1, 2])
+        self.assertEqual(standings.ranking(), ['b', 'e', 'c', 'd', 'f', 'a'])
+
+    def test_rematches_count_once_per_game(self):
+        standings = Standings(['a', 'b', 'c'])
+        standings.add_result('a', 'b', 'a')
+        standings.add_result('b', 'a', 'b')
+        standings.add_bye('b')
+
+        # a beat b (2 points) once, b beat a (1 point) once
+        self.assertEqual(standings.sonneborn_berger['a'], 2)
+        self.assertEqual(standings.sonneborn_berger['b'], 1)
+        self.assertEqual(standings.buchholz['a'], 4)
+
+    def test_tiebreaks_match_a_recount(self):
+        rng = random.Random(3)
+        standings = Standings(range(8))
+        games = []
+        for _ in range(9):
+            pairs, _ = standings.pair()
+            for player1, player2 in pairs:
+                winner = rng.choice([player1, player2])
+                standings.add_result(player1, player2, winner)
+                games.append((player1, player2, winner))
+
+        score = standings.score
+        for player in range(8):
+            played = [(a if b == player else b, winner) for a, b, winner in games if player in (a, b)]
+            self.assertEqual(standings.buchholz[player], sum(score[opponent] for opponent, _ in played))
+            self.assertEqual(
+                standings.sonneborn_berger[player],
+                sum(score[opponent] for opponent, winner in played if winner == player)
+            )
+        self.assertEqual(standings.ranking(), sorted(range(8), key=lambda player: (
+            -score[player], -standings.buchholz[player], -standings.sonneborn_berger[player], player
+        )))
+
+
+class SwissTournamentTests(TestCase):
+    """A Swiss tournament plays its configured number of rounds, then ranks the field"""
+
+    def start(self, **fields):
+        players = [make_user(f'player{number}') for number in range(4)]
+        tournament = make_tournament(players[0], participants=players, tournament_type='swiss', **fields)
+        TournamentService.generate_bracket(tournament)
+        return tournament
+
+    def play_rounds(self, tournament):
+        """Let player 1 win every match until the tournament completes, returns the rounds played"""
+        while True:
+            tournament.refresh_from_db()
+            if tournament.status == 'completed':
+                return tournament.matches.order_by('-round_number').first().round_number
+            for match in tournament.matches.filter(status='pending'):
+                game = Game(
+                    game_type='singles', player1_id=match.player1_id, player2_id=match.player2_id,
+                    winner='player1', status='verified'
+                )
+                TournamentService.complete_match(match.pk, game)
+
+    def test_default_rounds_separate_a_leader(self):
+        tournament = self.start()
+        self.assertEqual(self.play_rounds(tournament), 2)
+
+    def test_configured_rounds(self):
+        tournament = self.start(rounds=3)
+        self.assertEqual(self.play_rounds(tournament), 3)
+        self.assertIsNotNone(tournament.first_place_id)
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields trims responses, ?expand never exposes private user fields"""
+
+    def setUp(self):
+        self.alice = make_user('alice', bio='Loves topspin')
+        self.bob = make_user('bob', is_staff=True)
+        self.game = make_game(self.alice, self.bob)
+        self.client.force_authenticate(self.alice)
+
+    def test_fields(self):
+        response = self.client.get(f'/api/games/{self.game.pk}/?fields=id,winner')
+        self.assertEqual(set(response.data), {'id', 'winner'})
+
+    def test_expand_uses_public_user_details(self):
+        response = self.client.get(f'/api/games/{self.game.pk}/?expand=player1,player2')
+
+        self.assertEqual(response.data['player1']['bio'], 'Loves topspin')
+        for field in ('email', 'is_staff', 'is_superuser', 'is_approved', 'phone_verified', 'email_verified'):
+            self.assertNotIn(field, response.data['player1'])
+            self.assertNotIn(field, response.data['player2'])
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONRendererTests(TestCase):
+    """FAST_JSON responses are byte for byte the stock renderer's"""
+
+    def assertSameJSON(self, data):
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_game_page(self):
+        alice, bob = make_user('alice'), make_user('bob')
+        for notes in ['', 'Line\u2028separator', 'Para\u2029graph', '"Quoted" \\ \x01 café 🏓']:
+            make_game(alice, bob, notes=notes, verified_by=bob, verified_at=timezone.now())
+        make_game(bob, alice, status='pending', winner='player2')
+
+        games = Game.objects.select_related('player1', 'player2', 'reported_by', 'verified_by')
+        self.assertSameJSON(GameSerializer(games, many=True).data)
+
+    def test_values_outside_serializers(self):
+        moment = timezone.now().replace(microsecond=123456)
+        self.assertSameJSON({
+            'aware': moment,
+            'naive': moment.replace(tzinfo=None),
+            'date': moment.date(),
+            'time': moment.time(),
+            'duration': timedelta(minutes=3),
+            'id': uuid.uuid4(),
+            'decimal': Decimal('1.10'),
+            'lazy': gettext_lazy('Singles'),
+            'text': 'a\u2028b\u2029c\n',
+            'win_rates': [0, 100.0, 200 / 3, 0.0001],
+            1: 'integer key',
+        })
+
+
+class RebuildRatingsTests(APITestCase):
+    """rebuild_ratings agrees with the ratings written by live verifications"""
+
+    def test_dry_run_on_consistent_data_changes_nothing(self):
+        alice, bob, carol = make_user('alice'), make_user('bob'), make_user('carol')
+        for player, opponent, winner in [(alice, bob, 'player1'), (bob, carol, 'player2'), (alice, carol, 'player1')]:
+            game = make_game(player, opponent, status='pending', winner=winner)
+            self.client.force_authenticate(opponent)
+            response = self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        output = StringIO()
+        call_command('rebuild_ratings', '--dry-run', stdout=output)
+
+        self.assertIn('Profiles changed: 0', output.getvalue())
+        self.assertIn('Games with corrected ratings: 0', output.getvalue())
+
+    def test_dry_run_across_days_changes_nothing(self):
+        alice, bob = make_user('alice'), make_user('bob')
+        now = timezone.now()
+        for days_ago, winner in [(10, 'player1'), (3, 'player2'), (1, 'player1'), (0, 'player1'), (0, 'player2')]:
+            game = make_game(alice, bob, status='pending', winner=winner, played_at=now - timedelta(days=days_ago))
+            self.client.force_authenticate(bob)
+            response = self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+            self.assertEqual(response.status_code, 200)
+
+        # Played yesterday and twice today: each day counts once
+        profile = PlayerProfile.objects.get(user=alice)
+        self.assertEqual((profile.current_streak, profile.longest_streak), (2, 2))
+        year, week_number = GameService.week_key(now)
+        this_week = WeeklyLeaderboard.objects.filter(player=alice, year=year, week_number=week_number).first()
+        self.assertEqual(profile.weekly_points, this_week.points)
+        self.assertLess(profile.weekly_points, profile.total_points)
+
+        output = StringIO()
+        call_command('rebuild_ratings', '--dry-run', stdout=output)
+
+        self.assertIn('Profiles changed: 0', output.getvalue())
+        self.assertIn('Games with corrected ratings: 0', output.getvalue())
+
+    def test_rebuild_fixes_drift(self):
+        alice, bob = make_user('alice'), make_user('bob')
+        game = make_game(alice, bob, status='pending')
+        self.client.force_authenticate(bob)
+        self.client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+        expected = PlayerProfile.objects.get(user=alice).singles_elo
+        PlayerProfile.objects.filter(user=alice).update(singles_elo=999)
+
+        call_command('rebuild_ratings', stdout=StringIO())
+
+        self.assertEqual(PlayerProfile.objects.get(user=alice).singles_elo, expected)
+
+
+class TrophyBackfillTests(TestCase):
+    """Milestone rules are data: a new rule awards trophies without adding queries"""
+
+    def setUp(self):
+        for number in range(5):
+            user = make_user(f'player{number}')
+            PlayerProfile.objects.filter(user=user).update(
+                singles_elo=1450, singles_games_played=20, doubles_games_played=6, total_points=number * 100
+            )
+
+    def backfill(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('backfill_trophies', stdout=StringIO())
+        return len(queries)
+
+    def test_backfill_awards_milestones(self):
+        self.backfill()
+        self.assertEqual(Trophy.objects.filter(trophy_type='elo_milestone').count(), 10)
+        self.assertEqual(Trophy.objects.filter(trophy_type='games_played').count(), 10)
+
+    def test_rule_on_a_new_field_adds_no_queries(self):
+        baseline = self.backfill()
+        Trophy.objects.all().delete()
+
+        points_rule = TrophyRule(
+            trophy_type='total_points', field='total_points', thresholds=[100, 300],
+            name='{value} Points', description='Scored {value} points', icon='⭐',
+        )
+        with mock.patch('core.trophies.TROPHY_RULES', TROPHY_RULES + [points_rule]):
+            self.assertEqual(self.backfill(), baseline)
+        self.assertEqual(Trophy.objects.filter(trophy_type='total_points').count(), 6)
+
+
+@benchmark
+class NotificationStreamLoadBenchmark(TestCase):
+    """How many idle notification streams one worker process holds, and what each costs"""
+
+    def setUp(self):
+        self.user = make_user('alice')
+        self.backend = InMemoryEventBackend()
+        for target in ('core.views.get_backend', 'core.events.get_backend'):
+            patcher = mock.patch(target, return_value=self.backend)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_idle_connections(self):
+        count = benchmark_size('STREAMS', 2000)
+        sample = 200
+        ticket = NotificationService.create_stream_ticket(self.user.pk)
+        received = [0] * (count + sample)
+        delivered = asyncio.Event()
+
+        async def connect(number):
+            # Reads the stream like the server would, until cancelled
+            response = await self.async_client.get('/api/notifications/stream/', {'ticket': ticket})
+            async for chunk in response.streaming_content:
+                received[number] += 1
+                if received[number] == 2 and all(value >= 2 for value in received):
+                    delivered.set()
+
+        async def open_streams(numbers):
+            tasks = [asyncio.create_task(connect(number)) for number in numbers]
+            while not all(received[number] for number in numbers):
+                await asyncio.sleep(0.01)
+            return tasks
+
+        started = time.perf_counter()
+        streams = await open_streams(range(count))
+        opened = time.perf_counter() - started
+
+        # Memory is traced for a second batch only, tracing slows everything down
+        tracemalloc.start()
+        streams += await open_streams(range(count, count + sample))
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Event loop responsiveness while every stream waits for events
+        lags = []
+        for _ in range(20):
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - before - 0.01)
+
+        started = time.perf_counter()
+        await asyncio.to_thread(
+            self.backend.publish, user_channel(self.user.pk), {'type': 'unread_count', 'data': {'count': 2}}
+        )
+        await asyncio.wait_for(delivered.wait(), timeout=60)
+        fan_out = time.perf_counter() - started
+
+        for stream in streams:
+            stream.cancel()
+        await asyncio.gather(*streams, return_exceptions=True)
+
+        report(f'Notification streams: {count + sample} idle connections in one process', [
+            ('Open streams (ticket check, unread count)', f'{opened:.2f}s for {count} ({count / opened:,.0f}/s)'),
+            ('Python memory per stream', f'{memory / sample / 1024:.1f} KiB'),
+            ('Event loop lag while idle (max)', f'{max(lags) * 1000:.1f} ms'),
+            ('Deliver one event to every stream', f'{fan_out * 1000:.0f} ms'),
+        ])
+
+
+@benchmark
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONRendererBenchmark(TestCase):
+    """Rendering a page of games with the stock renderer and with FAST_JSON"""
+
+    def test_game_page(self):
+        count = benchmark_size('JSON_GAMES', 500)
+        alice, bob = make_user('alice'), make_user('bob')
+        now = timezone.now()
+        Game.objects.bulk_create(
+            Game(
+                game_type='singles', player1=alice, player2=bob, player1_score=11, player2_score=number % 10,
+                winner='player1', reported_by=alice, status='verified', verified_by=bob,
+                played_at=now - timedelta(minutes=number), verified_at=now,
+            )
+            for number in range(count)
+        )
+        games = Game.objects.select_related('player1', 'player2', 'reported_by', 'verified_by')
+        data = GameSerializer(games, many=True).data
+
+        def best_of(renderer, repeat=20):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                body = renderer.render(data)
+                timings.append(time.perf_counter() - started)
+            return min(timings), body
+
+        stock, expected = best_of(JSONRenderer())
+        fast, body = best_of(renderers.FastJSONRenderer())
+        self.assertEqual(body, expected)
+
+        report(f'JSON rendering: GameSerializer page of {count} games ({len(body) / 1024:.0f} KiB)', [
+            ('JSONRenderer', f'{stock * 1000:.1f} ms'),
+            ('FastJSONRenderer', f'{fast * 1000:.1f} ms ({stock / fast:.1f}x)'),
+        ])
+
+
+@benchmark
+@requires_postgres
+class GameParticipantBenchmark(TestCase):
+    """A player's recent games: the six player columns ORed together against the GameParticipant index"""
+
+    def test_player_games(self):
+        count = benchmark_size('GAMES', 1_000_000)
+        rng = random.Random(1)
+        players = [make_user(f'player{number}') for number in range(500)]
+        now = timezone.now()
+
+        started = time.perf_counter()
+        for offset in range(0, count, 5000):
+            games = []
+            for number in range(offset, min(offset + 5000, count)):
+                played_at = now - timedelta(minutes=number)
+                status = 'verified' if rng.random() < 0.9 else 'pending'
+                if rng.random() < 0.8:
+                    player1, player2 = rng.sample(players, 2)
+                    games.append(Game(
+                        game_type='singles', player1=player1, player2=player2, player1_score=11,
+                        player2_score=7, winner='player1', reported_by=player1, status=status, played_at=played_at
+                    ))
+                else:
+                    team = rng.sample(players, 4)
+                    games.append(Game(
+                        game_type='doubles', team1_player1=team[0], team1_player2=team[1], team2_player1=team[2],
+                        team2_player2=team[3], player1_score=11, player2_score=7, winner='team1',
+                        reported_by=team[0], status=status, played_at=played_at
+                    ))
+            Game.objects.bulk_create(games)
+        created = time.perf_counter() - started
+
+        # bulk_create skips save(), so the rows come from the 0009 backfill like on a live database
+        started = time.perf_counter()
+        import_module('core.migrations.0009_backfill_gameparticipants').backfill_participants(django_apps, None)
+        backfilled = time.perf_counter() - started
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_game')
+            cursor.execute('ANALYZE core_gameparticipant')
+
+        user = players[0]
+        columns = Q()
+        for field, side, slot in Game.PARTICIPANT_SLOTS:
+            columns |= Q(**{field: user})
+        queries = [
+            ('Six player columns ORed', Game.objects.filter(columns, status='verified').order_by('-played_at')[:50]),
+            ('GameParticipant index', Game.objects.filter(
+                participants__user=user, participants__status='verified'
+            ).order_by('-participants__played_at')[:50]),
+        ]
+
+        rows = [
+            ('Create games', f'{created:.1f}s'),
+            ('Backfill participants (migration 0009)', f'{backfilled:.1f}s ({count / backfilled:,.0f} games/s)'),
+        ]
+        for label, queryset in queries:
+            self.assertEqual(len(queryset), 50)
+            plan = queryset.explain(analyze=True)
+            timing = re.search(r'Execution Time: ([\d.]+) ms', plan).group(1)
+            rows.append((label, f'{timing} ms'))
+            # Plan nodes without their costs, e.g. 'Index Scan using ... on core_gameparticipant'
+            for node in re.findall(r'^\s*(?:->\s*)?([A-Z][\w ]+?(?: on \w+)?)\s+\(cost', plan, re.MULTILINE):
+                rows.append(('', node))
+
+        report(f'Games for a player: {count:,} games, {len(players)} players', rows)
+
+
+@benchmark
+class GamePaginationBenchmark(APITestCase):
+    """Page 1 and page 5,000 of the games list, by page number (OFFSET) and by cursor"""
+
+    def test_deep_pages(self):
+        page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+        deep_page = benchmark_size('DEEP_PAGE', 5000)
+        count = deep_page * page_size
+        alice, bob = make_user('alice'), make_user('bob')
+        now = timezone.now()
+        for offset in range(0, count, 5000):
+            Game.objects.bulk_create(
+                Game(
+                    game_type='singles', player1=alice, player2=bob, player1_score=11, player2_score=7,
+                    winner='player1', reported_by=alice, status='verified',
+                    # A few games share each minute, so the id breaks ties
+                    played_at=now - timedelta(minutes=number // 3),
+                )
+                for number in range(offset, min(offset + 5000, count))
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_game')
+        self.client.force_authenticate(alice)
+
+        # Cursor of the last game on the page before the deep one, as its next link would carry
+        paginator = GameCursorPagination()
+        before = Game.objects.order_by(*paginator.ordering)[count - page_size - 1]
+        deep_cursor = paginator.encode_cursor(paginator.get_position(before))
+
+        def best_of(fetch, repeat=5):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fetch()
+                timings.append(time.perf_counter() - started)
+            return f'{min(timings) * 1000:.1f} ms'
+
+        def endpoint(params):
+            response = self.client.get('/api/games/', params)
+            self.assertEqual(len(response.json()['results']), page_size)
+
+        def paginator_only(params):
+            # The page query (and COUNT) alone, without the user joins and serialization
+            request = Request(APIRequestFactory().get('/api/games/', params))
+            paginator = GameCursorPagination()
+            paginator.paginate_queryset(Game.objects.only('id', 'played_at'), request)
+            if paginator.page_number_paginator:
+                paginator.page_number_paginator.page.paginator.count
+
+        rows = []
+        for label, params in [
+            ('Page number, page 1', {'page': 1}),
+            (f'Page number, page {deep_page:,}', {'page': deep_page}),
+            ('Cursor, page 1', {}),
+            (f'Cursor, page {deep_page:,}', {'cursor': deep_cursor}),
+        ]:
+            timing, paginating = best_of(lambda: endpoint(params)), best_of(lambda: paginator_only(params))
+            rows.append((label, f'{timing} ({paginating} paginating)'))
+        report(f'Games list: {count:,} games, {page_size} per page ({connection.vendor})', rows)
+
+
+@benchmark
+class NotificationFanOutBenchmark(TestCase):
+    """An admin alert to every staff user: fan_out against one create() per admin"""
+
+    def test_admin_alert(self):
+        count = benchmark_size('ADMINS', 200)
+        admins = [make_user(f'admin{number}', is_staff=True) for number in range(count)]
+        backends = [('no open streams', InMemoryEventBackend())]
+        if connection.vendor == 'postgresql':
+            # Reports every channel as subscribed, each event is a NOTIFY
+            backends.append(('PostgreSQL NOTIFY', PostgresEventBackend()))
+
+        def one_by_one():
+            for admin in admins:
+                Notification.objects.create(
+                    recipient=admin, notification_type='admin_alert', title='Alert', message='Check this'
+                )
+
+        def fan_out():
+            NotificationService.fan_out(admins, 'admin_alert', title='Alert', message='Check this')
+
+        rows = []
+        for backend_label, backend in backends:
+            for label, create in [('fan_out', fan_out), ('One create() per admin', one_by_one)]:
+                Notification.objects.all().delete()
+                with mock.patch('core.events.get_backend', return_value=backend), \
+                        CaptureQueriesContext(connection) as queries, \
+                        self.captureOnCommitCallbacks(execute=True):
+                    started = time.perf_counter()
+                    create()
+                elapsed = time.perf_counter() - started
+                self.assertEqual(Notification.objects.count(), count)
+                rows.append((f'{label}, {backend_label}', f'{elapsed * 1000:.1f} ms, {len(queries)} queries'))
+
+        report(f'Admin alert to {count} admins ({connection.vendor})', rows)
+
+
+@benchmark
+class BracketGenerationBenchmark(TestCase):
+    """Generating and storing brackets from 4 to 1,024 participants"""
+
+    def test_generation(self):
+        largest = benchmark_size('BRACKET_PLAYERS', 1024)
+        sizes = [4]
+        while sizes[-1] * 4 <= largest:
+            sizes.append(sizes[-1] * 4)
+        if sizes[-1] != largest:
+            sizes.append(largest)
+
+        users = User.objects.bulk_create([
+            User(username=f'player{number}', email=f'player{number}@example.com', display_name=f'Player {number}')
+            for number in range(largest)
+        ])
+        PlayerProfile.objects.bulk_create([
+            PlayerProfile(user=user, singles_elo=1000 + number) for number, user in enumerate(users)
+        ])
+
+        rows = []
+        for tournament_type in ('single_elimination', 'double_elimination'):
+            for size in sizes:
+                started = time.perf_counter()
+                matches = brackets.generate(tournament_type, list(range(size)))
+                in_memory = time.perf_counter() - started
+
+                tournament = make_tournament(
+                    users[0], participants=users[:size], tournament_type=tournament_type,
+                    max_participants=size, name=f'{tournament_type} {size}'
+                )
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    TournamentService.generate_bracket(tournament)
+                    stored = time.perf_counter() - started
+                self.assertEqual(tournament.matches.count(), len(matches))
+                rows.append((
+                    f'{tournament_type}, {size} players',
+                    f'{len(matches)} matches, {in_memory * 1000:.1f} ms in memory, '
+                    f'{stored * 1000:.1f} ms stored, {len(queries)} queries'
+                ))
+
+        report(f'Bracket generation ({connection.vendor})', rows)
+
+
+@benchmark
+class GameVerificationBenchmark(TransactionTestCase):
+    """Verifications per second through the API, one after another and from concurrent clients"""
+
+    def test_throughput(self):
+        count = benchmark_size('VERIFICATIONS', 200)
+        threads = benchmark_size('VERIFY_THREADS', 8)
+        players = [make_user(f'player{number}') for number in range(20)]
+        rng = random.Random(1)
+
+        def make_games(shared_player=False):
+            games = []
+            for _ in range(count):
+                player1, player2 = rng.sample(players, 2)
+                if shared_player and players[0] not in (player1, player2):
+                    player1 = players[0]
+                games.append(make_game(player1, player2, status='pending'))
+            return games
+
+        def verify(game):
+            client = APIClient()
+            client.force_authenticate(game.player2)
+            response = client.post(f'/api/games/{game.pk}/verify/', {'action': 'verify'}, format='json')
+            assert response.status_code == 200, response.content
+
+        rows = []
+        games = make_games()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for game in games:
+                verify(game)
+            elapsed = time.perf_counter() - started
+        rows.append(('One client', f'{count / elapsed:.0f}/s, {len(queries) / count:.0f} queries each'))
+
+        if connection.vendor != 'sqlite':
+            # The clients share this process, so this shows lock waits rather than how a server scales
+            for label, shared_player in [('players spread out', False), ('every game sharing a player', True)]:
+                games = make_games(shared_player)
+                started = time.perf_counter()
+                errors = run_concurrently(lambda number: [verify(game) for game in games[number::threads]], threads)
+                elapsed = time.perf_counter() - started
+                self.assertEqual(errors, [])
+                rows.append((f'{threads} clients, {label}', f'{count / elapsed:.0f}/s'))
+
+        # Nothing lost: every rating is the sum of its recorded changes
+        for profile in PlayerProfile.objects.all():
+            changes = RatingHistory.objects.filter(player_id=profile.user_id, game_type='singles')
+            self.assertEqual(
+                profile.singles_elo,
+                1200 + sum(change.rating_after - change.rating_before for change in changes)
+            )
+        report(f'Game verification: {count} games per run ({connection.vendor})', rows)
+
+
+@benchmark
+class SwissPairingBenchmark(SimpleTestCase):
+    """Pairing a large Swiss event round by round, the stronger seed winning two games in three"""
+
+    def test_large_event(self):
+        count = benchmark_size('SWISS_PLAYERS', 256)
+        rounds = benchmark_size('SWISS_ROUNDS', 9)
+        rng = random.Random(1)
+        standings = Standings(range(count))
+        timings = []
+        rematches = 0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            pairs, bye = standings.pair()
+            timings.append(time.perf_counter() - started)
+            for player1, player2 in pairs:
+                rematches += player2 in standings.opponents[player1]
+                stronger, weaker = sorted((player1, player2))
+                standings.add_result(player1, player2, stronger if rng.random() < 2 / 3 else weaker)
+            if bye is not None:
+                standings.add_bye(bye)
+
+        report(f'Swiss pairing: {count} players, {rounds} rounds', [
+            ('Pair a round (mean)', f'{sum(timings) / rounds * 1000:.0f} ms'),
+            ('Pair a round (slowest)', f'{max(timings) * 1000:.0f} ms, round {timings.index(max(timings)) + 1}'),
+            ('Pair the whole event', f'{sum(timings):.2f}s'),
+            ('Rematches', rematches),
+        ])
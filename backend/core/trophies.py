@@ -0,0 +1,94 @@
+"""
+Milestone trophy rules for Ping Pong Tracker
+Each rule reads one stat off a player profile and awards a trophy for every
+threshold it has reached. Adding a milestone type only means adding a rule.
+Rules name the profile fields they read, so batch checks load exactly those.
+"""
+
+
+class TrophyRule:
+    """
+    A trophy type awarded at a series of thresholds of one profile stat
+    The stat is a PlayerProfile field, or the sum of several when `field` is a tuple
+    """
+
+    def __init__(self, trophy_type, field, thresholds, name, description, icon):
+        self.trophy_type = trophy_type
+        self.fields = (field,) if isinstance(field, str) else tuple(field)
+        self.thresholds = sorted(thresholds)
+        self.name = name
+        self.description = description
+        self.icon = icon
+
+    def reached(self, profile):
+        """Thresholds the profile has reached"""
+        current = sum(getattr(profile, field) for field in self.fields)
+        return [threshold for threshold in self.thresholds if current >= threshold]
+
+    def build(self, player_id, value):
+        """Unsaved Trophy for a reached threshold"""
+        from .models import Trophy
+
+        return Trophy(
+            player_id=player_id,
+            trophy_type=self.trophy_type,
+            value=value,
+            name=self.name.format(value=value),
+            description=self.description.format(value=value),
+            icon=self.icon,
+        )
+
+
+TROPHY_RULES = [
+    TrophyRule(
+        trophy_type='elo_milestone',
+        field='singles_elo',
+        thresholds=[1300, 1400, 1500, 1600, 1700, 1800, 1900, 2000, 2200, 2500],
+        name='{value} ELO Club',
+        description='Reached {value} ELO rating in singles',
+        icon='🏆',
+    ),
+    TrophyRule(
+        trophy_type='games_played',
+        field=('singles_games_played', 'doubles_games_played'),
+        thresholds=[10, 25, 50, 100, 250, 500, 1000],
+        name='{value} Games Veteran',
+        description='Played {value} total games',
+        icon='🎮',
+    ),
+    TrophyRule(
+        trophy_type='streak',
+        field='longest_streak',
+        thresholds=[3, 7, 14, 30],
+        name='{value}-Day Streak',
+        description='Played games {value} days in a row',
+        icon='🔥',
+    ),
+]
+
+
+def profile_fields():
+    """PlayerProfile fields read by the rules, for .only() on batch checks"""
+    fields = ['user_id']
+    for rule in TROPHY_RULES:
+        fields.extend(field for field in rule.fields if field not in fields)
+    return fields
+
+
+def new_trophies(profile, owned):
+    """
+    Milestone trophies a profile has earned but doesn't own yet
+
+    Args:
+        profile: PlayerProfile to evaluate
+        owned: set of (trophy_type, value) pairs the player already has
+
+    Returns:
+        list of unsaved Trophy objects
+    """
+    return [
+        rule.build(profile.user_id, value)
+        for rule in TROPHY_RULES
+        for value in rule.reached(profile)
+        if (rule.trophy_type, value) not in owned
+    ]
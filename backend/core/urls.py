@@ -7,8 +7,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ValidateRegistrationView, UserRegistrationView, LoginView, PhoneVerificationView,
     FirebaseVerificationView, ResendVerificationView, UserProfileView, PlayerProfileViewSet,
-    GameViewSet, TournamentViewSet, NotificationViewSet, RankingsView, StatsView,
-    AdminUserViewSet, ApprovedPlayersView
+    GameViewSet, TournamentViewSet, NotificationViewSet, RankingsView, PlayerListView, StatsView,
+    AdminUserViewSet, ApprovedPlayersView, notification_stream
 )
 
 # Create a router and register viewsets
@@ -31,11 +31,15 @@ urlpatterns = [
 
     # Rankings and statistics
     path('rankings/', RankingsView.as_view(), name='rankings'),
+    path('rankings/players/', PlayerListView.as_view(), name='rankings-players'),
     path('stats/', StatsView.as_view(), name='stats'),
 
     # Approved players (for game reporting)
     path('players/approved/', ApprovedPlayersView.as_view(), name='approved-players'),
 
+    # Notification event stream (before the router, which would take it for a notification id)
+    path('notifications/stream/', notification_stream, name='notification-stream'),
+
     # Include router URLs
     path('', include(router.urls)),
 ]
\ No newline at end of file
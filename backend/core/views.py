@@ -3,16 +3,25 @@ API Views for the Ping Pong Tracker
 """
 from rest_framework import generics, status, viewsets, permissions
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.authtoken.models import Token
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import authenticate
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from rest_framework.settings import api_settings
+from django.utils.http import parse_etags
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Window
+from django.db.models.functions import RowNumber, TruncDay, TruncWeek
 from django.utils import timezone
 from datetime import datetime, timedelta
 
 from .models import (
-    User, PlayerProfile, Game, GameComment,
+    User, PlayerProfile, Game, GameComment, RatingHistory,
     Trophy, WeeklyLeaderboard, Tournament, TournamentMatch, Notification
 )
 from .serializers import (
@@ -20,9 +29,17 @@ from .serializers import (
     PlayerProfileSerializer, GameReportSerializer, GameSerializer,
     GameVerificationSerializer, GameCommentSerializer, TrophySerializer,
     WeeklyLeaderboardSerializer, TournamentSerializer, TournamentMatchSerializer,
-    NotificationSerializer, RankingsSerializer
+    NotificationSerializer, RankingsSerializer, RatingHistoryBucketSerializer
+)
+from . import jobs
+from .events import get_backend, user_channel
+from .pagination import (
+    GameCursorPagination, NotificationCursorPagination, PlayerRankingPagination, RatingHistoryPagination
+)
+from .services import (
+    FirebaseService, VerificationService, NotificationService, GameService,
+    RankingsService, TournamentService
 )
-from .services import FirebaseService, VerificationService, NotificationService, GameService, TrophyService
 
 
 class IsApprovedUser(permissions.BasePermission):
@@ -391,7 +408,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
 class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
     """View player profiles and statistics"""
-    queryset = PlayerProfile.objects.all()
+    queryset = PlayerProfile.objects.with_related()
     serializer_class = PlayerProfileSerializer
     permission_classes = [IsApprovedUser]
 
@@ -436,11 +453,10 @@ class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
         profile = self.get_object()
         user = profile.user
 
-        games = Game.objects.filter(
-            Q(player1=user) | Q(player2=user) |
-            Q(team1_player1=user) | Q(team1_player2=user) |
-            Q(team2_player1=user) | Q(team2_player2=user)
-        ).filter(status='verified').order_by('-played_at')[:50]
+        games = Game.objects.with_related().filter(
+            participants__user=user,
+            participants__status='verified'
+        ).order_by('-participants__played_at')[:50]
 
         serializer = GameSerializer(games, many=True, context={'request': request})
         return Response(serializer.data)
@@ -449,15 +465,59 @@ class PlayerProfileViewSet(viewsets.ReadOnlyModelViewSet):
     def trophies(self, request, pk=None):
         """Get trophies for a specific player"""
         profile = self.get_object()
-        trophies = Trophy.objects.filter(player=profile.user)
-        serializer = TrophySerializer(trophies, many=True)
+        trophies = Trophy.objects.filter(player=profile.user).select_related('player')
+        serializer = TrophySerializer(trophies, many=True, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    def rating_history(self, request, pk=None):
+        """
+        Get a player's rating over time, downsampled to daily or weekly buckets
+        Each bucket reports the closing rating plus the high, low and games played,
+        oldest first and paginated by bucket (follow `next` for longer histories)
+        """
+        profile = self.get_object()
+
+        game_type = request.query_params.get('game_type', 'singles')
+        if game_type not in ('singles', 'doubles'):
+            return Response(
+                {'error': "game_type must be 'singles' or 'doubles'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        bucket = request.query_params.get('bucket', 'day')
+        truncate = {'day': TruncDay, 'week': TruncWeek}.get(bucket)
+        if truncate is None:
+            return Response(
+                {'error': "bucket must be 'day' or 'week'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Bucket and aggregate in the database, keeping one row (the last game) per bucket
+        partition = [F('bucket')]
+        history = RatingHistory.objects.filter(
+            player=profile.user, game_type=game_type
+        ).annotate(
+            bucket=truncate('timestamp')
+        ).annotate(
+            position=Window(RowNumber(), partition_by=partition, order_by=[F('timestamp').desc(), F('id').desc()]),
+            high=Window(Max('rating_after'), partition_by=partition),
+            low=Window(Min('rating_after'), partition_by=partition),
+            games=Window(Count('id'), partition_by=partition),
+        ).filter(position=1).only('rating_after')
+
+        paginator = RatingHistoryPagination()
+        page = paginator.paginate_queryset(history, request, view=self)
+        response = paginator.get_paginated_response(RatingHistoryBucketSerializer(page, many=True).data)
+        response.data = {'game_type': game_type, 'bucket': bucket, **response.data}
+        return response
+
 
 class GameViewSet(viewsets.ModelViewSet):
     """CRUD operations for games"""
-    queryset = Game.objects.all()
+    queryset = Game.objects.with_related()
     permission_classes = [IsApprovedUser]
+    pagination_class = GameCursorPagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -482,11 +542,7 @@ class GameViewSet(viewsets.ModelViewSet):
         # Filter by player
         player_id = self.request.query_params.get('player')
         if player_id:
-            queryset = queryset.filter(
-                Q(player1_id=player_id) | Q(player2_id=player_id) |
-                Q(team1_player1_id=player_id) | Q(team1_player2_id=player_id) |
-                Q(team2_player1_id=player_id) | Q(team2_player2_id=player_id)
-            )
+            queryset = queryset.filter(participants__user_id=player_id)
 
         # Filter games needing my verification
         needs_verification = self.request.query_params.get('needs_my_verification')
@@ -531,34 +587,50 @@ class GameViewSet(viewsets.ModelViewSet):
 
         action = serializer.validated_data['action']
 
-        if action == 'verify':
-            game.status = 'verified'
-            game.verified_by = request.user
-            game.verified_at = timezone.now()
-            game.save()
-
-            # Process the game (update ELO, stats, etc.)
-            GameService.process_verified_game(game)
+        with transaction.atomic():
+            # Re-read the game under a row lock so it can only be verified or disputed once
+            game = Game.objects.select_for_update().get(pk=game.pk)
+            if game.status != 'pending':
+                return Response(
+                    {'error': 'Game is not pending verification'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
 
-            # Check for trophies
-            for player in [game.player1, game.player2]:
-                if player:
-                    TrophyService.check_and_award_trophies(player)
+            if action == 'verify':
+                game.status = 'verified'
+                game.verified_by = request.user
+                game.verified_at = timezone.now()
+                game.save(update_fields=['status', 'verified_by', 'verified_at'])
+
+                # Process the game (update ELO, stats, etc.) in the same transaction
+                GameService.process_verified_game(game)
+
+                # Decide the tournament match the game was played for and move the players on
+                TournamentService.record_game(game)
+
+                # Trophy checks run in the background worker
+                for player_id in [game.player1_id, game.player2_id, game.team1_player1_id,
+                                  game.team1_player2_id, game.team2_player1_id, game.team2_player2_id]:
+                    if player_id:
+                        jobs.enqueue(
+                            'trophies.check', {'user_id': str(player_id)},
+                            idempotency_key=f'trophies:{game.pk}:{player_id}'
+                        )
+            else:  # dispute
+                game.status = 'disputed'
+                game.disputed_by = request.user
+                game.disputed_at = timezone.now()
+                game.dispute_reason = serializer.validated_data.get('reason', '')
+                game.save(update_fields=['status', 'disputed_by', 'disputed_at', 'dispute_reason'])
+
+                # Notifications are created here, the admin email is sent by the background worker
+                NotificationService.create_game_disputed_notification(
+                    game, request.user, game.dispute_reason
+                )
 
+        if action == 'verify':
             return Response({'message': 'Game verified successfully'})
-
         else:  # dispute
-            game.status = 'disputed'
-            game.disputed_by = request.user
-            game.disputed_at = timezone.now()
-            game.dispute_reason = serializer.validated_data.get('reason', '')
-            game.save()
-
-            # Create notifications
-            NotificationService.create_game_disputed_notification(
-                game, request.user, game.dispute_reason
-            )
-
             return Response({'message': 'Game disputed. Admin will review.'})
 
     @action(detail=True, methods=['get', 'post'])
@@ -567,8 +639,8 @@ class GameViewSet(viewsets.ModelViewSet):
         game = self.get_object()
 
         if request.method == 'GET':
-            comments = game.comments.all()
-            serializer = GameCommentSerializer(comments, many=True)
+            comments = game.comments.select_related('author')
+            serializer = GameCommentSerializer(comments, many=True, context={'request': request})
             return Response(serializer.data)
 
         elif request.method == 'POST':
@@ -590,13 +662,17 @@ class GameViewSet(viewsets.ModelViewSet):
 
 class TournamentViewSet(viewsets.ModelViewSet):
     """CRUD operations for tournaments"""
-    queryset = Tournament.objects.all()
+    queryset = Tournament.objects.with_related()
     serializer_class = TournamentSerializer
     permission_classes = [IsApprovedUser]
 
     def get_queryset(self):
         queryset = super().get_queryset()
 
+        if self.action in ('matches', 'join', 'leave'):
+            # Only the tournament row is needed, not its participants
+            queryset = queryset.select_related(None).prefetch_related(None)
+
         # Filter by status
         status = self.request.query_params.get('status')
         if status:
@@ -611,33 +687,25 @@ class TournamentViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
-        """Join a tournament"""
+        """
+        Join a tournament
+        Send {"waitlist": true} to be put on the waitlist if it is full
+        """
         tournament = self.get_object()
+        waitlist = str(request.data.get('waitlist', '')).lower() in ('1', 'true')
 
-        if tournament.status != 'approved':
-            return Response(
-                {'error': 'Tournament is not open for registration'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if timezone.now() > tournament.registration_end:
-            return Response(
-                {'error': 'Registration period has ended'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if tournament.participants.count() >= tournament.max_participants:
-            return Response(
-                {'error': 'Tournament is full'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        try:
+            result = TournamentService.join(tournament, request.user, waitlist=waitlist)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        tournament.participants.add(request.user)
-        return Response({'message': 'Successfully joined tournament'})
+        if result == 'waitlisted':
+            return Response({'message': 'Tournament is full, you are on the waitlist', 'waitlisted': True})
+        return Response({'message': 'Successfully joined tournament', 'waitlisted': False})
 
     @action(detail=True, methods=['post'])
     def leave(self, request, pk=None):
-        """Leave a tournament"""
+        """Leave a tournament or its waitlist"""
         tournament = self.get_object()
 
         if tournament.status != 'approved':
@@ -646,77 +714,209 @@ class TournamentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        tournament.participants.remove(request.user)
+        try:
+            TournamentService.leave(tournament, request.user)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response({'message': 'Successfully left tournament'})
 
     @action(detail=True, methods=['get'])
     def matches(self, request, pk=None):
-        """Get tournament matches"""
+        """
+        Get tournament matches grouped by bracket and round
+        Served from a cached, pre-rendered snapshot with ETag support
+        """
         tournament = self.get_object()
-        matches = tournament.matches.all()
-        serializer = TournamentMatchSerializer(matches, many=True)
-        return Response(serializer.data)
+        content, etag = TournamentService.get_bracket(tournament)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def generate_bracket(self, request, pk=None):
+        """Seed the participants and create all matches (admin only)"""
+        tournament = self.get_object()
+
+        try:
+            TournamentService.generate_bracket(tournament)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = tournament.matches.with_related()
+        serializer = TournamentMatchSerializer(matches, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
+    def next_round(self, request, pk=None):
+        """Pair the next round of a Swiss tournament (admin only)"""
+        tournament = self.get_object()
+
+        try:
+            matches = TournamentService.pair_swiss_round(tournament)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = tournament.matches.with_related().filter(pk__in=[match.pk for match in matches])
+        serializer = TournamentMatchSerializer(matches, many=True, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
     """Handle user notifications"""
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationCursorPagination
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.with_related().filter(recipient=self.request.user)
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read"""
-        notifications = self.get_queryset().filter(is_read=False)
-        notifications.update(is_read=True, read_at=timezone.now())
-        return Response({'message': f'{notifications.count()} notifications marked as read'})
+        count = NotificationService.mark_all_read(request.user)
+        return Response({'message': f'{count} notifications marked as read'})
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        count = self.get_queryset().filter(is_read=False).count()
+        count = NotificationService.get_unread_count(request.user.pk)
         return Response({'count': count})
 
+    @action(detail=False, methods=['post'])
+    def stream_ticket(self, request):
+        """Short-lived ticket for opening the notification stream"""
+        return Response({
+            'ticket': NotificationService.create_stream_ticket(request.user.pk),
+            'expires_in': settings.NOTIFICATION_STREAM_TICKET_MAX_AGE,
+        })
+
+
+def _stream_user(request):
+    """
+    User for an event stream request
+    EventSource can't send headers, so it authenticates with ?ticket= from stream_ticket
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = NotificationService.read_stream_ticket(ticket)
+        user = User.objects.filter(pk=user_id).first() if user_id else None
+    else:
+        user = request.user
+    if user is None or not user.is_authenticated or not user.is_active:
+        return None
+    return user
+
+
+def _stream_notification(user, notification_id):
+    """Serialized notification for a stream, None if it's gone or not the user's"""
+    notification = Notification.objects.with_related().filter(pk=notification_id, recipient=user).first()
+    return NotificationSerializer(notification).data if notification else None
+
+
+def _format_event(event_type, data):
+    payload = api_settings.DEFAULT_RENDERER_CLASSES[0]().render(data).decode()
+    return f'event: {event_type}\ndata: {payload}\n\n'
+
+
+async def notification_stream(request):
+    """
+    Server-sent events stream of the user's new notifications and unread count
+    Sends the current unread count on connect, then every change as it happens.
+    Needs an ASGI server - each open stream would hold a worker thread under WSGI.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event stream requires an ASGI server'}, status=503)
+
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    async def events():
+        backend = get_backend()
+        subscription = backend.subscribe(user_channel(user.pk))
+        try:
+            await backend.wait_listening()
+            count = await sync_to_async(NotificationService.get_unread_count)(user.pk)
+            yield _format_event('unread_count', {'count': count})
+            while True:
+                event = await subscription.get(timeout=settings.EVENTS_HEARTBEAT_INTERVAL)
+                if event is None:
+                    # Comment line keeps proxies from closing the idle connection
+                    yield ': keep-alive\n\n'
+                elif event['type'] == 'notification':
+                    # Notification events only carry the id
+                    data = await sync_to_async(_stream_notification)(user, event['data']['id'])
+                    if data is not None:
+                        yield _format_event('notification', data)
+                elif event['type'] == 'unread_count':
+                    # Counted here, only for users with an open stream
+                    count = await sync_to_async(NotificationService.get_unread_count)(user.pk)
+                    yield _format_event('unread_count', {'count': count})
+                else:
+                    yield _format_event(event['type'], event['data'])
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 
 class RankingsView(APIView):
-    """Get rankings and leaderboard data"""
+    """
+    Get rankings and leaderboard data
+    Served from a cached, pre-rendered snapshot with ETag support
+    Pass ?all_players=false to leave out the full player list
+    """
     permission_classes = [IsApprovedUser]
 
     def get(self, request):
-        # Get singles rankings (top 20)
-        singles_rankings = PlayerProfile.objects.filter(
-            singles_games_played__gte=1  # Minimum games to appear in rankings
-        ).order_by('-singles_elo')[:20]
+        include_all_players = request.query_params.get('all_players', 'true').lower() != 'false'
+        content, etag = RankingsService.get_snapshot(include_all_players)
 
-        # Get doubles rankings (top 20)
-        doubles_rankings = PlayerProfile.objects.filter(
-            doubles_games_played__gte=1
-        ).order_by('-doubles_elo')[:20]
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
 
-        # Get recent verified games
-        recent_games = Game.objects.filter(
-            status='verified'
-        ).order_by('-played_at')[:10]
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
-        # Get current week's leaderboard - use PlayerProfile weekly_points instead
-        weekly_leaderboard = PlayerProfile.objects.filter(
-            weekly_points__gt=0
-        ).order_by('-weekly_points')[:10]
 
-        # Also get all players (including those with 0 games)
-        all_players = PlayerProfile.objects.all().order_by('-singles_elo')
+class PlayerListView(generics.ListAPIView):
+    """
+    All players ordered by singles ELO, keyset-paginated
+    Supports ?search= on display name and ?min_games= on singles games played
+    """
+    serializer_class = PlayerProfileSerializer
+    permission_classes = [IsApprovedUser]
+    pagination_class = PlayerRankingPagination
 
-        data = {
-            'singles_rankings': PlayerProfileSerializer(singles_rankings, many=True).data,
-            'doubles_rankings': PlayerProfileSerializer(doubles_rankings, many=True).data,
-            'recent_games': GameSerializer(recent_games, many=True, context={'request': request}).data,
-            'weekly_leaderboard': PlayerProfileSerializer(weekly_leaderboard, many=True).data,
-            'all_players': PlayerProfileSerializer(all_players, many=True).data
-        }
+    def get_queryset(self):
+        queryset = PlayerProfile.objects.with_related()
 
-        return Response(data)
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = queryset.filter(user__display_name__icontains=search)
+
+        min_games = self.request.query_params.get('min_games')
+        if min_games:
+            try:
+                queryset = queryset.filter(singles_games_played__gte=int(min_games))
+            except ValueError:
+                raise ValidationError({'min_games': 'Must be an integer'})
+
+        return queryset
 
 
 class StatsView(APIView):
@@ -736,11 +936,11 @@ class StatsView(APIView):
         ).count()
 
         # Highest rated players
-        top_singles = PlayerProfile.objects.filter(
+        top_singles = PlayerProfile.objects.with_related().filter(
             singles_games_played__gte=5
         ).order_by('-singles_elo').first()
 
-        top_doubles = PlayerProfile.objects.filter(
+        top_doubles = PlayerProfile.objects.with_related().filter(
             doubles_games_played__gte=5
         ).order_by('-doubles_elo').first()
 
@@ -2,6 +2,9 @@
 ASGI config for pingpong_tracker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The notification event stream (/api/notifications/stream/) is an async view
+and only streams when served through this module, e.g.
+``uvicorn pingpong_tracker.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -61,6 +61,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Only active with JOBS_RUN_INLINE=1
+    "core.middleware.InlineJobsMiddleware",
 ]
 
 ROOT_URLCONF = "pingpong_tracker.urls"
@@ -173,6 +175,61 @@ REST_FRAMEWORK = {
     ],
 }
 
+# orjson backed renderer/parser, opt-in: output matches the stock renderer except for
+# floats outside 1e-4..1e16 and NaN/Infinity (falls back to the stdlib without orjson)
+if os.environ.get('FAST_JSON', '0') == '1':
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'core.renderers.FastJSONRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# Cache - local memory by default, any Django cache backend can be plugged in
+# LocMemCache is per process: invalidations from another process (run_worker, rebuild_ratings,
+# other instances) never reach it, so cached data is only fresh up to its timeout. Set
+# CACHE_BACKEND to a shared cache when running more than one process, see DEPLOYMENT.md
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'pingpong-tracker'),
+    }
+}
+
+# Rankings snapshot is invalidated on change, the timeout bounds staleness when the change
+# was made in another process
+RANKINGS_CACHE_TIMEOUT = 120
+
+# Tournament bracket snapshots are invalidated on change, but only in this process's cache
+# with the default LocMemCache, so changes made elsewhere show up after this many seconds
+TOURNAMENT_BRACKET_CACHE_TIMEOUT = 60
+
+# Cached unread notification counts are recounted from the database after this many seconds.
+# Changes invalidate them in this process's cache only with the default LocMemCache
+NOTIFICATION_UNREAD_COUNT_TIMEOUT = 60
+
+# Pub/sub backend for the notification stream
+# PostgreSQL relays events between processes and instances, the in-memory one only reaches the same process
+EVENTS_BACKEND = os.environ.get(
+    'EVENTS_BACKEND',
+    'core.events.PostgresEventBackend' if os.environ.get('DB_HOST') else 'core.events.InMemoryEventBackend',
+)
+# Seconds between keep-alive comments on idle event streams
+EVENTS_HEARTBEAT_INTERVAL = 15
+# Seconds a notification stream ticket stays valid, EventSource can't send the auth header so it opens the stream with one
+NOTIFICATION_STREAM_TICKET_MAX_AGE = 60
+
+# Background jobs (see core/jobs.py), run by `python manage.py run_worker`
+# JOBS_RUN_INLINE=1 runs them right after the request commits instead, for setups without a worker.
+# Jobs that aren't due yet (delayed jobs, retries) then run after a later request, see InlineJobsMiddleware
+JOBS_RUN_INLINE = os.environ.get('JOBS_RUN_INLINE', '0') == '1'
+JOBS_INLINE_SWEEP_INTERVAL = 10
+JOBS_MAX_ATTEMPTS = 5
+# Seconds before a job left running by a dead worker is picked up again
+JOBS_LOCK_TIMEOUT = 600
+
 # CORS settings - parse from environment variable (comma-separated)
 def parse_cors_origins(env_var_name, defaults=None):
     """Parse comma-separated origins from env var, removing trailing slashes"""
@@ -238,3 +295,10 @@ FIREBASE_PROJECT_ID = os.environ.get('FIREBASE_PROJECT_ID', '')
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@pingpongtracker.com')
 ADMIN_EMAIL = config('ADMIN_EMAIL', default='admin@pingpongtracker.com')
+
+# Outgoing email is queued and sent in batches by the background worker
+EMAIL_BATCH_SIZE = 50
+EMAIL_MAX_ATTEMPTS = 5
+# Combine bursts of admin alerts into one email per interval (seconds)
+ADMIN_EMAIL_DIGEST = os.environ.get('ADMIN_EMAIL_DIGEST', '0') == '1'
+ADMIN_EMAIL_DIGEST_INTERVAL = 300
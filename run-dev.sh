@@ -9,7 +9,7 @@ echo ""
 cleanup() {
     echo ""
     echo "Shutting down servers..."
-    kill $BACKEND_PID $FRONTEND_PID 2>/dev/null
+    kill $BACKEND_PID $WORKER_PID $FRONTEND_PID 2>/dev/null
     exit 0
 }
 
@@ -22,6 +22,9 @@ cd backend
 source venv/bin/activate
 python manage.py runserver &
 BACKEND_PID=$!
+# Background jobs (trophy checks, admin emails)
+python manage.py run_worker &
+WORKER_PID=$!
 cd ..
 
 # Give Django a moment to start